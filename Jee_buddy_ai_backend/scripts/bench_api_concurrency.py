@@ -0,0 +1,104 @@
+"""Concurrency benchmark for the FastAPI -> Django bridge in api.py.
+
+Compares the old inline bridge (WSGI app called directly inside the async
+route) with ``WSGIBridge`` on a view that blocks like an LLM call:
+
+    python scripts/bench_api_concurrency.py --requests 64 --concurrency 16 --delay 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+import httpx
+from fastapi import FastAPI, Request, Response
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from core.wsgi_bridge import WSGIBridge, build_environ  # noqa: E402
+
+
+def slow_view(delay):
+    def app(environ, start_response):
+        time.sleep(delay)
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [b'{"solution":"42"}']
+    return app
+
+
+def inline_app(wsgi_app):
+    """The previous catch_all: runs Django on the event loop thread."""
+    app = FastAPI()
+
+    @app.get("/{path:path}")
+    async def catch_all(request: Request, path: str):
+        body = await request.body()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = status
+
+        content = b''.join(wsgi_app(build_environ(request, BytesIO(body), len(body)), start_response))
+        return Response(content=content, status_code=int(started['status'].split()[0]))
+
+    return app
+
+
+def bridged_app(wsgi_app, workers):
+    app = FastAPI()
+    bridge = WSGIBridge(wsgi_app, max_workers=workers)
+
+    @app.get("/{path:path}")
+    async def catch_all(request: Request, path: str):
+        return await bridge(request)
+
+    return app
+
+
+async def run(app, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get('/api/solve-math/')
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies
+
+
+def report(name, total, elapsed, latencies):
+    latencies.sort()
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f"{name:<10} {total / elapsed:8.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.0f} ms   p95 {p95 * 1000:7.0f} ms   "
+        f"wall {elapsed:6.2f} s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--delay', type=float, default=0.2, help='Seconds each view blocks')
+    parser.add_argument('--workers', type=int, default=16, help='Bridge thread pool size')
+    args = parser.parse_args()
+
+    view = slow_view(args.delay)
+    for name, app in (('inline', inline_app(view)), ('bridged', bridged_app(view, args.workers))):
+        elapsed, latencies = asyncio.run(run(app, args.requests, args.concurrency))
+        report(name, args.requests, elapsed, latencies)
+
+
+if __name__ == '__main__':
+    main()
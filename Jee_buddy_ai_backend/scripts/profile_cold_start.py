@@ -0,0 +1,107 @@
+"""Import-time profile and cold-start budget for the serverless entry points.
+
+Each entry point is imported in a fresh interpreter under ``-X importtime``
+and the URLconf is resolved, which is what the first request pays for:
+
+    python scripts/profile_cold_start.py                    # all entry points
+    python scripts/profile_cold_start.py core.wsgi --budget-ms 1500
+
+Exits non-zero if an entry point goes over the budget or pulls in one of
+the heavy SDKs that must only load on first use.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ('core.wsgi', 'core.vercel_wsgi', 'api')
+
+# Must not be imported until a view actually needs them.
+HEAVY_MODULES = (
+    'langchain', 'langchain_core', 'langchain_openai', 'openai',
+    'supabase', 'razorpay', 'streamlit', 'PyPDF2',
+)
+
+DEFAULT_BUDGET_MS = int(os.getenv('COLD_START_BUDGET_MS', '1500'))
+
+PROBE = """
+import json, sys
+import {entry}
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def profile(entry):
+    """Import ``entry`` in a clean interpreter; returns timing and loaded SDKs."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [
+        os.path.join(BACKEND_DIR, 'src'), BACKEND_DIR, env.get('PYTHONPATH'),
+    ]))
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(entry=entry, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {entry} failed:\n{result.stderr[-2000:]}")
+
+    import_us = 0
+    by_package = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        by_package[module.split('.')[0]] += int(self_us)
+        if len(indent) <= 1:
+            import_us += int(cumulative_us)
+
+    return {
+        'entry': entry,
+        'import_ms': import_us / 1000,
+        'wall_ms': wall_ms,
+        'heavy_modules': json.loads(result.stdout.strip().splitlines()[-1]),
+        'top_packages': sorted(
+            ((package, us / 1000) for package, us in by_package.items()),
+            key=lambda item: item[1], reverse=True,
+        )[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('entries', nargs='*', default=list(ENTRY_POINTS))
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Maximum import time per entry point')
+    args = parser.parse_args()
+
+    failures = []
+    for entry in args.entries:
+        report = profile(entry)
+        print(f"{entry}: imports {report['import_ms']:.0f} ms, process {report['wall_ms']:.0f} ms")
+        for package, ms in report['top_packages']:
+            print(f"    {ms:8.1f} ms  {package}")
+        if report['import_ms'] > args.budget_ms:
+            failures.append(f"{entry} imports took {report['import_ms']:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        if report['heavy_modules']:
+            failures.append(f"{entry} imported {', '.join(report['heavy_modules'])} at startup")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
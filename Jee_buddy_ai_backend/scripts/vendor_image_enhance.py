@@ -0,0 +1,49 @@
+"""Copy the math_solver service's image_enhance module into this backend.
+
+The two services deploy separately, so the backend carries its own copy
+(src/main/image_enhance.py). It is never edited by hand: change the
+original, then re-run
+
+    python scripts/vendor_image_enhance.py
+
+``--check`` exits non-zero, without writing, if the copy is out of date.
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SOURCE = os.path.join(BACKEND_DIR, '..', 'math_solver', 'app', 'services', 'image_enhance.py')
+TARGET = os.path.join(BACKEND_DIR, 'src', 'main', 'image_enhance.py')
+HEADER = (
+    '# Vendored from math_solver/app/services/image_enhance.py by\n'
+    '# scripts/vendor_image_enhance.py. Do not edit; change the original.\n'
+)
+
+
+def render(source: str) -> str:
+    return HEADER + source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true', help='only report whether the copy is current')
+    args = parser.parse_args()
+
+    with open(SOURCE, encoding='utf-8') as f:
+        expected = render(f.read())
+    with open(TARGET, encoding='utf-8') as f:
+        current = f.read()
+    if current == expected:
+        print(f"{TARGET} is up to date")
+        return
+    if args.check:
+        print(f"{TARGET} is out of date; run scripts/vendor_image_enhance.py")
+        sys.exit(1)
+    with open(TARGET, 'w', encoding='utf-8') as f:
+        f.write(expected)
+    print(f"Updated {TARGET}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Route stale-tolerant reads to the ``replica`` database.
+
+Reads go to the replica only inside a request, and only when either the
+model is listed in ``REPLICA_READ_MODELS`` or the view is decorated with
+``@replica_reads``. They stay on the primary when:
+
+- no replica is configured, or its measured lag exceeds ``REPLICA_MAX_LAG``;
+- the caller wrote recently (read-your-writes): any write pins that user to
+  the primary for ``REPLICA_PIN_SECONDS``, via a cache entry keyed by user
+  id (and a cookie, for same-site clients);
+- the query runs inside a transaction on the primary.
+
+The pin has to be visible to every worker, so the middleware refuses to
+start with a replica configured and a process-local default cache.
+
+Background jobs never run inside a request, so their watermark reads are
+always consistent with their writes.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = 'replica'
+PIN_COOKIE = 'db_pin'
+# Cache backends each worker process has its own copy of
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Per-request routing state; None outside requests.
+_request_state = ContextVar('replica_routing', default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def check_pin_cache():
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend in PROCESS_LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f"The read replica needs a cache shared by all workers for read-your-writes "
+            f"pinning, but the default cache is {backend}. Set REDIS_URL."
+        )
+
+
+class ReplicaLagMonitor:
+    """Measures replica lag on a background thread, never on a request path.
+
+    The router can be consulted from async code, where running a query would
+    raise, so it only ever reads the last measurement.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.lag = None  # seconds; None until measured or while unreachable
+        self.measured_at = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='replica-lag', daemon=True)
+                self._thread.start()
+
+    def measure(self):
+        try:
+            with connections[REPLICA_DB_ALIAS].cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                self.lag = float(cursor.fetchone()[0])
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, reading from primary: {str(e)}")
+            self.lag = None
+        finally:
+            # Hand the connection back (to the pool, or closed once stale).
+            connections[REPLICA_DB_ALIAS].close_if_unusable_or_obsolete()
+        self.measured_at = time.monotonic()
+
+    def healthy(self, max_lag: float) -> bool:
+        self.ensure_started()
+        fresh = time.monotonic() - self.measured_at < 3 * self.interval
+        return fresh and self.lag is not None and self.lag <= max_lag
+
+    def _run(self):
+        while True:
+            self.measure()
+            time.sleep(self.interval)
+
+
+lag_monitor = ReplicaLagMonitor(interval=getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5.0))
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replica_models = {label.lower() for label in getattr(settings, 'REPLICA_READ_MODELS', [])}
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state['pinned'] or not replica_configured():
+            return None
+        if not (state['replica_view'] or model._meta.label_lower in self.replica_models):
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if not lag_monitor.healthy(getattr(settings, 'REPLICA_MAX_LAG', 5.0)):
+            return None
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['pinned'] = state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
+
+
+def _pin_key(user_id):
+    return f'db_pin:{user_id}'
+
+
+def _request_user_id(request):
+    from subscription.middleware import get_request_user_id
+    return get_request_user_id(request) or request.GET.get('user_id')
+
+
+class ReplicaPinningMiddleware:
+    """Tracks per-request routing state and read-your-writes pinning."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+        if replica_configured():
+            check_pin_cache()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(request, state, response)
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(request, state, response)
+
+    def _start(self, request):
+        user_id = _request_user_id(request)
+        pinned = PIN_COOKIE in request.COOKIES or bool(user_id and cache.get(_pin_key(user_id)))
+        state = {'pinned': pinned, 'wrote': False, 'replica_view': False, 'user_id': user_id}
+        return state, _request_state.set(state)
+
+    def _finish(self, request, state, response):
+        if state['wrote']:
+            response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+            if state['user_id']:
+                cache.set(_pin_key(state['user_id']), True, self.pin_seconds)
+        return response
+
+
+def replica_reads(view_func):
+    """Let every read in this view use the replica (subject to pinning and lag)."""
+    def mark():
+        state = _request_state.get()
+        if state is not None:
+            state['replica_view'] = True
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapped_view(request, *args, **kwargs):
+            mark()
+            return await view_func(request, *args, **kwargs)
+        return async_wrapped_view
+
+    @wraps(view_func)
+    def wrapped_view(request, *args, **kwargs):
+        mark()
+        return view_func(request, *args, **kwargs)
+    return wrapped_view
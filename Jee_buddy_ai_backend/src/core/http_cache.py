@@ -0,0 +1,90 @@
+"""Pre-encoded responses for endpoints whose output only changes on deploy.
+
+The body is serialized once per process, tagged with a strong ETag derived
+from its bytes, and served with ``Cache-Control`` so a CDN in front of the
+app can absorb the traffic. Conditional requests get a bodyless 304.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+class PrecomputedBody:
+    """Immutable response body with its strong ETag."""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+    def matches(self, if_none_match) -> bool:
+        """RFC 9110 weak comparison of an ``If-None-Match`` header value."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = (tag.strip() for tag in if_none_match.split(','))
+        return any(tag.removeprefix('W/') == self.etag for tag in tags)
+
+
+def precomputed_response(max_age=300, s_maxage=None, methods=('GET', 'HEAD')):
+    """Cache a request-independent view's first 200 response as bytes.
+
+    Only use this for views whose output does not depend on the request
+    (query string, headers or user); the first successful response is
+    replayed for every later call on the worker. Wraps sync and async views.
+    """
+    cache_control = {'public': True, 'max_age': max_age}
+    if s_maxage is not None:
+        cache_control['s_maxage'] = s_maxage
+
+    def replay(request, precomputed):
+        response = HttpResponse(precomputed.body, content_type=precomputed.content_type)
+        response['ETag'] = precomputed.etag
+        patch_cache_control(response, **cache_control)
+        # Swaps in a 304 carrying the same ETag/Cache-Control on a match.
+        return get_conditional_response(request, etag=precomputed.etag, response=response)
+
+    def capture(state, response):
+        if response.status_code != 200 or response.streaming:
+            return None
+        state['body'] = PrecomputedBody(response.content, response['Content-Type'])
+        return state['body']
+
+    def decorator(view_func):
+        state = {}
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapped_view(request, *args, **kwargs):
+                if request.method not in methods:
+                    return await view_func(request, *args, **kwargs)
+                precomputed = state.get('body')
+                if precomputed is None:
+                    response = await view_func(request, *args, **kwargs)
+                    precomputed = capture(state, response)
+                    if precomputed is None:
+                        return response
+                return replay(request, precomputed)
+
+            return async_wrapped_view
+
+        @wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            if request.method not in methods:
+                return view_func(request, *args, **kwargs)
+            precomputed = state.get('body')
+            if precomputed is None:
+                response = view_func(request, *args, **kwargs)
+                precomputed = capture(state, response)
+                if precomputed is None:
+                    return response
+            return replay(request, precomputed)
+
+        return wrapped_view
+
+    return decorator
@@ -0,0 +1,46 @@
+"""Access control for operator-only endpoints: monitoring and global analytics.
+
+A request is internal if it comes from an active staff user's session
+(the Django admin login) or carries ``X-Internal-Token`` equal to the
+``INTERNAL_API_TOKEN`` setting, for scrapers and dashboards. With no token
+configured only staff sessions get in.
+"""
+import hmac
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+
+def is_internal_request(request) -> bool:
+    token = getattr(settings, 'INTERNAL_API_TOKEN', None)
+    supplied = request.headers.get('X-Internal-Token')
+    if token and supplied and hmac.compare_digest(supplied.encode(), token.encode()):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+def _forbidden():
+    return JsonResponse({
+        'status': 'error',
+        'message': 'This endpoint is for internal use'
+    }, status=403)
+
+
+def internal_only(view):
+    """Answer 403 unless ``is_internal_request``. Works on sync and async views."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not is_internal_request(request):
+                return _forbidden()
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_internal_request(request):
+                return _forbidden()
+            return view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,47 @@
+"""PostgreSQL backend that borrows connections from a process-wide pool.
+
+Configured through ``OPTIONS['connection_pool']``, not ``OPTIONS['pool']``,
+which Django 5.1+ reserves for its own psycopg 3 pool::
+
+    'ENGINE': 'core.pooled_postgresql',
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {'connection_pool': {'min_size': 2, 'max_size': 10, 'idle_timeout': 300}},
+
+Django "closes" the connection at the end of every request, which hands it
+back to the pool instead of tearing down the SSL session. Because the pool
+is shared by all threads, this works the same for WSGI threads and for the
+per-request threads the async ORM runs on under ASGI.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def pool_options(self) -> dict:
+        return dict(self.settings_dict['OPTIONS'].get('connection_pool') or {})
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, **self.pool_options())
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('connection_pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # super() sets this when it builds a connection; reused ones need it too.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel(isolation_level) if isolation_level is not None
+            else IsolationLevel.READ_COMMITTED
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
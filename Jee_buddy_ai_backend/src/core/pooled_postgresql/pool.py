@@ -0,0 +1,219 @@
+"""Thread-safe, process-wide pool of psycopg2 connections."""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError, extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(OperationalError):
+    """No connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded LIFO pool with idle eviction and pre-ping on checkout.
+
+    ``connect`` is passed on each checkout rather than stored, so the Django
+    wrapper that needs a new connection is the one that builds it. The first
+    checkout also starts a background thread that opens connections up to
+    ``min_size``, so the requests that follow find them ready.
+    """
+
+    def __init__(self, min_size=0, max_size=10, timeout=10.0, idle_timeout=300.0,
+                 max_lifetime=3600.0, ping_after=5.0):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.pid = os.getpid()
+        self._warmer = None
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, created_at, returned_at)
+        self._created = {}    # id(connection) -> created_at, for checked-out ones
+        self._size = 0        # open connections, idle or checked out
+        self._stats = {
+            'connections_opened': 0, 'connections_closed': 0, 'checkouts': 0,
+            'waits': 0, 'wait_ms': 0.0, 'timeouts': 0, 'health_check_failures': 0,
+        }
+
+    def getconn(self, connect):
+        if self._warmer is None and self.min_size:
+            with self._cond:
+                if self._warmer is None:
+                    self._warmer = threading.Thread(target=self.warm, args=(connect,),
+                                                    name='db-pool-warm', daemon=True)
+                    self._warmer.start()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, created_at, returned_at = self._take(deadline)
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created_at = time.monotonic()
+                with self._cond:
+                    self._stats['connections_opened'] += 1
+            elif not self._healthy(connection, returned_at):
+                self._discard(connection)
+                continue
+            with self._cond:
+                self._created[id(connection)] = created_at
+                self._stats['checkouts'] += 1
+            return connection
+
+    def warm(self, connect):
+        """Open idle connections until the pool holds ``min_size``."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = connect()
+            except Exception as e:
+                logger.warning(f"Could not pre-open a pooled database connection: {e}")
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                return
+            now = time.monotonic()
+            with self._cond:
+                self._stats['connections_opened'] += 1
+                self._idle.append((connection, now, now))
+                self._cond.notify()
+
+    def putconn(self, connection):
+        with self._cond:
+            created_at = self._created.pop(id(connection), time.monotonic())
+        status = None if connection.closed else connection.info.transaction_status
+        if status not in (extensions.TRANSACTION_STATUS_IDLE, extensions.TRANSACTION_STATUS_INTRANS):
+            # Closed, mid-query or in a failed state: not worth recovering.
+            self._discard(connection)
+            return
+        if status == extensions.TRANSACTION_STATUS_INTRANS:
+            try:
+                connection.rollback()
+            except Exception:
+                self._discard(connection)
+                return
+        if self.max_lifetime and time.monotonic() - created_at > self.max_lifetime:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def _take(self, deadline):
+        """An idle connection, or ``(None, ...)`` with a slot reserved for a new one."""
+        with self._cond:
+            waited_since = None
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    found = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    found = (None, None, None)
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"No database connection free within {self.timeout}s "
+                        f"(pool max_size={self.max_size})"
+                    )
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._stats['waits'] += 1
+                self._cond.wait(remaining)
+            if waited_since is not None:
+                self._stats['wait_ms'] += (time.monotonic() - waited_since) * 1000
+            return found
+
+    def _evict_idle(self):
+        """Close connections idle past ``idle_timeout``, keeping ``min_size``. Lock held."""
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        # The left end holds the least recently returned connections.
+        while self._idle and self._size > self.min_size and self._idle[0][2] < cutoff:
+            connection, _, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats['connections_closed'] += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.ping_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding pooled database connection that failed its health check: {e}")
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['connections_closed'] += 1
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                **self._stats,
+                'wait_ms': round(self._stats['wait_ms'], 1),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **options) -> ConnectionPool:
+    """The pool for a database alias, created on first use in each process."""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        # A pool inherited across fork() shares sockets with the parent.
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = ConnectionPool(**options)
+        return pool
+
+
+def pool_stats() -> dict:
+    """Stats for every pool created in this process, keyed by database alias."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items() if pool.pid == os.getpid()}
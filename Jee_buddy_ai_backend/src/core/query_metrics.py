@@ -0,0 +1,189 @@
+"""Per-request query count and database time, plus query budgets for tests.
+
+``QueryMetricsMiddleware`` installs a ``QueryRecorder`` as an execute
+wrapper on every database connection for the duration of a request. The
+totals go out as a ``Server-Timing`` header, into a warning log line when a
+request exceeds the configured limits, and into per-route counters served
+by ``/api/health/queries/``.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """Execute wrapper that times every statement.
+
+    With ``explain_over_ms`` set, SELECTs slower than that are re-run as a
+    plain ``EXPLAIN`` (not ANALYZE, so nothing executes twice) and the plan
+    is kept alongside the statement.
+    """
+
+    def __init__(self, explain_over_ms=None, keep_statements=False):
+        self.explain_over_ms = explain_over_ms
+        self.keep_statements = keep_statements
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest = None  # (duration_ms, sql)
+        self.statements = []  # (duration_ms, sql), when keep_statements
+        self.explained = []   # (duration_ms, sql, plan)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        self.count += 1
+        self.total_ms += duration_ms
+        if self.slowest is None or duration_ms > self.slowest[0]:
+            self.slowest = (duration_ms, sql)
+        if self.keep_statements:
+            self.statements.append((duration_ms, sql))
+        if (self.explain_over_ms is not None and duration_ms >= self.explain_over_ms
+                and not many and sql.lstrip().upper().startswith('SELECT')):
+            self.explained.append((duration_ms, sql, self._explain(context['connection'], sql, params)))
+        return result
+
+    @staticmethod
+    def _explain(connection, sql, params):
+        # The raw DB-API cursor bypasses execute wrappers, so this is not recorded.
+        try:
+            with connection.connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN {sql}', params)
+                return '\n'.join(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            return f'EXPLAIN failed: {e}'
+
+    def summary(self) -> dict:
+        return {
+            'queries': self.count,
+            'db_ms': round(self.total_ms, 1),
+            'slowest_ms': round(self.slowest[0], 1) if self.slowest else 0,
+            'slowest_sql': self.slowest[1][:500] if self.slowest else None,
+        }
+
+
+@contextmanager
+def record_queries(recorder=None, using=None):
+    """Record every statement run on ``using`` (default: all) connections."""
+    recorder = recorder or QueryRecorder()
+    with ExitStack() as stack:
+        for alias in using or connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+@contextmanager
+def query_budget(max_queries, max_db_ms=None, explain_over_ms=50, using=None):
+    """Test helper: fail if the block runs more queries (or DB time) than budgeted.
+
+    The failure lists every statement with its timing, and the ``EXPLAIN``
+    plan of any SELECT slower than ``explain_over_ms``::
+
+        with query_budget(3):
+            client.get('/api/usage/stats/', {'user_id': 'u1'})
+    """
+    recorder = QueryRecorder(explain_over_ms=explain_over_ms, keep_statements=True)
+    with record_queries(recorder, using=using):
+        yield recorder
+
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f"{recorder.count} queries, budget {max_queries}")
+    if max_db_ms is not None and recorder.total_ms > max_db_ms:
+        problems.append(f"{recorder.total_ms:.1f} ms of DB time, budget {max_db_ms} ms")
+    if problems:
+        lines = [f"Query budget exceeded: {'; '.join(problems)}"]
+        lines += [f"  {i}. [{ms:.1f} ms] {sql}" for i, (ms, sql) in enumerate(recorder.statements, 1)]
+        for ms, sql, plan in recorder.explained:
+            lines.append(f"EXPLAIN [{ms:.1f} ms] {sql}\n{plan}")
+        raise AssertionError('\n'.join(lines))
+
+
+class RouteQueryStats:
+    """In-process per-route totals, for the monitoring endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def add(self, route, recorder):
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                'requests': 0, 'queries': 0, 'db_ms': 0.0, 'max_queries': 0,
+                'slowest_ms': 0.0, 'slowest_sql': None,
+            })
+            stats['requests'] += 1
+            stats['queries'] += recorder.count
+            stats['db_ms'] += recorder.total_ms
+            stats['max_queries'] = max(stats['max_queries'], recorder.count)
+            if recorder.slowest and recorder.slowest[0] > stats['slowest_ms']:
+                stats['slowest_ms'], stats['slowest_sql'] = recorder.slowest[0], recorder.slowest[1][:500]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    **stats,
+                    'db_ms': round(stats['db_ms'], 1),
+                    'slowest_ms': round(stats['slowest_ms'], 1),
+                    'avg_queries': round(stats['queries'] / stats['requests'], 2),
+                }
+                for route, stats in self._routes.items()
+            }
+
+
+route_stats = RouteQueryStats()
+
+
+class QueryMetricsMiddleware:
+    """Count queries and DB time per request; warn when over the limits."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.warn_queries = getattr(settings, 'QUERY_COUNT_WARN', 20)
+        self.warn_db_ms = getattr(settings, 'QUERY_TIME_WARN_MS', 500)
+        self.explain_over_ms = getattr(settings, 'QUERY_EXPLAIN_OVER_MS', None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries(QueryRecorder(explain_over_ms=self.explain_over_ms)) as recorder:
+            response = self.get_response(request)
+        return self._report(request, response, recorder)
+
+    async def __acall__(self, request):
+        # Connections are context-local, so ORM calls in sync_to_async
+        # threads go through the wrapper installed here.
+        with record_queries(QueryRecorder(explain_over_ms=self.explain_over_ms)) as recorder:
+            response = await self.get_response(request)
+        return self._report(request, response, recorder)
+
+    def _report(self, request, response, recorder):
+        match = getattr(request, 'resolver_match', None)
+        route = f"{request.method} /{match.route}" if match else f"{request.method} (unresolved)"
+        route_stats.add(route, recorder)
+        response['Server-Timing'] = f'db;dur={recorder.total_ms:.1f};desc="{recorder.count} queries"'
+
+        summary = recorder.summary()
+        if recorder.count > self.warn_queries or recorder.total_ms > self.warn_db_ms:
+            logger.warning(
+                f"{route} ran {summary['queries']} queries in {summary['db_ms']} ms; "
+                f"slowest {summary['slowest_ms']} ms: {summary['slowest_sql']}"
+            )
+        else:
+            logger.debug(f"{route} ran {summary['queries']} queries in {summary['db_ms']} ms")
+        for ms, sql, plan in recorder.explained:
+            logger.warning(f"Slow query on {route} ({ms:.1f} ms): {sql}\n{plan}")
+        return response
@@ -48,11 +48,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'main',
     'user',
     'subscription',
+    'usage',
 ]
 
 
@@ -61,10 +63,13 @@ ASGI_APPLICATION = 'config.asgi.application'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.query_metrics.QueryMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.db_router.ReplicaPinningMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'subscription.middleware.EntitlementMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,6 +82,38 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Per-request query instrumentation (core.query_metrics.QueryMetricsMiddleware)
+QUERY_COUNT_WARN = int(os.getenv('QUERY_COUNT_WARN', '20'))
+QUERY_TIME_WARN_MS = float(os.getenv('QUERY_TIME_WARN_MS', '500'))
+# EXPLAIN and log SELECTs slower than this; unset disables it in production.
+QUERY_EXPLAIN_OVER_MS = float(os.getenv('QUERY_EXPLAIN_OVER_MS')) if os.getenv('QUERY_EXPLAIN_OVER_MS') else None
+
+# Shared secret for operator-only endpoints (core.internal), sent as
+# X-Internal-Token; staff sessions get in without it.
+INTERNAL_API_TOKEN = os.getenv('INTERNAL_API_TOKEN')
+
+# Plan entitlement gate (subscription.middleware.EntitlementMiddleware)
+ENTITLEMENT_GATED_PATHS = ['/api/solve-math/']
+ENTITLEMENT_CACHE_TTL = int(os.getenv('ENTITLEMENT_CACHE_TTL', '30'))
+# Supabase project JWT secret; quotas follow the verified `sub` of the
+# request's bearer token. Unset, every caller is anonymous (by address).
+SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
+SUPABASE_JWT_AUDIENCE = os.getenv('SUPABASE_JWT_AUDIENCE', 'authenticated')
+
+# Photo solves on /api/solve-math/ (main.image_prep)
+SOLVE_IMAGE_MAX_BYTES = int(os.getenv('SOLVE_IMAGE_MAX_BYTES', str(10 * 1024 * 1024)))
+SOLVE_IMAGE_MAX_DIMENSION = int(os.getenv('SOLVE_IMAGE_MAX_DIMENSION', '1600'))
+SOLVE_IMAGE_MAX_PIXELS = int(os.getenv('SOLVE_IMAGE_MAX_PIXELS', '60000000'))
+SOLVE_IMAGE_PREP_THREADS = int(os.getenv('SOLVE_IMAGE_PREP_THREADS', '4'))
+# Crop photos to the question before sending them (main.image_enhance).
+# Lossy; off until answer accuracy is measured against the originals
+# (math_solver/scripts/bench_image_enhance.py --live).
+SOLVE_IMAGE_ENHANCE = os.getenv('SOLVE_IMAGE_ENHANCE', 'false').lower() == 'true'
+
+# Problem bank access tracking (main.access_tracking), buffered per worker
+PROBLEM_ACCESS_FLUSH_INTERVAL = float(os.getenv('PROBLEM_ACCESS_FLUSH_INTERVAL', '30'))
+PROBLEM_ACCESS_MAX_PENDING = int(os.getenv('PROBLEM_ACCESS_MAX_PENDING', '5000'))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Change this to False
 CORS_ALLOW_CREDENTIALS = True
@@ -138,20 +175,74 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections come from a process-wide pool (core.pooled_postgresql) so
+# requests skip the SSL handshake to Supabase. DB_POOL=false falls back to
+# persistent per-thread connections.
+DB_POOL = os.getenv('DB_POOL', 'true').lower() == 'true'
+# Behind a transaction-mode pooler (Supabase pooler on 6543, pgbouncer)
+# server-side cursors do not survive between transactions.
+DB_TRANSACTION_POOLER = os.getenv('DB_TRANSACTION_POOLER', 'false').lower() == 'true'
+
+DATABASE_OPTIONS = {
+    'sslmode': 'require' if os.getenv('DATABASE_SSL_REQUIRE', 'true').lower() == 'true' else 'disable',
+    'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '10')),
+}
+if DB_POOL:
+    DATABASE_OPTIONS['connection_pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'idle_timeout': float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+        # Connections idle longer than this are pinged before reuse.
+        'ping_after': float(os.getenv('DB_POOL_PING_AFTER', '5')),
+    }
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.pooled_postgresql' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': os.getenv('SUPABASE_DB_NAME', 'postgres'),
         'USER': os.getenv('SUPABASE_DB_USER', 'postgres'),
         'PASSWORD': os.getenv('SUPABASE_DB_PASSWORD'),
         'HOST': os.getenv('SUPABASE_DB_HOST'),
         'PORT': os.getenv('SUPABASE_DB_PORT', '5432'),
-        'OPTIONS': {
-            'sslmode': 'require' if os.getenv('DATABASE_SSL_REQUIRE', 'true').lower() == 'true' else 'disable',
-        }
+        # With the pool, "closing" at request end returns the connection.
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': DB_TRANSACTION_POOLER,
+        'OPTIONS': DATABASE_OPTIONS,
     }
 }
 
+# Shared cache. The replica's read-your-writes pin (core.db_router) lives
+# here and must be seen by every worker, so a replica requires REDIS_URL.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Optional read replica for history and analytics reads (core.db_router).
+DB_REPLICA_HOST = os.getenv('SUPABASE_DB_REPLICA_HOST')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': os.getenv('SUPABASE_DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_READ_MODELS = ['main.ChatHistory', 'usage.DailyUsage', 'usage.TopicHourlyUsage', 'usage.StudyStats']
+# Beyond this lag (seconds) reads fall back to the primary.
+REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', '5'))
+# After a write, the user's reads stay on the primary this long.
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '15'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -1,10 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import database_pool_stats, query_stats
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/health/db-pool/', database_pool_stats, name='database_pool_stats'),
+    path('api/health/queries/', query_stats, name='query_stats'),
     path('api/', include('main.urls')),
     # path('api/auth/', include('user.urls')),
     path('', include('user.urls')),
     path('api/subscription/', include('subscription.urls')),
+    path('api/usage/', include('usage.urls')),
 ]
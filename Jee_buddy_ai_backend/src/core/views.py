@@ -0,0 +1,30 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from .internal import internal_only
+from .pooled_postgresql.pool import pool_stats
+from .query_metrics import route_stats
+
+
+@require_http_methods(["GET"])
+@internal_only
+def database_pool_stats(request):
+    """Connection pool counters for this worker process, for monitoring."""
+    response = JsonResponse({
+        'status': 'success',
+        'pools': pool_stats(),
+    })
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@require_http_methods(["GET"])
+@internal_only
+def query_stats(request):
+    """Per-route query counts and DB time for this worker process."""
+    response = JsonResponse({
+        'status': 'success',
+        'routes': route_stats.snapshot(),
+    })
+    response['Cache-Control'] = 'no-store'
+    return response
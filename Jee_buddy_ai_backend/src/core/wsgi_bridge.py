@@ -0,0 +1,190 @@
+"""Serve the Django WSGI app from an async (FastAPI/Starlette) route.
+
+Django runs on a bounded thread pool, so the event loop keeps accepting
+requests while views wait on the database or the LLM. Request bodies with a
+``Content-Length`` are streamed into ``wsgi.input`` as Django reads them, so
+uploads spool to disk instead of being held in memory first; chunked bodies
+are buffered, since Django needs the length up front. Response headers are
+passed through verbatim (repeated ``Set-Cookie`` included) and streaming
+responses are relayed chunk by chunk instead of being buffered.
+
+The thread pool is used rather than Django's ASGI handler because most views
+are still sync DRF views, which under ASGI would all share one
+thread-sensitive executor and run one at a time. Async views run here too,
+each on a short-lived event loop on its pool thread.
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from starlette.responses import Response, StreamingResponse
+
+DEFAULT_POOL_SIZE = int(os.getenv('DJANGO_THREAD_POOL_SIZE', '16'))
+
+_STREAM_END = object()
+
+
+class RequestBody:
+    """``wsgi.input`` that pulls the request body from the event loop on demand.
+
+    Read from a pool thread only: each refill blocks that thread until the
+    event loop has received the next chunk.
+    """
+
+    def __init__(self, request, loop):
+        self._chunks = request.stream()
+        self._loop = loop
+        self._buffer = bytearray()
+        self._done = False
+
+    async def _next_chunk(self):
+        return await self._chunks.__anext__()
+
+    def _fill(self):
+        try:
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+        except StopAsyncIteration:
+            self._done = True
+        else:
+            self._buffer += chunk
+
+    def _take(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._done and (size is None or size < 0 or len(self._buffer) < size):
+            self._fill()
+        return self._take(len(self._buffer) if size is None or size < 0 else size)
+
+    def readline(self, size: int = -1) -> bytes:
+        while (not self._done and b'\n' not in self._buffer
+               and (size is None or size < 0 or len(self._buffer) < size)):
+            self._fill()
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        return self._take(end if size is None or size < 0 else min(end, size))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
+def build_environ(request, body, content_length: int) -> dict:
+    """WSGI environ for a Starlette request; ``body`` is its ``wsgi.input``."""
+    url = request.url
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': request.scope.get('root_path', ''),
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'SERVER_NAME': url.hostname or 'localhost',
+        'SERVER_PORT': str(url.port or (443 if url.scheme == 'https' else 80)),
+        'SERVER_PROTOCOL': f"HTTP/{request.scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': request.client.host if request.client else '',
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': url.scheme or 'https',
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in request.headers.raw:
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name != 'CONTENT_TYPE':
+            name = f'HTTP_{name}'
+        if name in environ:
+            # Repeated headers fold into one value (RFC 9110 5.3); cookies use ';'.
+            separator = '; ' if name == 'HTTP_COOKIE' else ', '
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class WSGIBridge:
+    """Call a WSGI app on a thread pool and relay its response to Starlette."""
+
+    def __init__(self, wsgi_app, max_workers: int = DEFAULT_POOL_SIZE):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wsgi')
+
+    def _run(self, environ):
+        """Runs on a pool thread: returns status, headers and body or iterator."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started['status'] = status
+            started['headers'] = headers
+            return write
+
+        chunks = []
+        write = chunks.append
+        result = self.wsgi_app(environ, start_response)
+
+        # Django responses say whether they stream; for other apps anything
+        # but a list (e.g. a generator) is treated as a stream.
+        if getattr(result, 'streaming', not isinstance(result, (list, tuple))):
+            iterator = iter(result)
+            if 'status' not in started:
+                # Generator apps may only call start_response on first iteration.
+                chunks.append(next(iterator, b''))
+            return started['status'], started['headers'], b''.join(chunks), (result, iterator)
+
+        try:
+            chunks.extend(result)
+        finally:
+            # Fires request_finished (DB connection cleanup) on this thread.
+            if hasattr(result, 'close'):
+                result.close()
+        return started['status'], started['headers'], b''.join(chunks), None
+
+    async def _stream(self, prefix: bytes, result, iterator):
+        loop = asyncio.get_running_loop()
+        try:
+            if prefix:
+                yield prefix
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, _STREAM_END)
+                if chunk is _STREAM_END:
+                    break
+                if chunk:
+                    yield chunk
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, result.close)
+
+    async def __call__(self, request) -> Response:
+        loop = asyncio.get_running_loop()
+        content_length = request.headers.get('content-length')
+        if content_length is not None and content_length.isdigit():
+            environ = build_environ(request, RequestBody(request, loop), int(content_length))
+        else:
+            body = await request.body()
+            environ = build_environ(request, BytesIO(body), len(body))
+        status, headers, content, stream = await loop.run_in_executor(
+            self.executor, self._run, environ
+        )
+
+        status_code = int(status.split(' ', 1)[0])
+        raw_headers = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+        if stream is not None:
+            response = StreamingResponse(self._stream(content, *stream), status_code=status_code)
+        else:
+            response = Response(content=content, status_code=status_code)
+            if not any(name == b'content-length' for name, _ in raw_headers) and (
+                status_code >= 200 and status_code not in (204, 304)
+            ):
+                raw_headers.append((b'content-length', str(len(content)).encode('latin-1')))
+        response.raw_headers = raw_headers
+        return response
@@ -0,0 +1,156 @@
+"""Buffered access tracking for the problem bank.
+
+Serving a problem must not turn a read into a write. Each worker keeps the
+accesses it sees in memory (latest timestamp and hit count per problem) and
+a background thread flushes them every ``PROBLEM_ACCESS_FLUSH_INTERVAL``
+seconds as a single ``UPDATE ... FROM (VALUES ...)``. ``last_accessed`` is
+therefore approximate: it trails reality by at most one flush interval, plus
+whatever a worker still held when it died. That is plenty for LRU eviction
+measured in days and for popularity ranking.
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import MathProblem
+
+logger = logging.getLogger(__name__)
+
+# Ids are sorted before flushing so concurrent workers lock rows in the same
+# order; GREATEST keeps an older buffer from moving last_accessed backwards.
+FLUSH_SQL = """
+    UPDATE main_mathproblem AS p
+    SET last_accessed = GREATEST(p.last_accessed, v.accessed_at),
+        access_count = p.access_count + v.hits
+    FROM (VALUES {values}) AS v (id, accessed_at, hits)
+    WHERE p.id = v.id
+"""
+VALUES_ROW = '(%s::bigint, %s::timestamptz, %s::integer)'
+
+
+class AccessTracker:
+    def __init__(self, interval: float = 30.0, max_pending: int = 5000, batch_size: int = 1000):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending = {}  # problem id -> [last accessed, hits]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, problem_ids, at=None):
+        """Note that ``problem_ids`` were served. Never touches the database."""
+        at = at or timezone.now()
+        with self._lock:
+            for problem_id in problem_ids:
+                entry = self._pending.get(problem_id)
+                if entry is None:
+                    self._pending[problem_id] = [at, 1]
+                else:
+                    entry[0] = max(entry[0], at)
+                    entry[1] += 1
+            full = len(self._pending) >= self.max_pending
+        self.ensure_started()
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def ensure_started(self):
+        # A thread started before a fork does not exist in the child.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='problem-access', daemon=True)
+                self._thread.start()
+
+    def flush(self) -> int:
+        """Write buffered accesses. Returns the number of problems updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = sorted((pk, at, hits) for pk, (at, hits) in pending.items())
+        connection = connections[DEFAULT_DB_ALIAS]
+        updated = 0
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    cursor.execute(
+                        FLUSH_SQL.format(values=', '.join([VALUES_ROW] * len(batch))),
+                        [value for row in batch for value in row],
+                    )
+                    updated += cursor.rowcount
+        except Exception as e:
+            logger.warning(f"Problem access flush failed, keeping {len(rows)} entries: {str(e)}")
+            self._restore(pending)
+            return 0
+        logger.debug(f"Flushed access times for {updated} problems")
+        return updated
+
+    def _restore(self, pending):
+        with self._lock:
+            for problem_id, (at, hits) in pending.items():
+                entry = self._pending.setdefault(problem_id, [at, 0])
+                entry[0] = max(entry[0], at)
+                entry[1] += hits
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                connections[DEFAULT_DB_ALIAS].close_if_unusable_or_obsolete()
+
+
+tracker = AccessTracker(
+    interval=getattr(settings, 'PROBLEM_ACCESS_FLUSH_INTERVAL', 30.0),
+    max_pending=getattr(settings, 'PROBLEM_ACCESS_MAX_PENDING', 5000),
+)
+atexit.register(tracker.flush)
+
+
+def record_access(problem_ids):
+    tracker.record(problem_ids)
+
+
+def popular_problems(limit=20, category=None):
+    """Most-served problems first, via the descending ``access_count`` index."""
+    problems = MathProblem.objects.order_by('-access_count', 'id')
+    if category:
+        problems = problems.filter(category__iexact=category)
+    return problems[:limit]
+
+
+def evict_idle_problems(idle_days: int, batch_size: int = 1000) -> int:
+    """Delete problems not served in ``idle_days`` (with their solutions).
+
+    Works in batches of least-recently-used ids so no single statement
+    holds locks on a large part of the table.
+    """
+    tracker.flush()
+    cutoff = timezone.now() - timedelta(days=idle_days)
+    deleted = 0
+    while True:
+        ids = list(
+            MathProblem.objects.filter(last_accessed__lt=cutoff)
+            .order_by('last_accessed').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        MathProblem.objects.filter(id__in=ids, last_accessed__lt=cutoff).delete()
+        deleted += len(ids)
@@ -227,6 +227,10 @@ class MathAgent:
                 messages.append(HumanMessage(content=chat['question']))
                 messages.append(AIMessage(content=chat['response']))
 
+            image = context.get('image')
+            if image:
+                return await self._solve_with_image(messages, question, image)
+
             # Add current question
             messages.append(HumanMessage(content=question))
 
@@ -235,7 +239,8 @@ class MathAgent:
 
             return {
                 "solution": response.content,
-                "context": messages
+                "context": messages,
+                "usage": getattr(response, 'usage_metadata', None) or {}
             }
 
         except Exception as e:
@@ -245,3 +250,32 @@ class MathAgent:
                 "context": []
             }
 
+    async def _solve_with_image(self, messages: list, question: str, image_url: str) -> dict:
+        """Same conversation, sent to the vision model with the image attached."""
+        from .vision import VISION_MODEL, create_vision_completion
+
+        roles = {SystemMessage: 'system', HumanMessage: 'user', AIMessage: 'assistant'}
+        payload = [{'role': roles[type(message)], 'content': message.content} for message in messages]
+        payload.append({
+            'role': 'user',
+            'content': [
+                {'type': 'text', 'text': question},
+                {'type': 'image_url', 'image_url': {'url': image_url}},
+            ]
+        })
+        response = await create_vision_completion(
+            model=VISION_MODEL,
+            messages=payload,
+            max_tokens=1000,
+            temperature=0.2,
+        )
+        usage = response.usage
+        return {
+            "solution": response.choices[0].message.content,
+            "context": messages,
+            "usage": {
+                'input_tokens': usage.prompt_tokens,
+                'output_tokens': usage.completion_tokens,
+            } if usage else {}
+        }
+
@@ -6,9 +6,10 @@ from langchain_core.messages import HumanMessage, AIMessage
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 import base64
-from openai import OpenAI
 import os
 
+from .vision import VISION_MODEL, create_vision_completion
+
 def get_openai_api_key():
     """Get OpenAI API key from settings"""
     return getattr(settings, 'OPENAI_API_KEY', os.getenv('OPENAI_API_KEY'))
@@ -26,7 +27,6 @@ class MathAgent:
         )
         self.chat_history = []
         self.tools = self._create_tools()
-        self.client = OpenAI(api_key=api_key)
 
     def _create_tools(self) -> Dict[str, str]:
         return {
@@ -83,8 +83,8 @@ class MathAgent:
 
             # Get response
             if image_content:
-                response = await self.client.chat.completions.create(
-                    model="gpt-4",
+                response = await create_vision_completion(
+                    model=VISION_MODEL,
                     messages=messages,
                     max_tokens=1000
                 )
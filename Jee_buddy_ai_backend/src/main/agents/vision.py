@@ -0,0 +1,52 @@
+import asyncio
+import os
+import threading
+
+from django.conf import settings
+from openai import AsyncOpenAI
+
+VISION_MODEL = 'gpt-4o'
+
+# The shared client and the loop it lives on, started on first use
+_loop = None
+_loop_lock = threading.Lock()
+_client = None
+
+
+def _new_client() -> AsyncOpenAI:
+    api_key = getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY is not set")
+    return AsyncOpenAI(api_key=api_key)
+
+
+def _client_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='vision-client', daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+async def _create(kwargs) -> object:
+    # Only ever runs on the client loop, so there is no race on _client.
+    global _client
+    if _client is None:
+        _client = _new_client()
+    return await _client.chat.completions.create(**kwargs)
+
+
+async def create_vision_completion(**kwargs):
+    """``chat.completions.create`` on the process-wide AsyncOpenAI client.
+
+    Under WSGI (gunicorn, Vercel, core.wsgi_bridge) every async view runs on
+    its own short-lived event loop, and an httpx pool cannot be used from a
+    loop other than the one it was opened on. So the one client, and its
+    connection pool, live on a background loop for the life of the process;
+    callers on any loop hand the request to it and await the result.
+    Cancelling the caller cancels the request.
+    """
+    future = asyncio.run_coroutine_threadsafe(_create(kwargs), _client_loop())
+    return await asyncio.wrap_future(future)
@@ -1,30 +1,54 @@
 import streamlit as st
+import asyncio
 import os
-from typing import Dict
-import PyPDF2
-from openai import OpenAI
+from functools import partial
+from typing import Dict, List, Optional
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 import tempfile
 
+try:
+    from main.chapter_analysis import DEFAULT_CONCURRENCY, CallThrottle, ProgressCallback, analyze_chapters
+    from main.pdf_pages import DEFAULT_CACHE_DIR, iter_pdf_pages
+except ImportError:
+    # `streamlit run main/book_summarizer.py` puts this directory on the path
+    from chapter_analysis import DEFAULT_CONCURRENCY, CallThrottle, ProgressCallback, analyze_chapters
+    from pdf_pages import DEFAULT_CACHE_DIR, iter_pdf_pages
+
+# analyze_book_structure only sends this much of the book
+STRUCTURE_SAMPLE_CHARS = 4000
+
 class BookSummarizer:
-    def __init__(self):
+    def __init__(self, page_cache_dir: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 requests_per_minute: Optional[int] = None):
         load_dotenv()
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # Extracted page text is cached here, keyed by file hash
+        self.page_cache_dir = page_cache_dir or os.getenv('BOOK_PAGE_CACHE_DIR', DEFAULT_CACHE_DIR)
+        # Chapter analyses run concurrently, within these limits
+        self.max_concurrency = max_concurrency or int(os.getenv('BOOK_SUMMARY_CONCURRENCY', DEFAULT_CONCURRENCY))
+        self.requests_per_minute = requests_per_minute or int(os.getenv('BOOK_SUMMARY_RPM', '0')) or None
         
     def read_pdf(self, pdf_path: str) -> Dict[str, str]:
         """Extract text from PDF file and organize by chapters"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # First pass: Get table of contents or identify chapter markers
-                full_text = ""
-                for page in pdf_reader.pages:
-                    full_text += page.extract_text() + "\n"
-                
-                # Use GPT to identify book structure
-                book_structure = self.analyze_book_structure(full_text)
-                return book_structure
+            # First pass: the opening pages carry the table of contents or
+            # chapter markers, and are all the structure analysis reads.
+            sample = []
+            sample_chars = 0
+            pages = iter_pdf_pages(pdf_path, self.page_cache_dir)
+            try:
+                for text in pages:
+                    sample.append(text + "\n")
+                    sample_chars += len(text) + 1
+                    if sample_chars >= STRUCTURE_SAMPLE_CHARS:
+                        break
+            finally:
+                pages.close()
+
+            # Use GPT to identify book structure
+            book_structure = self.analyze_book_structure("".join(sample))
+            return book_structure
                 
         except Exception as e:
             print(f"Error reading PDF: {e}")
@@ -56,23 +80,28 @@ class BookSummarizer:
             print(f"Error in book structure analysis: {e}")
             return {"Main Content": text}
 
-    def create_comprehensive_summary(self, book_structure: Dict[str, str]) -> Dict[str, str]:
+    def create_comprehensive_summary(self, book_structure: Dict[str, str],
+                                     on_progress: Optional[ProgressCallback] = None) -> Dict[str, str]:
         """Create a comprehensive summary of the entire book"""
-        comprehensive_summary = {}
-        
-        # First, get an overview of the entire book
-        book_overview = self.generate_book_overview(book_structure)
-        comprehensive_summary["Book Overview"] = book_overview
-        
-        # Then analyze each chapter in detail
-        for chapter, content in book_structure.items():
-            chapter_summary = self.analyze_chapter(chapter, content)
-            comprehensive_summary[chapter] = chapter_summary
-            
-        return comprehensive_summary
+        return asyncio.run(self.acreate_comprehensive_summary(book_structure, on_progress))
 
-    def generate_book_overview(self, book_structure: Dict[str, str]) -> str:
-        """Generate an overview of the entire book"""
+    async def acreate_comprehensive_summary(self, book_structure: Dict[str, str],
+                                            on_progress: Optional[ProgressCallback] = None) -> Dict[str, str]:
+        """The book overview and every chapter analysis, run concurrently.
+
+        Chapters come back in book order; ``on_progress`` is called as each
+        chapter analysis finishes.
+        """
+        throttle = CallThrottle(self.max_concurrency, self.requests_per_minute)
+        # A client per call: its connection pool must not outlive the event loop.
+        async with AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY')) as client:
+            book_overview, chapter_summaries = await asyncio.gather(
+                throttle.run(self.agenerate_book_overview, client, book_structure),
+                analyze_chapters(book_structure, partial(self.aanalyze_chapter, client), throttle, on_progress),
+            )
+        return {"Book Overview": book_overview, **chapter_summaries}
+
+    def _overview_messages(self, book_structure: Dict[str, str]) -> List[Dict[str, str]]:
         chapters = list(book_structure.keys())
         overview_prompt = f"""Create a comprehensive overview of this textbook based on its chapters:
         {', '.join(chapters)}
@@ -84,14 +113,17 @@ class BookSummarizer:
         4. Key concepts that span multiple chapters
         5. Prerequisites and target audience
         """
-        
+        return [
+            {"role": "system", "content": "You are an expert at creating educational content overviews."},
+            {"role": "user", "content": overview_prompt}
+        ]
+
+    async def agenerate_book_overview(self, client: AsyncOpenAI, book_structure: Dict[str, str]) -> str:
+        """Generate an overview of the entire book"""
         try:
-            response = self.client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert at creating educational content overviews."},
-                    {"role": "user", "content": overview_prompt}
-                ],
+                messages=self._overview_messages(book_structure),
                 temperature=0.3,
                 max_tokens=1000
             )
@@ -100,8 +132,7 @@ class BookSummarizer:
             print(f"Error generating book overview: {e}")
             return ""
 
-    def analyze_chapter(self, chapter: str, content: str) -> str:
-        """Analyze a single chapter in detail"""
+    def _chapter_messages(self, chapter: str, content: str) -> List[Dict[str, str]]:
         chapter_prompt = f"""Analyze this chapter: {chapter}
 
         Provide a detailed breakdown including:
@@ -129,20 +160,23 @@ class BookSummarizer:
         Content:
         {content}
         """
-        
+        return [
+            {"role": "system", "content": "You are an expert textbook analyst and educator."},
+            {"role": "user", "content": chapter_prompt}
+        ]
+
+    async def aanalyze_chapter(self, client: AsyncOpenAI, chapter: str, content: str) -> str:
+        """Analyze a single chapter in detail"""
         try:
-            response = self.client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert textbook analyst and educator."},
-                    {"role": "user", "content": chapter_prompt}
-                ],
+                messages=self._chapter_messages(chapter, content),
                 temperature=0.4,
                 max_tokens=2000
             )
             return response.choices[0].message.content
         except Exception as e:
-            print(f"Error analyzing chapter: {e}")
+            print(f"Error analyzing chapter {chapter}: {e}")
             return ""
 
 def main():
@@ -188,8 +222,13 @@ def main():
                 status_text.text("Analyzing content...")
                 progress_bar.progress(50)
 
-                # Create comprehensive summary
-                comprehensive_summary = summarizer.create_comprehensive_summary(book_structure)
+                # Create comprehensive summary, moving the bar from 50 to 80
+                # as chapter analyses finish
+                def chapter_done(done, total, chapter):
+                    status_text.text(f"Analyzed {chapter} ({done}/{total})")
+                    progress_bar.progress(50 + 30 * done // total)
+
+                comprehensive_summary = summarizer.create_comprehensive_summary(book_structure, chapter_done)
                 
                 # Update progress
                 status_text.text("Generating final summary...")
@@ -0,0 +1,77 @@
+"""Concurrent, order-preserving chapter analysis for the book summarizer.
+
+Each chapter is one independent model call, so a long book is limited by
+how many calls the API lets us make at once, not by any one call.
+``CallThrottle`` bounds both: at most ``concurrency`` calls in flight, and
+call starts spaced so they never exceed ``requests_per_minute``.
+``analyze_chapters`` runs every chapter through it and returns the
+analyses in the book's chapter order, whatever order they finish in.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 5
+
+# Called as (chapters done, total chapters, chapter just finished)
+ProgressCallback = Callable[[int, int, str], None]
+
+
+class CallThrottle:
+    """Caps calls in flight and, optionally, call starts per minute."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, requests_per_minute: Optional[int] = None):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 60 / requests_per_minute if requests_per_minute else 0
+        self._next_start = 0.0
+
+    async def _wait_turn(self):
+        if not self._interval:
+            return
+        # No await between reading and advancing the slot, so concurrent
+        # callers each get their own.
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start)
+        self._next_start = start + self._interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def run(self, fn: Callable[..., Awaitable], *args):
+        async with self._semaphore:
+            await self._wait_turn()
+            return await fn(*args)
+
+
+async def analyze_chapters(chapters: Dict[str, str], analyze: Callable[[str, str], Awaitable[str]],
+                           throttle: CallThrottle, on_progress: Optional[ProgressCallback] = None) -> Dict[str, str]:
+    """Run ``analyze(chapter, content)`` for every chapter, concurrently.
+
+    Returns ``{chapter: analysis}`` in the order of ``chapters``.
+    ``on_progress`` is called on the event loop as each chapter finishes.
+    If one analysis raises, the rest are cancelled and the error propagates.
+    """
+    total = len(chapters)
+    done = 0
+
+    async def run(chapter: str, content: str) -> str:
+        nonlocal done
+        analysis = await throttle.run(analyze, chapter, content)
+        done += 1
+        if on_progress:
+            try:
+                on_progress(done, total, chapter)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {str(e)}")
+        return analysis
+
+    tasks = [asyncio.create_task(run(chapter, content)) for chapter, content in chapters.items()]
+    try:
+        analyses = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return dict(zip(chapters, analyses))
@@ -0,0 +1,307 @@
+# Vendored from math_solver/app/services/image_enhance.py by
+# scripts/vendor_image_enhance.py. Do not edit; change the original.
+"""Crop problem photos to the question before they go to the vision model.
+
+Find the text and diagrams, crop to them, level the page, even out the
+lighting and binarize when nothing would be lost. See ``enhance_image``.
+
+Self-contained (PIL and numpy only): the Django backend vendors this file
+unchanged as main/image_enhance.py, via its scripts/vendor_image_enhance.py.
+"""
+from PIL import Image, ImageFilter
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import math
+import numpy as np
+
+# Long side of the grayscale copy the layout and skew are measured on
+ANALYSIS_SIZE = 1024
+# Long side the paper (background) brightness is estimated at
+PAPER_SIZE = 256
+# Layout cell, in analysis pixels
+CELL = 16
+# A pixel is ink when it is this much darker than the paper around it
+INK_MIN_DELTA = 24
+INK_CONTRAST = 0.2
+# Cells with less ink are empty; with more they are texture (desk, fabric)
+CELL_MIN_INK = 0.012
+CELL_MAX_INK = 0.6
+# Neighbourhoods darker than this share of the brightest paper, or of the
+# paper estimate around them, are off the page
+OFF_PAPER = 0.4
+OFF_LOCAL_PAPER = 0.5
+# Blocks further apart than this many cells belong to separate regions
+CELL_GAP = 2
+# Regions with less ink than this share of the main one are dropped
+# when they touch the frame (desk edges, shadows, fingers)
+MIN_REGION_INK = 0.2
+PAD = 12
+MAX_SKEW = 10.0
+MIN_SKEW = 0.4
+# Colour is kept when this share of the ink is saturated
+COLOR_INK_SHARE = 0.1
+# Images more than this share ink are pictures, not writing; never binarized
+BINARIZE_MAX_INK = 0.3
+# Binarizing is skipped if it would drop more than this share of the ink
+# (faint or hairline strokes, such as a minus sign at low resolution)
+MAX_LOST_INK = 0.01
+# Shrinking this much more is worth it to drop a row or column of tiles
+TILE_SLACK = 0.9
+
+
+@dataclass
+class Enhancement:
+    # Crop of the input image, before deskewing
+    box: Tuple[int, int, int, int]
+    # Counter-clockwise rotation applied, in degrees
+    angle: float
+    # Crop of the rotated image
+    trim: Tuple[int, int, int, int]
+    binarized: bool
+    # Output pixels (before downscaling) over input pixels
+    area_ratio: float
+
+    @property
+    def reframed(self) -> bool:
+        """Cropped or rotated enough that the original is worth replacing."""
+        return self.area_ratio < 0.9 or self.angle != 0.0
+
+
+def _resized(image: Image.Image, long_side: int) -> Image.Image:
+    scale = long_side / max(image.size)
+    if scale >= 1:
+        return image
+    return image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BOX)
+
+
+def vision_scale(width: int, height: int) -> float:
+    """How far GPT-4o shrinks a high-detail image before tiling it: to fit
+    2048x2048, then to a short side of 768."""
+    scale = min(1.0, 2048 / max(width, height))
+    return scale * min(1.0, 768 / (min(width, height) * scale))
+
+
+def vision_image_tokens(width: int, height: int) -> int:
+    """Tokens GPT-4o charges for one high-detail image: 85 plus 170 per
+    512px tile, after ``vision_scale``."""
+    scale = vision_scale(width, height)
+    return 85 + 170 * math.ceil(width * scale / 512) * math.ceil(height * scale / 512)
+
+
+def _dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    # A box blur is non-zero wherever the window holds any ink, and unlike
+    # a rank filter its cost does not grow with the window.
+    blurred = Image.fromarray((mask * 255).astype(np.uint8)).filter(ImageFilter.BoxBlur(radius))
+    return np.asarray(blurred) > 0
+
+
+def _paper(gray: Image.Image) -> np.ndarray:
+    """Local paper brightness: a max filter wide enough to step over strokes."""
+    small = _resized(gray, PAPER_SIZE).filter(ImageFilter.MaxFilter(7)).filter(ImageFilter.BoxBlur(3))
+    return np.asarray(small.resize(gray.size, Image.BILINEAR), dtype=np.float32)
+
+
+def _ink(gray: Image.Image, paper: np.ndarray) -> np.ndarray:
+    pixels = np.asarray(gray, dtype=np.float32)
+    ink = (paper - pixels) > np.maximum(INK_MIN_DELTA, INK_CONTRAST * paper)
+    # Ink only counts on the page: whole dark neighbourhoods are desk or
+    # shadow, and the band along the page edge would otherwise look like a
+    # ruled line.
+    local = np.asarray(gray.filter(ImageFilter.BoxBlur(6)), dtype=np.float32)
+    off_page = (local < OFF_PAPER * np.percentile(paper, 99)) | (local < OFF_LOCAL_PAPER * paper)
+    return ink & ~_dilate(off_page, 8)
+
+
+def _components(active: np.ndarray) -> List[np.ndarray]:
+    """4-connected components of a small boolean grid, as cell masks."""
+    labels = np.zeros(active.shape, dtype=np.int32)
+    rows, cols = active.shape
+    found = []
+    for start in zip(*np.nonzero(active)):
+        if labels[start]:
+            continue
+        label = len(found) + 1
+        labels[start] = label
+        stack = [start]
+        while stack:
+            r, c = stack.pop()
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < rows and 0 <= nc < cols and active[nr, nc] and not labels[nr, nc]:
+                    labels[nr, nc] = label
+                    stack.append((nr, nc))
+        found.append(labels == label)
+    return found
+
+
+def _content_cells(ink: np.ndarray) -> Optional[np.ndarray]:
+    """Cells holding the question: the inkiest block plus any sizeable
+    block that keeps clear of the frame."""
+    rows, cols = -(-ink.shape[0] // CELL), -(-ink.shape[1] // CELL)
+    padded = np.zeros((rows * CELL, cols * CELL), dtype=np.float32)
+    padded[:ink.shape[0], :ink.shape[1]] = ink
+    density = padded.reshape(rows, CELL, cols, CELL).mean(axis=(1, 3))
+    active = (density > CELL_MIN_INK) & (density < CELL_MAX_INK)
+    if not active.any():
+        return None
+
+    # Grow blocks by the allowed gap so lines of one question join up.
+    grown = active.copy()
+    for _ in range(CELL_GAP):
+        step = grown.copy()
+        step[1:] |= grown[:-1]
+        step[:-1] |= grown[1:]
+        step[:, 1:] |= grown[:, :-1]
+        step[:, :-1] |= grown[:, 1:]
+        grown = step
+
+    regions = []
+    for region in _components(grown):
+        region &= active
+        touches_frame = region[0].any() or region[-1].any() or region[:, 0].any() or region[:, -1].any()
+        regions.append((float((density * region).sum()), touches_frame, region))
+    regions.sort(key=lambda r: r[0], reverse=True)
+    main_ink = regions[0][0]
+    keep = regions[0][2].copy()
+    for region_ink, touches_frame, region in regions[1:]:
+        if region_ink >= MIN_REGION_INK * main_ink and not touches_frame:
+            keep |= region
+    return keep
+
+
+def _skew(mask: Image.Image) -> float:
+    """Rotation that makes text lines horizontal, by projection profile:
+    row sums are sharpest when the lines are level."""
+    def score(angle: float) -> float:
+        rotated = mask.rotate(angle, resample=Image.NEAREST, expand=True) if angle else mask
+        profile = np.asarray(rotated, dtype=np.float64).sum(axis=1)
+        return float(np.square(profile).sum())
+
+    level = score(0.0)
+    if not level:
+        return 0.0
+    best = max(np.arange(-MAX_SKEW, MAX_SKEW + 0.5, 0.5), key=score)
+    best = max(np.arange(best - 0.4, best + 0.45, 0.1), key=score)
+    # Diagrams and single lines have no clear profile; leave those alone.
+    if abs(best) < MIN_SKEW or score(best) < 1.05 * level:
+        return 0.0
+    return round(float(best), 1)
+
+
+def _otsu(pixels: np.ndarray) -> int:
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    weight = np.cumsum(histogram)
+    mass = np.cumsum(histogram * np.arange(256))
+    total, total_mass = weight[-1], mass[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total_mass * weight - mass * total) ** 2 / (weight * (total - weight))
+    return int(np.nanargmax(between))
+
+
+def _normalize(image: Image.Image, binarize: bool) -> Tuple[Image.Image, bool]:
+    """Divide out uneven lighting and stretch ink to black, paper to white.
+
+    Colour is kept if enough of the ink is coloured (graphs, marked
+    answers); otherwise the result is grayscale, and black and white when
+    there is no shading (photos, filled regions) to lose and every stroke
+    survives the threshold.
+    """
+    gray = image.convert("L")
+    paper = np.maximum(_paper(gray), 1.0)
+    ink = _ink(gray, paper)
+    if image.mode == "RGB" and ink.any():
+        channels = np.asarray(image, dtype=np.int16)
+        chroma = channels.max(axis=2) - channels.min(axis=2)
+        if (chroma[ink] > 60).mean() > COLOR_INK_SHARE:
+            flat = np.asarray(image, dtype=np.float32) * (255.0 / paper)[..., None]
+            return Image.fromarray(np.clip(flat, 0, 255).astype(np.uint8), "RGB"), False
+
+    flat = np.clip(np.asarray(gray, dtype=np.float32) * (255.0 / paper), 0, 255)
+    darkest = np.percentile(flat, 0.5)
+    if darkest < 200:
+        flat = np.clip((flat - darkest) * (255.0 / (255.0 - darkest)), 0, 255)
+    flat = flat.astype(np.uint8)
+    if binarize and 0 < ink.mean() < BINARIZE_MAX_INK:
+        black = flat <= _otsu(flat)
+        # Mid-tones away from stroke edges mean shading worth keeping.
+        shading = ((flat > 64) & (flat < 192) & ~_dilate(ink, 2)).mean()
+        lost = np.count_nonzero(ink & ~_dilate(black, 1)) / np.count_nonzero(ink)
+        if shading < 0.01 and lost < MAX_LOST_INK:
+            return Image.fromarray(~black), True
+    return Image.fromarray(flat), False
+
+
+def _fit(width: int, height: int, scale: float, limit: float) -> Tuple[int, int]:
+    """Size for a ``width`` x ``height`` crop: the fewest vision tiles that
+    show it at ``scale`` (or up to ``TILE_SLACK`` below), then as much
+    detail, up to ``limit``, as those tiles hold."""
+    def size(s: float) -> Tuple[int, int]:
+        return max(1, round(width * s)), max(1, round(height * s))
+
+    best = scale * TILE_SLACK
+    budget = min(vision_image_tokens(*size(scale * shrink)) for shrink in np.linspace(1.0, TILE_SLACK, 11))
+    while best < limit:
+        grown = min(limit, best * 1.02)
+        if vision_image_tokens(*size(grown)) > budget:
+            break
+        best = grown
+    return size(best)
+
+
+def enhance_image(image: Image.Image, max_dimension: int, binarize: bool = True) -> Tuple[Image.Image, Enhancement]:
+    """Crop a flattened photo to its text and diagrams, level it and even
+    out the lighting.
+
+    Layout and skew are measured on an ``ANALYSIS_SIZE`` grayscale copy and
+    applied to the full-size image. The crop is then scaled to the detail
+    GPT-4o would have seen in it had the whole photo been downscaled to
+    ``max_dimension`` and sent, and grown to fill the vision tiles that
+    takes, so the model reads the question at the same resolution or
+    better for fewer tiles. Images with no detectable ink are only
+    downscaled. Binarization (when ``binarize`` is set, the image has no
+    shading and the strokes are thick enough) happens after the resize.
+    """
+    width, height = image.size
+    analysis = _resized(image.convert("L"), ANALYSIS_SIZE)
+    scale = width / analysis.width
+    ink = _ink(analysis, _paper(analysis))
+    cells = _content_cells(ink)
+    if cells is None:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        return image, Enhancement((0, 0, width, height), 0.0, (0, 0, width, height), False, 1.0)
+
+    rows, cols = np.nonzero(cells)
+    left = max(0, cols.min() * CELL - PAD)
+    top = max(0, rows.min() * CELL - PAD)
+    right = min(analysis.width, (cols.max() + 1) * CELL + PAD)
+    bottom = min(analysis.height, (rows.max() + 1) * CELL + PAD)
+    kept = np.kron(cells, np.ones((CELL, CELL), dtype=bool))[:ink.shape[0], :ink.shape[1]] & ink
+    mask = Image.fromarray((kept[top:bottom, left:right] * 255).astype(np.uint8))
+    box = (round(left * scale), round(top * scale), min(width, round(right * scale)), min(height, round(bottom * scale)))
+    cropped = image.crop(box)
+
+    angle = _skew(mask)
+    if angle:
+        fill = (255, 255, 255) if cropped.mode == "RGB" else 255
+        cropped = cropped.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+        mask = mask.rotate(angle, resample=Image.NEAREST, expand=True)
+    # Trim to the ink again: the cell grid is coarse, and rotating grows the frame.
+    trim = (0, 0, cropped.width, cropped.height)
+    tight = mask.getbbox()
+    if tight:
+        ratio = cropped.width / mask.width
+        trim = (
+            max(0, round((tight[0] - PAD) * ratio)),
+            max(0, round((tight[1] - PAD) * ratio)),
+            min(cropped.width, round((tight[2] + PAD) * ratio)),
+            min(cropped.height, round((tight[3] + PAD) * ratio)),
+        )
+        cropped = cropped.crop(trim)
+    area_ratio = cropped.width * cropped.height / (width * height)
+
+    fitted = min(1.0, max_dimension / max(width, height))
+    size = _fit(cropped.width, cropped.height, fitted * vision_scale(width * fitted, height * fitted),
+                min(1.0, max_dimension / max(cropped.size)))
+    if size[0] < cropped.width:
+        cropped = cropped.resize(size, Image.LANCZOS)
+    result, binarized = _normalize(cropped, binarize)
+    return result, Enhancement(box, angle, trim, binarized, round(area_ratio, 3))
@@ -0,0 +1,83 @@
+"""Shrink uploaded problem photos before they go to the vision model.
+
+Django's multipart parser has already streamed the upload to memory or a
+temp file; this decodes it (JPEGs in draft mode, at a reduced scale),
+applies EXIF rotation, caps the long side and re-encodes as JPEG. With
+``enhance`` the photo is cropped to the question first (main.image_enhance),
+which cuts the vision tokens for a question photographed on a desk. PIL
+and NumPy release the GIL for the heavy lifting, so a small thread pool
+keeps this off the event loop without a process pool.
+"""
+import asyncio
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'SOLVE_IMAGE_PREP_THREADS', 4),
+            thread_name_prefix='image-prep',
+        )
+    return _executor
+
+
+def prepare_upload(uploaded_file, max_dimension=1600, quality=85, max_pixels=60_000_000, enhance=False):
+    """Return a ``data:`` URL for a Django ``UploadedFile``: JPEG, or PNG
+    when enhancement left it black and white. Raises ValueError."""
+    # Imported here: only image solves pay for PIL and NumPy.
+    from PIL import Image, ImageOps
+
+    from .image_enhance import enhance_image
+
+    try:
+        uploaded_file.seek(0)
+        image = Image.open(uploaded_file)
+        width, height = image.size
+    except Exception:
+        raise ValueError('Invalid image file')
+    if width * height > max_pixels:
+        raise ValueError(f'Image is {width}x{height}; the limit is {max_pixels} pixels')
+
+    try:
+        if image.format == 'JPEG':
+            image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        if not enhance:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        if enhance:
+            # Crops before downscaling, so the question keeps its resolution.
+            image, _ = enhance_image(image, max_dimension)
+        buffered = io.BytesIO()
+        if image.mode == '1':
+            mime_type = 'image/png'
+            image.save(buffered, format='PNG', optimize=True)
+        else:
+            mime_type = 'image/jpeg'
+            image.save(buffered, format='JPEG', quality=quality, optimize=True)
+    except Exception:
+        raise ValueError('Invalid image file')
+    return f"data:{mime_type};base64,{base64.b64encode(buffered.getvalue()).decode('ascii')}"
+
+
+async def aprepare_upload(uploaded_file):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(),
+        lambda: prepare_upload(
+            uploaded_file,
+            max_dimension=getattr(settings, 'SOLVE_IMAGE_MAX_DIMENSION', 1600),
+            max_pixels=getattr(settings, 'SOLVE_IMAGE_MAX_PIXELS', 60_000_000),
+            enhance=getattr(settings, 'SOLVE_IMAGE_ENHANCE', False),
+        ),
+    )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main.access_tracking import evict_idle_problems
+
+
+class Command(BaseCommand):
+    help = "Delete problems (and their solutions) not served in --idle-days days"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--idle-days', type=int, default=180)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = evict_idle_problems(options['idle_days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Evicted {deleted} idle problems"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.problem_import import import_problems, read_problems
+
+
+class Command(BaseCommand):
+    help = "Bulk-load problems from CSV or JSON Lines (question, category, difficulty) via COPY"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--skip-existing', action='store_true',
+                            help="Leave out questions already in the bank")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                read, inserted = import_problems(
+                    read_problems(stream, fmt),
+                    batch_size=options['batch_size'],
+                    skip_existing=options['skip_existing'],
+                )
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {inserted} of {read} problems"))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-19 14:20
+
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_userprofile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(
+                django.db.models.fields.json.KeyTextTransform('subject', 'context'),
+                django.db.models.fields.json.KeyTextTransform('topic', 'context'),
+                name='chat_ctx_subject_topic_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(
+                django.db.models.fields.json.KeyTextTransform('interaction_type', 'context'),
+                name='chat_ctx_interaction_idx',
+            ),
+        ),
+    ]
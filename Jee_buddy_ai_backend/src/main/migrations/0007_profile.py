@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_chathistory_context_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, null=True)),
+                ('email', models.CharField(max_length=255, null=True)),
+                ('current_session_id', models.CharField(max_length=255, null=True)),
+                ('created_at', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'db_table': 'profiles',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.2 on 2026-10-19 16:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models.functions import MD5
+
+# Question text is stemmed as English; categories are matched as-is.
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION main_mathproblem_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.question, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.category, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER main_mathproblem_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF question, category ON main_mathproblem
+    FOR EACH ROW EXECUTE FUNCTION main_mathproblem_search_vector_update();
+
+UPDATE main_mathproblem SET search_vector =
+    setweight(to_tsvector('english', coalesce(question, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(category, '')), 'B');
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS main_mathproblem_search_vector_trigger ON main_mathproblem;
+DROP FUNCTION IF EXISTS main_mathproblem_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_profile'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RemoveIndex(
+            model_name='mathproblem',
+            name='main_mathpr_questio_d847f6_idx',
+        ),
+        migrations.AddField(
+            model_name='mathproblem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+        migrations.AddIndex(
+            model_name='mathproblem',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='mathproblem_search_gin'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='mathproblem',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['question'], name='mathproblem_question_trgm', opclasses=['gin_trgm_ops']
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='mathproblem',
+            index=models.Index(MD5('question'), name='mathproblem_question_md5'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-19 17:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_mathproblem_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mathproblem',
+            name='last_accessed',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='mathproblem',
+            name='access_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='mathproblem',
+            index=models.Index(fields=['-access_count'], name='mathproblem_popular_idx'),
+        ),
+    ]
@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models.fields.json import KT
+from django.db.models.functions import MD5
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 import json
 from django.db import models
@@ -19,7 +23,22 @@ class UserProfile(models.Model):
 
     class Meta:
         db_table = 'chat_profiles'
-        
+
+
+class Profile(models.Model):
+    """Supabase's ``profiles`` table. Supabase owns the schema; we only read
+    it and fill in ``current_session_id``."""
+    uuid = models.UUIDField(primary_key=True)
+    name = models.CharField(max_length=255, null=True)
+    email = models.CharField(max_length=255, null=True)
+    current_session_id = models.CharField(max_length=255, null=True)
+    created_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'profiles'
+
 
 class ChatHistory(models.Model):
     user_id = models.CharField(max_length=255)  # Supabase user ID
@@ -64,14 +83,20 @@ class ChatHistory(models.Model):
         history = cls.objects.filter(
             user_id=user_id,
             session_id=session_id
-        ).order_by('-timestamp')[:limit]
-        
-        return [chat.to_dict() for chat in history]
+        ).order_by('-timestamp').values(
+            'user_id', 'session_id', 'question', 'response', 'context', 'timestamp'
+        )[:limit]
+
+        # Same shape as to_dict(), without building a model instance per row
+        return [{**row, 'timestamp': row['timestamp'].isoformat()} for row in history]
 
     class Meta:
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['user_id', 'session_id', 'timestamp']),
+            # Global analytics filter and group on these context keys.
+            models.Index(KT('context__subject'), KT('context__topic'), name='chat_ctx_subject_topic_idx'),
+            models.Index(KT('context__interaction_type'), name='chat_ctx_interaction_idx'),
         ]
 
 
@@ -81,12 +106,20 @@ class MathProblem(models.Model):
     category = models.CharField(max_length=100)
     difficulty = models.CharField(max_length=50)
     created_at = models.DateTimeField(auto_now_add=True)
-    last_accessed = models.DateTimeField(auto_now=True)
-    
+    # Written in batches by main.access_tracking, not on every save
+    last_accessed = models.DateTimeField(default=timezone.now)
+    access_count = models.PositiveIntegerField(default=0)
+    # Maintained by a database trigger from question and category
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         indexes = [
-            models.Index(fields=['question']),
-            models.Index(fields=['last_accessed'])
+            models.Index(fields=['last_accessed']),
+            models.Index(fields=['-access_count'], name='mathproblem_popular_idx'),
+            GinIndex(fields=['search_vector'], name='mathproblem_search_gin'),
+            GinIndex(fields=['question'], opclasses=['gin_trgm_ops'], name='mathproblem_question_trgm'),
+            # Exact-duplicate lookups by the bulk importer (main.problem_import)
+            models.Index(MD5('question'), name='mathproblem_question_md5'),
         ]
 
 
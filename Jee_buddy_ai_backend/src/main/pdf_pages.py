@@ -0,0 +1,117 @@
+"""Page-by-page PDF text extraction for the book summarizer.
+
+``iter_pdf_pages`` yields each page's text in order, as it is extracted,
+so callers that only need the opening pages never read the rest.
+
+Every extracted page is written to ``<cache_dir>/<sha256 of the file>/``,
+one file per page, so re-running over the same book reads text from disk
+instead of parsing the PDF again. Pages are written atomically, so two runs
+over one book at the same time at worst extract a page twice.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'book_summarizer_pages')
+HASH_CHUNK = 1024 * 1024
+
+# (path, size, mtime) -> sha256, so a file is hashed once per process
+_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_hash(path: str) -> str:
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def _open(path: str):
+    import PyPDF2  # only the summarizer needs it
+
+    return PyPDF2.PdfReader(path)
+
+
+def _write_atomic(path: str, text: str):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class _PageCache:
+    """Per-page text files for one PDF; every method is a no-op without a directory."""
+
+    def __init__(self, cache_dir: Optional[str], key: Optional[str]):
+        self.root = os.path.join(cache_dir, key) if cache_dir and key else None
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+
+    def page_count(self) -> Optional[int]:
+        if not self.root:
+            return None
+        try:
+            with open(os.path.join(self.root, 'pages'), encoding='utf-8') as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def set_page_count(self, count: int):
+        if self.root:
+            _write_atomic(os.path.join(self.root, 'pages'), str(count))
+
+    def get(self, index: int) -> Optional[str]:
+        if not self.root:
+            return None
+        try:
+            with open(os.path.join(self.root, f'{index}.txt'), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, index: int, text: str):
+        if self.root:
+            try:
+                _write_atomic(os.path.join(self.root, f'{index}.txt'), text)
+            except OSError as e:
+                logger.warning(f"Could not cache page {index}: {str(e)}")
+
+
+def iter_pdf_pages(path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Iterator[str]:
+    """Yield the text of each page of the PDF at ``path``, in order.
+
+    ``cache_dir=None`` disables the page cache.
+    """
+    cache = _PageCache(cache_dir, file_hash(path) if cache_dir else None)
+    reader = None
+    count = cache.page_count()
+    if count is None:
+        reader = _open(path)
+        count = len(reader.pages)
+        cache.set_page_count(count)
+
+    # Serve the cached run of pages, then extract from the first gap on.
+    index = 0
+    while index < count:
+        text = cache.get(index)
+        if text is None:
+            break
+        yield text
+        index += 1
+    if index == count:
+        return
+
+    reader = reader or _open(path)
+    for index in range(index, count):
+        text = reader.pages[index].extract_text() or ''
+        cache.put(index, text)
+        yield text
@@ -0,0 +1,93 @@
+"""Bulk-load JEE problems into ``MathProblem`` with ``COPY``.
+
+Rows are streamed from CSV or JSON Lines into a temporary staging table in
+batches, then moved into ``main_mathproblem`` with one ``INSERT ... SELECT``.
+The search trigger fills ``search_vector`` on the way in.
+"""
+import csv
+import io
+import json
+import logging
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('question', 'category', 'difficulty')
+MAX_LENGTHS = {'category': 100, 'difficulty': 50}
+
+CREATE_STAGING_SQL = """
+    CREATE TEMPORARY TABLE mathproblem_import (
+        question text NOT NULL,
+        category text NOT NULL,
+        difficulty text NOT NULL
+    ) ON COMMIT DROP
+"""
+
+COPY_SQL = "COPY mathproblem_import (question, category, difficulty) FROM STDIN WITH (FORMAT csv)"
+
+INSERT_SQL = """
+    INSERT INTO main_mathproblem (question, category, difficulty, created_at, last_accessed, access_count)
+    SELECT DISTINCT ON (s.question) s.question, s.category, s.difficulty, now(), now(), 0
+    FROM mathproblem_import s
+    {where}
+    ORDER BY s.question
+"""
+
+SKIP_EXISTING_SQL = """
+    WHERE NOT EXISTS (
+        SELECT 1 FROM main_mathproblem p
+        WHERE md5(p.question) = md5(s.question) AND p.question = s.question
+    )
+"""
+
+
+def read_problems(stream, fmt):
+    """Yield ``(question, category, difficulty)`` tuples; skips rows without a question."""
+    if fmt == 'jsonl':
+        records = (json.loads(line) for line in stream if line.strip())
+    else:
+        records = csv.DictReader(stream)
+    for record in records:
+        question = (record.get('question') or '').strip()
+        if not question:
+            continue
+        row = [question]
+        for field in FIELDS[1:]:
+            value = (record.get(field) or '').strip()
+            row.append(value[:MAX_LENGTHS[field]])
+        yield tuple(row)
+
+
+def _copy_batch(cursor, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(COPY_SQL, buffer)
+
+
+def import_problems(rows, batch_size=10000, skip_existing=False):
+    """COPY ``rows`` in and insert them. Returns ``(read, inserted)``.
+
+    Everything happens in one transaction, so a failed import leaves the
+    question bank untouched.
+    """
+    read = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(CREATE_STAGING_SQL)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _copy_batch(cursor, batch)
+                read += len(batch)
+                batch = []
+        if batch:
+            _copy_batch(cursor, batch)
+            read += len(batch)
+
+        cursor.execute(INSERT_SQL.format(where=SKIP_EXISTING_SQL if skip_existing else ''))
+        inserted = cursor.rowcount
+
+    logger.info(f"Imported {inserted} of {read} problems")
+    return read, inserted
@@ -0,0 +1,74 @@
+"""Question-bank search: ranked full-text first, trigram fuzzy match as fallback."""
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F
+
+from .access_tracking import record_access
+from .models import MathProblem
+
+SEARCH_CONFIG = 'english'
+MAX_PAGE_SIZE = 50
+RESULT_FIELDS = ('id', 'question', 'category', 'difficulty', 'created_at')
+
+
+def _filtered(category=None, difficulty=None):
+    problems = MathProblem.objects.all()
+    if category:
+        problems = problems.filter(category__iexact=category)
+    if difficulty:
+        problems = problems.filter(difficulty__iexact=difficulty)
+    return problems
+
+
+def fulltext_queryset(text, category=None, difficulty=None):
+    """Matches on the trigger-maintained ``search_vector``, best first."""
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return _filtered(category, difficulty).filter(search_vector=query).annotate(
+        score=SearchRank(F('search_vector'), query, cover_density=True)
+    ).order_by('-score', 'id').values(*RESULT_FIELDS, 'score')
+
+
+def fuzzy_queryset(text, category=None, difficulty=None):
+    """Typo-tolerant matches via the ``gin_trgm_ops`` index on ``question``."""
+    return _filtered(category, difficulty).filter(question__trigram_word_similar=text).annotate(
+        score=TrigramWordSimilarity(text, 'question')
+    ).order_by('-score', 'id').values(*RESULT_FIELDS, 'score')
+
+
+def page_bounds(page, page_size):
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    offset = (page - 1) * page_size
+    # One extra row tells us whether there is a next page without a COUNT(*).
+    return page, page_size, offset, offset + page_size + 1
+
+
+async def search_problems(text, category=None, difficulty=None, page=1, page_size=20, mode=None):
+    """One page of results. ``mode`` is chosen on page 1 (full-text, falling
+    back to fuzzy when nothing matches) and should be passed back for later
+    pages."""
+    page, page_size, start, stop = page_bounds(page, page_size)
+    querysets = {'fulltext': fulltext_queryset, 'fuzzy': fuzzy_queryset}
+    if mode not in querysets:
+        mode = 'fulltext'
+        rows = [row async for row in fulltext_queryset(text, category, difficulty)[start:stop]]
+        if not rows and page == 1:
+            # Nothing matched the stemmed terms: probably a typo or a fragment.
+            mode = 'fuzzy'
+            rows = [row async for row in fuzzy_queryset(text, category, difficulty)[start:stop]]
+    else:
+        rows = [row async for row in querysets[mode](text, category, difficulty)[start:stop]]
+
+    has_next = len(rows) > page_size
+    results = rows[:page_size]
+    for row in results:
+        row['score'] = round(row['score'], 4)
+        row['created_at'] = row['created_at'].isoformat()
+    # Buffered in memory; flushed to last_accessed/access_count in batches.
+    record_access([row['id'] for row in results])
+    return {
+        'mode': mode,
+        'page': page,
+        'page_size': page_size,
+        'has_next': has_next,
+        'results': results,
+    }
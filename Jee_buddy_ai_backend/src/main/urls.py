@@ -5,4 +5,5 @@ from django.views.decorators.csrf import csrf_exempt
 urlpatterns = [
     path('solve-math/', views.solve_math_problem, name='solve_math'),
     path('profile/', views.get_current_profile, name='get_current_profile'),
+    path('problems/search/', views.search_problems_view, name='search_problems'),
 ]
@@ -3,16 +3,21 @@ from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
 from rest_framework import status
-from .agents.math_agent_1 import MathAgent
 import asyncio
 import logging
+import time
 import json
-from .models import ChatHistory, UserProfile
+from .models import ChatHistory, Profile, UserProfile
+from .search import search_problems
+from .image_prep import aprepare_upload
+from core.db_router import replica_reads
+from usage.rollups import record_usage_event
 import base64
 import uuid
-from django.db import connections
 import os
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from django.db.models import F, Q, Count
 from django.db.models.expressions import Case, When
 from django.db.models.functions import Now, Trunc
@@ -29,60 +34,80 @@ def async_view(view_func):
         return asyncio.run(view_func(*args, **kwargs))
     return wrapped_view
 
-@api_view(['GET'])
-def get_current_profile(request):
+PROFILE_FIELDS = ('uuid', 'name', 'email', 'current_session_id', 'created_at', 'updated_at')
+
+
+@require_http_methods(["GET"])
+async def get_current_profile(request):
     """Get user profile from Supabase profiles table"""
     try:
         # Get the user ID from request headers or query params
         user_id = request.GET.get('user_id') or request.headers.get('X-User-Id')
-        
+
         if not user_id:
-            return Response({
+            return JsonResponse({
                 'error': 'User ID is required'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Query the profiles table
-        with connections['default'].cursor() as cursor:
-            cursor.execute("""
-                SELECT uuid, name, email, current_session_id, created_at, updated_at
-                FROM profiles 
-                WHERE uuid = %s
-            """, [user_id])
-            
-            row = cursor.fetchone()
-            
-            if row:
-                profile_data = {
-                    'uuid': row[0],
-                    'name': row[1],
-                    'email': row[2],
-                    'current_session_id': row[3],
-                    'created_at': row[4],
-                    'updated_at': row[5]
-                }
-                
-                # If no session ID exists, generate one and update
-                if not profile_data['current_session_id']:
-                    new_session_id = f"session_{uuid.uuid4().hex[:8]}"
-                    cursor.execute("""
-                        UPDATE profiles 
-                        SET current_session_id = %s,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE uuid = %s
-                    """, [new_session_id, user_id])
-                    profile_data['current_session_id'] = new_session_id
-                
-                return Response(profile_data)
-            
-            return Response({
+            }, status=400)
+
+        profile_data = await Profile.objects.filter(uuid=user_id).values(*PROFILE_FIELDS).afirst()
+        if profile_data is None:
+            return JsonResponse({
                 'error': 'Profile not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-            
+            }, status=404)
+
+        # If no session ID exists, generate one and update
+        if not profile_data['current_session_id']:
+            new_session_id = f"session_{uuid.uuid4().hex[:8]}"
+            await Profile.objects.filter(uuid=user_id).aupdate(
+                current_session_id=new_session_id,
+                updated_at=Now()
+            )
+            profile_data['current_session_id'] = new_session_id
+
+        return JsonResponse(profile_data)
+
     except Exception as e:
         logger.error(f"Error in get_current_profile: {str(e)}", exc_info=True)
-        return Response({
+        return JsonResponse({
             'error': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        }, status=500)
+
+@require_http_methods(["GET"])
+@replica_reads
+async def search_problems_view(request):
+    """Ranked, paginated search over the question bank"""
+    query = (request.GET.get('q') or '').strip()
+    if not query:
+        return JsonResponse({
+            'error': 'Query is required',
+            'details': 'Pass the search text as ?q='
+        }, status=400)
+
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', 20))
+    except ValueError:
+        return JsonResponse({
+            'error': 'Invalid pagination',
+            'details': 'page and page_size must be integers'
+        }, status=400)
+
+    try:
+        results = await search_problems(
+            query[:200],
+            category=request.GET.get('category'),
+            difficulty=request.GET.get('difficulty'),
+            page=page,
+            page_size=page_size,
+            mode=request.GET.get('mode'),
+        )
+        return JsonResponse(results)
+    except Exception as e:
+        logger.error(f"Error in search_problems_view: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': str(e),
+            'details': 'An unexpected error occurred while searching problems.'
+        }, status=500)
 
 # Create async database operations
 @sync_to_async
@@ -111,6 +136,13 @@ def save_chat_interaction(user_id, session_id, question, response, context_data)
         logger.error(f"Error in save_chat_interaction: {str(e)}")
         return None
 
+@sync_to_async
+def record_usage(**event):
+    try:
+        record_usage_event(**event)
+    except Exception as e:
+        logger.error(f"Error in record_usage: {str(e)}")
+
 async def process_math_problem(request_data):
     try:
         # Extract data from request
@@ -139,7 +171,8 @@ async def process_math_problem(request_data):
             'session_id': session_id,
             'chat_history': chat_history,
             'history_limit': history_limit,
-            'image': None,
+            # JPEG data URL, prepared by solve_math_problem from a multipart upload
+            'image': request_data.get('image'),
             'interaction_type': context_data.get('interaction_type', 'solve'),
             'pinnedText': context_data.get('pinnedText', ''),
             'selectedText': context_data.get('selectedText', ''),
@@ -148,8 +181,12 @@ async def process_math_problem(request_data):
         }
 
         # Initialize math agent and get solution
+        # Imported here: langchain/openai add seconds to every cold start.
+        from .agents.math_agent_1 import MathAgent
         agent = await MathAgent.create()
+        started = time.perf_counter()
         solution = await agent.solve(question, context)
+        latency_ms = (time.perf_counter() - started) * 1000
         
         if not solution or not solution.get('solution'):
             return {
@@ -157,6 +194,19 @@ async def process_math_problem(request_data):
                 'details': 'The AI agent failed to generate a response.'
             }, 500
 
+        # Record usage for quotas and stats
+        if user_id:
+            usage = solution.get('usage') or {}
+            await record_usage(
+                user_id=user_id,
+                subject=context.get('subject'),
+                topic=context.get('topic'),
+                interaction_type=context.get('interaction_type'),
+                prompt_tokens=usage.get('input_tokens', 0),
+                completion_tokens=usage.get('output_tokens', 0),
+                latency_ms=latency_ms
+            )
+
         # Save interaction
         if user_id and session_id:
             await save_chat_interaction(
@@ -197,32 +247,57 @@ async def process_math_problem(request_data):
             'details': 'An unexpected error occurred while processing your request.'
         }, 500
 
+def parse_solve_json(body):
+    """Parse a JSON solve payload. Returns ``(data, error_response)``."""
+    try:
+        # Use json.loads with custom parser to handle null values
+        data = json.loads(
+            body,
+            parse_constant=lambda x: None if x.lower() == 'null' else x
+        )
+        logger.info(f"Parsed data: {data}")
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error at position {e.pos}: {e.msg}")
+        logger.error(f"JSON string: {e.doc}")
+        return None, JsonResponse({
+            'error': 'Invalid JSON format',
+            'details': f'JSON parse error at position {e.pos}: {e.msg}'
+        }, status=400)
+    return data, None
+
+
+def parse_solve_multipart(request):
+    """Fields and image of a multipart solve: ``question``, ``context`` (JSON)
+    and ``image``. Returns ``(data, image, error_response)``."""
+    data = {'question': request.POST.get('question')}
+    context = request.POST.get('context')
+    if context is not None:
+        data['context'], error = parse_solve_json(context)
+        if error:
+            return None, None, error
+    return data, request.FILES.get('image'), None
+
+
 @csrf_exempt
-@api_view(['POST'])
-def solve_math_problem(request):
+@require_http_methods(["POST"])
+async def solve_math_problem(request):
+    """Solve a text question (JSON body) or a question with a photo (multipart)"""
     try:
         # Debug logging
         logger.info(f"Request Content-Type: {request.content_type}")
-        
-        # Get the raw request body and clean it
-        body = request.body.decode('utf-8').strip()
-        logger.info(f"Raw request body: {body}")
-        
-        # Try to parse JSON directly from request body
-        try:
-            # Use json.loads with custom parser to handle null values
-            data = json.loads(
-                body,
-                parse_constant=lambda x: None if x.lower() == 'null' else x
-            )
-            logger.info(f"Parsed data: {data}")
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error at position {e.pos}: {e.msg}")
-            logger.error(f"JSON string: {e.doc}")
-            return JsonResponse({
-                'error': 'Invalid JSON format',
-                'details': f'JSON parse error at position {e.pos}: {e.msg}'
-            }, status=400)
+
+        image = None
+        if request.content_type == 'multipart/form-data':
+            # Django streams the upload to memory or a temp file while
+            # parsing; do that on a worker thread, not on the event loop.
+            data, image, error = await sync_to_async(parse_solve_multipart, thread_sensitive=False)(request)
+        else:
+            # Get the raw request body and clean it
+            body = request.body.decode('utf-8').strip()
+            logger.info(f"Raw request body: {body}")
+            data, error = parse_solve_json(body)
+        if error:
+            return error
 
         # Validate required fields
         if not isinstance(data, dict):
@@ -231,7 +306,7 @@ def solve_math_problem(request):
                 'details': 'Request body must be a JSON object'
             }, status=400)
 
-        if 'question' not in data:
+        if not data.get('question'):
             return JsonResponse({
                 'error': 'Missing required field',
                 'details': 'Question field is required'
@@ -249,12 +324,25 @@ def solve_math_problem(request):
             if 'image' in context and context['image'] == 'null':
                 context['image'] = None
 
-        # Run async process in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        response_data, status_code = loop.run_until_complete(process_math_problem(data))
-        loop.close()
+        # Images only come from a multipart upload, checked and re-encoded
+        # below; never forward one a JSON body names.
+        data.pop('image', None)
+        if image is not None:
+            max_bytes = getattr(settings, 'SOLVE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+            if image.size > max_bytes:
+                return JsonResponse({
+                    'error': 'Image too large',
+                    'details': f'Images are limited to {max_bytes // (1024 * 1024)} MB'
+                }, status=413)
+            try:
+                data['image'] = await aprepare_upload(image)
+            except ValueError as e:
+                return JsonResponse({
+                    'error': 'Invalid image',
+                    'details': str(e)
+                }, status=400)
 
+        response_data, status_code = await process_math_problem(data)
         return JsonResponse(response_data, status=status_code)
             
     except Exception as e:
@@ -0,0 +1,177 @@
+"""Worker-local cache of plan entitlements and daily solve usage.
+
+Lookups are dictionary reads. Entries older than the TTL are still served
+while a background thread reloads them from the database, so only a user's
+first request on a worker pays for a query.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from typing import Callable, Dict, Optional
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .plans import DAILY_SOLVE_LIMITS, plan_key
+
+logger = logging.getLogger(__name__)
+
+# Cache keys for callers without a user id start with this
+ANONYMOUS_PREFIX = 'anonymous:'
+
+
+@dataclass
+class Entitlement:
+    plan: str
+    daily_limit: Optional[int]
+    used_today: int
+    day: object
+    fetched_at: float
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.daily_limit is None:
+            return None
+        return max(self.daily_limit - self.used_today, 0)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.daily_limit is not None and self.used_today >= self.daily_limit
+
+
+def start_of_day(now=None) -> datetime:
+    now = now or timezone.now()
+    return datetime.combine(now.date(), dt_time.min, tzinfo=dt_timezone.utc)
+
+
+def seconds_until_reset(now=None) -> int:
+    now = now or timezone.now()
+    return int((start_of_day(now) + timedelta(days=1) - now).total_seconds()) + 1
+
+
+def load_entitlement(user_id: str) -> Entitlement:
+    """Read a user's active plan and today's solve count from the database."""
+    from usage.rollups import requests_today
+    from .models import Subscription
+
+    now = timezone.now()
+    if user_id.startswith(ANONYMOUS_PREFIX):
+        # Anonymous solves are not recorded, so only this worker's count exists.
+        return Entitlement(plan='ANONYMOUS', daily_limit=DAILY_SOLVE_LIMITS['ANONYMOUS'],
+                           used_today=0, day=now.date(), fetched_at=time.monotonic())
+
+    plan_id = Subscription.objects.filter(
+        user_id=user_id,
+        status='active',
+        valid_till__gt=now,
+    ).order_by('-created_at').values_list('plan_id', flat=True).first()
+    plan = plan_key(plan_id)
+
+    used_today = requests_today(user_id, now=now)
+
+    return Entitlement(
+        plan=plan,
+        daily_limit=DAILY_SOLVE_LIMITS[plan],
+        used_today=used_today,
+        day=now.date(),
+        fetched_at=time.monotonic(),
+    )
+
+
+def _load_in_thread(loader, user_id):
+    # Refresh threads live outside the request cycle, so they have to clean
+    # up their own connections.
+    close_old_connections()
+    try:
+        return loader(user_id)
+    finally:
+        close_old_connections()
+
+
+class EntitlementCache:
+    """Stale-while-revalidate cache keyed by user id."""
+
+    def __init__(self, ttl: float = 30.0, loader: Callable[[str], Entitlement] = load_entitlement,
+                 max_entries: int = 10000):
+        self.ttl = ttl
+        self.loader = loader
+        self.max_entries = max_entries
+        self._entries: Dict[str, Entitlement] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='entitlements')
+
+    def get(self, user_id: str) -> Entitlement:
+        entry = self.peek(user_id)
+        if entry is None:
+            entry = self.load(user_id)
+        return entry
+
+    def peek(self, user_id: str) -> Optional[Entitlement]:
+        """The cached entry, or None on a miss. Never blocks on the database."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        today = timezone.now().date()
+        if entry.day != today:
+            with self._lock:
+                entry.day, entry.used_today = today, 0
+        if time.monotonic() - entry.fetched_at > self.ttl:
+            self._schedule_refresh(user_id)
+        return entry
+
+    def load(self, user_id: str) -> Entitlement:
+        """Read the entry through the loader and cache it."""
+        entry = self.loader(user_id)
+        self._store(user_id, entry)
+        return entry
+
+    def consume(self, user_id: str):
+        """Count one solve if quota allows. Returns ``(admitted, entitlement)``."""
+        entry = self.get(user_id)
+        with self._lock:
+            if entry.exhausted:
+                return False, entry
+            entry.used_today += 1
+        return True, entry
+
+    def refund(self, user_id: str):
+        """Give back a solve counted by ``consume`` that did not go through."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            with self._lock:
+                entry.used_today = max(entry.used_today - 1, 0)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def _store(self, user_id: str, fresh: Entitlement):
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current is not None and current.day == fresh.day:
+                # Admissions counted locally may not be in the database yet.
+                fresh.used_today = max(fresh.used_today, current.used_today)
+            if current is None and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user_id] = fresh
+
+    def _schedule_refresh(self, user_id: str):
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+        future = self._executor.submit(_load_in_thread, self.loader, user_id)
+        future.add_done_callback(lambda f: self._finish_refresh(user_id, f))
+
+    def _finish_refresh(self, user_id: str, future):
+        try:
+            self._store(user_id, future.result())
+        except Exception as e:
+            logger.error(f"Error refreshing entitlement for {user_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(user_id)
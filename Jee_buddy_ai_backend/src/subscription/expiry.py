@@ -0,0 +1,38 @@
+"""Set-based expiry of lapsed subscriptions.
+
+Once this runs on a schedule, ``status='active'`` can be trusted by readers
+instead of each one re-deriving expiry from ``valid_till``.
+"""
+import logging
+
+from django.utils import timezone
+
+from .models import Subscription
+
+logger = logging.getLogger(__name__)
+
+
+def expire_subscriptions(batch_size: int = 1000, now=None) -> int:
+    """Mark active subscriptions past ``valid_till`` as expired.
+
+    Each batch is a single ``UPDATE ... WHERE id IN (SELECT ... LIMIT n)``
+    served by the partial ``sub_active_valid_till_idx`` index, so
+    locks stay short on a large table. Returns the number of rows changed.
+    """
+    now = now or timezone.now()
+    total = 0
+    while True:
+        batch = Subscription.objects.filter(
+            status='active',
+            valid_till__lt=now,
+        ).order_by('valid_till').values('pk')[:batch_size]
+        updated = Subscription.objects.filter(
+            pk__in=batch,
+            status='active',
+        ).update(status='expired', updated_at=now)
+        total += updated
+        if updated < batch_size:
+            break
+
+    logger.info(f"Expired {total} subscriptions")
+    return total
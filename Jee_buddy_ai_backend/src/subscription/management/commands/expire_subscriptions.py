@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from subscription.expiry import expire_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Transition active subscriptions past valid_till to expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        changed = expire_subscriptions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Expired {changed} subscriptions"))
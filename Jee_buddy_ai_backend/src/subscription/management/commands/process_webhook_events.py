@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from subscription.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply queued Razorpay webhook events to subscriptions in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the inbox instead of exiting when it is empty',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to sleep when the inbox is drained (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            processed = process_pending_events(batch_size=batch_size)
+            total += processed
+            if processed < batch_size:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} webhook events"))
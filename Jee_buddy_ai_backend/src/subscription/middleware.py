@@ -0,0 +1,141 @@
+import json
+import logging
+
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+
+from .entitlements import ANONYMOUS_PREFIX, EntitlementCache, seconds_until_reset
+
+logger = logging.getLogger(__name__)
+
+
+def get_verified_user_id(request):
+    """User id (``sub``) of a valid Supabase bearer token, else None."""
+    secret = getattr(settings, 'SUPABASE_JWT_SECRET', None)
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if not secret or scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        claims = jwt.decode(token, secret, algorithms=['HS256'],
+                            audience=getattr(settings, 'SUPABASE_JWT_AUDIENCE', 'authenticated'))
+    except jwt.InvalidTokenError as e:
+        logger.info(f"Rejected bearer token: {str(e)}")
+        return None
+    return claims.get('sub') or None
+
+
+def get_request_user_id(request):
+    """User id from the X-User-Id header or the solve payload's context.
+
+    Claimed by the client and not verified; never use it for quotas.
+    """
+    user_id = request.headers.get('X-User-Id')
+    if user_id:
+        return user_id
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body or b'{}')
+        elif request.content_type == 'multipart/form-data':
+            # Parses (and spools) the upload; the view reuses request.POST/FILES.
+            data = {'context': json.loads(request.POST.get('context') or '{}')}
+        else:
+            return None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if isinstance(data, dict) and isinstance(data.get('context'), dict):
+        return data['context'].get('user_id')
+    return None
+
+
+class EntitlementMiddleware:
+    """Reject solve requests over the caller's plan quota before the LLM runs.
+
+    Quotas follow the ``sub`` of a verified Supabase bearer token. Requests
+    without one fall under the ANONYMOUS plan, keyed by client address: an
+    ``X-User-Id`` header or ``context.user_id`` is claimed by the client, so
+    trusting it would hand out a fresh quota per made-up id. Callers sharing
+    an address (NAT, or every request when a proxy hides client addresses)
+    share that quota. A solve is counted when it is admitted and given back
+    if the view answers with an error, so failed solves cost no quota.
+
+    Supports both sync and async request paths so async views below it are
+    not forced back onto a thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.gated_paths = set(getattr(settings, 'ENTITLEMENT_GATED_PATHS', ['/api/solve-math/']))
+        self.cache = EntitlementCache(ttl=getattr(settings, 'ENTITLEMENT_CACHE_TTL', 30))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._is_gated(request):
+            return self.get_response(request)
+
+        key = self._key(request)
+        entitlement, rejection = self._admit(key)
+        if rejection is not None:
+            return rejection
+        response = self.get_response(request)
+        return self._settle(response, key, entitlement)
+
+    async def __acall__(self, request):
+        if not self._is_gated(request):
+            return await self.get_response(request)
+
+        key = self._key(request)
+        if self.cache.peek(key) is None:
+            # Only a miss hits the database; keep that off the event loop.
+            try:
+                await sync_to_async(self.cache.load)(key)
+            except Exception as e:
+                logger.error(f"Entitlement check failed for {key}: {str(e)}")
+                return await self.get_response(request)
+        entitlement, rejection = self._admit(key)
+        if rejection is not None:
+            return rejection
+        response = await self.get_response(request)
+        return self._settle(response, key, entitlement)
+
+    def _is_gated(self, request):
+        return request.method == 'POST' and request.path in self.gated_paths
+
+    def _key(self, request):
+        return get_verified_user_id(request) or f"{ANONYMOUS_PREFIX}{request.META.get('REMOTE_ADDR', '')}"
+
+    def _admit(self, key):
+        """Returns ``(entitlement, None)`` to proceed or ``(None, response)``."""
+        try:
+            admitted, entitlement = self.cache.consume(key)
+        except Exception as e:
+            # Fail open: a database hiccup must not take the tutor down.
+            logger.error(f"Entitlement check failed for {key}: {str(e)}")
+            return None, None
+
+        if not admitted:
+            response = JsonResponse({
+                'error': 'Quota exceeded',
+                'details': f'The {entitlement.plan} plan allows {entitlement.daily_limit} AI requests per day.',
+                'plan': entitlement.plan,
+                'daily_limit': entitlement.daily_limit,
+                'remaining': 0
+            }, status=429)
+            response['Retry-After'] = str(seconds_until_reset())
+            return None, response
+        return entitlement, None
+
+    def _settle(self, response, key, entitlement):
+        if entitlement is None:
+            return response
+        if response.status_code >= 400:
+            self.cache.refund(key)
+        if entitlement.daily_limit is not None:
+            response['X-Quota-Remaining'] = str(entitlement.remaining)
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("subscription", "0002_subscription_last_event_at_webhookevent"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                condition=models.Q(("status", "active")),
+                fields=["valid_till"],
+                name="sub_active_valid_till_idx",
+            ),
+        ),
+    ]
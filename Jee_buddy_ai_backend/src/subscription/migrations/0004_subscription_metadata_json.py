@@ -0,0 +1,67 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:20
+
+import json
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 500
+
+
+def normalize_metadata(raw):
+    """Parse the old json.dumps text into ``{"subscription": ..., "payment": ...}``."""
+    if not raw:
+        return None
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return {'raw': raw}
+    if not isinstance(data, dict):
+        return {'raw': data}
+    if 'razorpay_details' in data:
+        # Written by the payment callback.
+        return {
+            'subscription': data.get('razorpay_details') or {},
+            'payment': data.get('payment_details') or {},
+            'signature': data.get('signature'),
+        }
+    # Written by create_subscription: the bare Razorpay subscription entity.
+    return {'subscription': data}
+
+
+def backfill_metadata(apps, schema_editor):
+    Subscription = apps.get_model('subscription', 'Subscription')
+    last_pk = 0
+    while True:
+        rows = list(
+            Subscription.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'metadata')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        updates = [
+            Subscription(pk=pk, metadata_json=normalize_metadata(raw))
+            for pk, raw in rows
+        ]
+        # One short transaction per batch keeps row locks brief on a live table.
+        with transaction.atomic():
+            Subscription.objects.bulk_update(updates, ['metadata_json'])
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("subscription", "0003_subscription_active_valid_till_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subscription",
+            name="metadata_json",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_metadata, migrations.RunPython.noop),
+    ]
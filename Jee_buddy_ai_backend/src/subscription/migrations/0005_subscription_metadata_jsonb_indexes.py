@@ -0,0 +1,55 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:20
+
+import django.contrib.postgres.indexes
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("subscription", "0004_subscription_metadata_json"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="subscription",
+            name="metadata",
+        ),
+        migrations.RenameField(
+            model_name="subscription",
+            old_name="metadata_json",
+            new_name="metadata",
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["metadata"],
+                name="sub_metadata_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                django.db.models.fields.json.KeyTextTransform(
+                    "email",
+                    django.db.models.fields.json.KeyTransform(
+                        "notes",
+                        django.db.models.fields.json.KeyTransform("subscription", "metadata"),
+                    ),
+                ),
+                name="sub_meta_email_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                django.db.models.fields.json.KeyTextTransform(
+                    "plan_id",
+                    django.db.models.fields.json.KeyTransform("subscription", "metadata"),
+                ),
+                name="sub_meta_plan_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-19 14:10
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def delete_duplicate_subscriptions(apps, schema_editor):
+    """Keep only the newest row per subscription id.
+
+    The old get-then-create webhook handler could insert a subscription id
+    twice; it already treated the newest row as the live one.
+    """
+    Subscription = apps.get_model('subscription', 'Subscription')
+    duplicated = (
+        Subscription.objects.values('subscription_id')
+        .annotate(rows=Count('pk'))
+        .filter(rows__gt=1)
+        .values_list('subscription_id', flat=True)
+    )
+    for subscription_id in duplicated.iterator():
+        pks = list(
+            Subscription.objects.filter(subscription_id=subscription_id)
+            .order_by('-created_at', '-pk')
+            .values_list('pk', flat=True)
+        )
+        Subscription.objects.filter(pk__in=pks[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("subscription", "0005_subscription_metadata_jsonb_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_subscriptions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="subscription",
+            constraint=models.UniqueConstraint(
+                fields=("subscription_id",), name="sub_subscription_id_uniq"
+            ),
+        ),
+    ]
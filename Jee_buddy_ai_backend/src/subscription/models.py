@@ -1,5 +1,42 @@
 from django.db import models
+from django.db.models.fields.json import KT
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+
+
+class SubscriptionQuerySet(models.QuerySet):
+    """Lookups into the Razorpay payload stored in ``metadata``.
+
+    ``metadata`` is ``{"subscription": <entity>, "payment": <entity>}``; the
+    helpers below hit the expression and GIN indexes on those paths instead
+    of pulling rows into Python to parse them.
+    """
+
+    def for_customer_email(self, email):
+        return self.alias(
+            _customer_email=KT('metadata__subscription__notes__email'),
+        ).filter(
+            models.Q(_customer_email=email)
+            | models.Q(metadata__contains={'payment': {'email': email}})
+        )
+
+    def for_razorpay_plan(self, plan_id):
+        return self.alias(
+            _razorpay_plan_id=KT('metadata__subscription__plan_id'),
+        ).filter(_razorpay_plan_id=plan_id)
+
+    def for_payment(self, payment_id):
+        return self.filter(metadata__contains={'payment': {'id': payment_id}})
+
+    def annotate_metadata(self):
+        """Expose commonly reported payload keys as text columns for ``values()``."""
+        return self.annotate(
+            customer_email=KT('metadata__subscription__notes__email'),
+            razorpay_plan_id=KT('metadata__subscription__plan_id'),
+            razorpay_status=KT('metadata__subscription__status'),
+            payment_method=KT('metadata__payment__method'),
+        )
+
 
 class Subscription(models.Model):
     user_id = models.CharField(max_length=255)
@@ -13,11 +50,64 @@ class Subscription(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     valid_till = models.DateTimeField(null=True, blank=True)
-    metadata = models.TextField(null=True, blank=True)
+    metadata = models.JSONField(null=True, blank=True)
+    # Razorpay `created_at` (epoch seconds) of the last webhook event applied,
+    # used to drop events that arrive out of order.
+    last_event_at = models.BigIntegerField(default=0)
+
+    objects = SubscriptionQuerySet.as_manager()
 
     def __str__(self):
         return f"Subscription {self.subscription_id} - User {self.user_id}"
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['subscription_id'], name='sub_subscription_id_uniq'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['valid_till'],
+                name='sub_active_valid_till_idx',
+                condition=models.Q(status='active'),
+            ),
+            GinIndex(fields=['metadata'], name='sub_metadata_gin', opclasses=['jsonb_path_ops']),
+            models.Index(KT('metadata__subscription__notes__email'), name='sub_meta_email_idx'),
+            models.Index(KT('metadata__subscription__plan_id'), name='sub_meta_plan_idx'),
+        ]
+
+
+class WebhookEvent(models.Model):
+    """Raw Razorpay webhook delivery, stored before any processing.
+
+    ``event_id`` is the provider's ``X-Razorpay-Event-Id`` and doubles as the
+    idempotency key: redeliveries hit the unique constraint and are acked
+    without being queued twice.
+    """
+    PENDING = 'pending'
+    PROCESSED = 'processed'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
 
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    event_created_at = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"WebhookEvent {self.event_id} - {self.event_type} ({self.status})"
+
+    class Meta:
+        ordering = ['event_created_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['event_created_at', 'id'],
+                name='webhook_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
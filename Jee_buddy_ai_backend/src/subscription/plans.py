@@ -0,0 +1,66 @@
+"""Razorpay plan ids and what each plan entitles a user to."""
+
+PLANS = {
+    'BASIC': 'plan_PhmnKiiVXD3B1M',
+    'PREMIUM': 'plan_Phmo9yOZAKb0P8',
+    'PRO': 'plan_PhmnlqjWH24hwy'
+}
+
+PLAN_KEYS_BY_ID = {plan_id: key for key, plan_id in PLANS.items()}
+
+# Solve requests allowed per UTC day; None means unlimited. FREE applies to
+# users without an active subscription, ANONYMOUS to requests that carry no
+# user id (counted per client address, on each worker).
+DAILY_SOLVE_LIMITS = {
+    'ANONYMOUS': 3,
+    'FREE': 10,
+    'BASIC': 50,
+    'PRO': 200,
+    'PREMIUM': None,
+}
+
+
+# Served verbatim by the plans endpoint.
+PLAN_CATALOG = {
+    'BASIC': {
+        'id': PLANS['BASIC'],
+        'name': 'Basic Plan',
+        'price': 499,
+        'features': [
+            'Basic AI assistance',
+            'Study materials access',
+            'Basic flashcards'
+        ]
+    },
+    'PRO': {
+        'id': PLANS['PRO'],
+        'name': 'Pro Plan',
+        'price': 1499,
+        'features': [
+            'Extended AI assistance',
+            'Full study materials',
+            'Question bank access',
+            'Performance analytics',
+            'Priority support'
+        ]
+    },
+    'PREMIUM': {
+        'id': PLANS['PREMIUM'],
+        'name': 'Premium Plan',
+        'price': 4999,
+        'features': [
+            'Unlimited AI assistance',
+            'Complete study materials',
+            'Full question bank',
+            'Advanced analytics',
+            'Priority support',
+            'AI content generation',
+            'Download access'
+        ]
+    }
+}
+
+
+def plan_key(plan_id) -> str:
+    """Map a Razorpay plan id to its PLANS key, defaulting to FREE."""
+    return PLAN_KEYS_BY_ID.get(plan_id, 'FREE')
@@ -3,34 +3,34 @@ from django.shortcuts import render
 from rest_framework.response import Response
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-import razorpay
 from .models import Subscription
+from .plans import PLAN_CATALOG
+from .webhooks import verify_webhook_signature, record_webhook_event
 from django.contrib.auth.models import User
 from django.utils import timezone
+from core.http_cache import precomputed_response
 import json
 import logging
 import os
 from datetime import timedelta
-from dotenv import load_dotenv
-
-load_dotenv()
+from functools import lru_cache
 
+# .env is loaded by core.settings before any app module is imported.
 logger = logging.getLogger(__name__)
 
 RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET')
+RAZORPAY_WEBHOOK_SECRET = os.getenv('RAZORPAY_WEBHOOK_SECRET')
 
-if not RAZORPAY_KEY_ID or not RAZORPAY_KEY_SECRET:
-    logger.error("Razorpay credentials not found in environment variables")
-    raise Exception("Razorpay credentials not configured")
-
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
 
-PLANS = {
-    'BASIC': 'plan_PhmnKiiVXD3B1M',
-    'PREMIUM': 'plan_Phmo9yOZAKb0P8',
-    'PRO': 'plan_PhmnlqjWH24hwy'
-}
+@lru_cache(maxsize=None)
+def get_razorpay_client():
+    """Build the Razorpay client on first use, keeping the SDK off cold starts."""
+    if not RAZORPAY_KEY_ID or not RAZORPAY_KEY_SECRET:
+        logger.error("Razorpay credentials not found in environment variables")
+        raise Exception("Razorpay credentials not configured")
+    import razorpay
+    return razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
 
 def calculate_days_remaining(valid_till):
     if not valid_till:
@@ -44,7 +44,7 @@ def calculate_days_remaining(valid_till):
     return (valid_till - now).days
 
 @csrf_exempt
-def get_subscription_status(request):
+async def get_subscription_status(request):
     try:
         user_id = request.GET.get('user_id')
         if not user_id:
@@ -53,24 +53,21 @@ def get_subscription_status(request):
                 'message': 'User ID is required'
             }, status=400)
 
-        # Check if user has an active subscription
-        subscription = Subscription.objects.filter(
+        # Lapsed rows are moved to 'expired' by the expire_subscriptions job;
+        # the valid_till bound only covers the gap until its next run.
+        subscription = await Subscription.objects.filter(
             user_id=user_id,
-            status='active'
-        ).order_by('-created_at').first()
+            status='active',
+            valid_till__gt=timezone.now()
+        ).order_by('-created_at').afirst()
 
         if subscription:
-            # Ensure valid_till is timezone aware
             valid_till = subscription.valid_till
-            if timezone.is_naive(valid_till):
-                valid_till = timezone.make_aware(valid_till)
-                
             days_remaining = calculate_days_remaining(valid_till)
-            is_active = days_remaining > 0
 
             return JsonResponse({
                 'status': 'success',
-                'is_subscribed': is_active,
+                'is_subscribed': True,
                 'subscription_id': subscription.subscription_id,
                 'plan_id': subscription.plan_id,
                 'created_at': subscription.created_at.isoformat(),
@@ -115,6 +112,7 @@ def subscription_callback(request):
             }, status=400)
 
         try:
+            razorpay_client = get_razorpay_client()
             payment = razorpay_client.payment.fetch(payment_id)
             subscription_details = razorpay_client.subscription.fetch(subscription_id)
 
@@ -147,11 +145,11 @@ def subscription_callback(request):
                     currency=payment.get('currency', 'INR'),
                     valid_till=valid_till,
                     payment_status='completed',
-                    metadata=json.dumps({
-                        'razorpay_details': subscription_details,
-                        'payment_details': payment,
+                    metadata={
+                        'subscription': subscription_details,
+                        'payment': payment,
                         'signature': signature
-                    })
+                    }
                 )
             
             subscription.save()
@@ -180,6 +178,51 @@ def subscription_callback(request):
             "message": str(e)
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def razorpay_webhook(request):
+    """Verify and enqueue a Razorpay webhook; state changes happen in the worker."""
+    try:
+        if not RAZORPAY_WEBHOOK_SECRET:
+            logger.error("RAZORPAY_WEBHOOK_SECRET is not configured")
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Webhook secret not configured'
+            }, status=500)
+
+        signature = request.headers.get('X-Razorpay-Signature', '')
+        if not verify_webhook_signature(request.body, signature, RAZORPAY_WEBHOOK_SECRET):
+            logger.warning("Rejected webhook with invalid signature")
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Invalid signature'
+            }, status=400)
+
+        try:
+            event = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Invalid JSON payload'
+            }, status=400)
+
+        created = record_webhook_event(
+            request.headers.get('X-Razorpay-Event-Id'),
+            event,
+            request.body,
+        )
+        return JsonResponse({
+            'status': 'success',
+            'duplicate': not created
+        })
+
+    except Exception as e:
+        logger.error(f"Error in razorpay_webhook: {str(e)}")
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def create_subscription(request):
@@ -210,7 +253,7 @@ def create_subscription(request):
                 }
             }
             
-            subscription = razorpay_client.subscription.create(subscription_data)
+            subscription = get_razorpay_client().subscription.create(subscription_data)
             
             # Create local subscription record with timezone-aware datetime
             Subscription.objects.create(
@@ -220,7 +263,7 @@ def create_subscription(request):
                 status='created',
                 amount=subscription.get('total_amount', 0) / 100,
                 currency=subscription.get('currency', 'INR'),
-                metadata=json.dumps(subscription)
+                metadata={'subscription': subscription}
             )
 
             return JsonResponse({
@@ -244,50 +287,12 @@ def create_subscription(request):
         }, status=500)
 
 @csrf_exempt
-def get_plans(request):
+@precomputed_response(max_age=300, s_maxage=3600)
+async def get_plans(request):
     try:
-        plans_data = {
-            'BASIC': {
-                'id': PLANS['BASIC'],
-                'name': 'Basic Plan',
-                'price': 499,
-                'features': [
-                    'Basic AI assistance',
-                    'Study materials access',
-                    'Basic flashcards'
-                ]
-            },
-            'PRO': {
-                'id': PLANS['PRO'],
-                'name': 'Pro Plan',
-                'price': 1499,
-                'features': [
-                    'Extended AI assistance',
-                    'Full study materials',
-                    'Question bank access',
-                    'Performance analytics',
-                    'Priority support'
-                ]
-            },
-            'PREMIUM': {
-                'id': PLANS['PREMIUM'],
-                'name': 'Premium Plan',
-                'price': 4999,
-                'features': [
-                    'Unlimited AI assistance',
-                    'Complete study materials',
-                    'Full question bank',
-                    'Advanced analytics',
-                    'Priority support',
-                    'AI content generation',
-                    'Download access'
-                ]
-            }
-        }
-        
         return JsonResponse({
             'status': 'success',
-            'plans': plans_data
+            'plans': PLAN_CATALOG
         })
     except Exception as e:
         logger.error(f"Error fetching plans: {str(e)}")
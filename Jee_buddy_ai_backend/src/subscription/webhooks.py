@@ -0,0 +1,209 @@
+"""Razorpay webhook inbox: local signature checks and batched state transitions.
+
+The HTTP endpoint only verifies the signature and stores the raw event; the
+`process_webhook_events` management command drains the inbox and applies the
+events to ``Subscription`` rows without calling back into Razorpay.
+"""
+import hashlib
+import hmac
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Subscription, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+# Razorpay event -> local Subscription.status. `subscription.completed` is
+# deliberately absent: it fires right after the final charge of a one-cycle
+# plan, and access must last until `valid_till`, which the expiry sweep owns.
+EVENT_STATUS = {
+    'subscription.authenticated': 'authenticated',
+    'subscription.activated': 'active',
+    'subscription.charged': 'active',
+    'subscription.resumed': 'active',
+    'subscription.pending': 'pending',
+    'subscription.halted': 'halted',
+    'subscription.paused': 'paused',
+    'subscription.cancelled': 'cancelled',
+}
+
+BILLING_CYCLE = timedelta(days=28)
+
+
+def verify_webhook_signature(body: bytes, signature: str, secret: str) -> bool:
+    """Check the ``X-Razorpay-Signature`` HMAC-SHA256 of the raw request body."""
+    if not body or not signature or not secret:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def record_webhook_event(event_id, event: dict, body: bytes) -> bool:
+    """Insert the event into the inbox. Returns False for a redelivery."""
+    if not event_id:
+        # Older integrations don't send the header; the body is stable per event.
+        event_id = hashlib.sha256(body).hexdigest()
+    try:
+        with transaction.atomic():
+            WebhookEvent.objects.create(
+                event_id=event_id,
+                event_type=event.get('event', ''),
+                payload=event,
+                event_created_at=int(event.get('created_at') or 0),
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def _entity(payload: dict, name: str) -> dict:
+    return ((payload.get('payload') or {}).get(name) or {}).get('entity') or {}
+
+
+def _from_epoch(value):
+    if not value:
+        return None
+    return datetime.fromtimestamp(int(value), tz=dt_timezone.utc)
+
+
+def apply_event(subscription: Subscription, event: WebhookEvent, now=None) -> bool:
+    """Apply one event to an in-memory subscription. Returns False if stale.
+
+    Events older than the last one applied are ignored, so redeliveries and
+    out-of-order arrivals cannot roll a subscription back.
+    """
+    if event.event_created_at < subscription.last_event_at:
+        return False
+
+    now = now or timezone.now()
+    status = EVENT_STATUS.get(event.event_type)
+    if status:
+        subscription.status = status
+
+    sub_entity = _entity(event.payload, 'subscription')
+    payment = _entity(event.payload, 'payment')
+    if sub_entity.get('plan_id'):
+        subscription.plan_id = sub_entity['plan_id']
+    if sub_entity:
+        metadata = dict(subscription.metadata or {})
+        metadata['subscription'] = sub_entity
+        if payment:
+            metadata['payment'] = payment
+        subscription.metadata = metadata
+
+    if event.event_type == 'subscription.charged':
+        subscription.valid_till = _from_epoch(sub_entity.get('current_end')) or now + BILLING_CYCLE
+        subscription.payment_status = 'completed'
+        if payment:
+            subscription.payment_id = payment.get('id', subscription.payment_id)
+            subscription.amount = payment.get('amount', 0) / 100
+            subscription.currency = payment.get('currency', subscription.currency)
+    elif event.event_type in ('subscription.halted', 'subscription.pending'):
+        subscription.payment_status = 'failed'
+
+    subscription.last_event_at = event.event_created_at
+    subscription.updated_at = now
+    return True
+
+
+def _new_subscription(event: WebhookEvent):
+    """Build a local row for a subscription we have never seen, if attributable."""
+    sub_entity = _entity(event.payload, 'subscription')
+    user_id = (sub_entity.get('notes') or {}).get('user_id')
+    if not user_id:
+        return None
+    return Subscription(
+        user_id=user_id,
+        subscription_id=sub_entity['id'],
+        plan_id=sub_entity.get('plan_id', ''),
+        status='created',
+        metadata={'subscription': sub_entity},
+    )
+
+
+SUBSCRIPTION_FIELDS = [
+    'status', 'plan_id', 'payment_id', 'payment_status', 'amount',
+    'currency', 'valid_till', 'last_event_at', 'updated_at', 'metadata',
+]
+
+
+def process_pending_events(batch_size: int = 100) -> int:
+    """Apply one batch of pending inbox events. Returns the number consumed.
+
+    Rows are claimed with ``SKIP LOCKED`` so several workers can drain the
+    inbox concurrently. Subscriptions first seen in the batch are inserted
+    with ``ON CONFLICT DO NOTHING`` on the unique ``subscription_id``, then
+    every subscription the batch touches is locked (in pk order, so workers
+    cannot deadlock) before events are applied: two workers holding events
+    for one subscription take turns, and the later one sees the earlier
+    one's ``last_event_at``. Each step is one query per batch.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=WebhookEvent.PENDING)
+            .order_by('event_created_at', 'id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        subscription_ids = {_entity(e.payload, 'subscription').get('id') for e in events} - {None}
+        known = set(Subscription.objects.filter(
+            subscription_id__in=subscription_ids
+        ).values_list('subscription_id', flat=True))
+        missing, created = subscription_ids - known, {}
+        for event in events:
+            sub_id = _entity(event.payload, 'subscription').get('id')
+            if sub_id in missing and sub_id not in created:
+                subscription = _new_subscription(event)
+                if subscription is not None:
+                    created[sub_id] = subscription
+        if created:
+            # Another worker may insert the same subscription first; its row wins.
+            Subscription.objects.bulk_create(created.values(), ignore_conflicts=True)
+
+        subscriptions = {
+            subscription.subscription_id: subscription
+            for subscription in Subscription.objects.select_for_update()
+            .filter(subscription_id__in=subscription_ids)
+            .order_by('pk')
+        }
+
+        changed = {}
+        for event in events:
+            event.attempts += 1
+            event.processed_at = now
+            sub_id = _entity(event.payload, 'subscription').get('id')
+            if not sub_id:
+                event.status = WebhookEvent.SKIPPED
+                event.error = 'No subscription entity in payload'
+                continue
+
+            subscription = subscriptions.get(sub_id)
+            if subscription is None:
+                event.status = WebhookEvent.FAILED
+                event.error = 'Unknown subscription without user_id note'
+                continue
+
+            if apply_event(subscription, event, now=now):
+                event.status = WebhookEvent.PROCESSED
+                changed[sub_id] = subscription
+            else:
+                event.status = WebhookEvent.SKIPPED
+                event.error = 'Superseded by a newer event'
+
+        if changed:
+            Subscription.objects.bulk_update(changed.values(), SUBSCRIPTION_FIELDS)
+        WebhookEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'error', 'processed_at']
+        )
+
+    logger.info(
+        f"Processed {len(events)} webhook events: "
+        f"{len(changed)} subscriptions updated, {len(created)} created"
+    )
+    return len(events)
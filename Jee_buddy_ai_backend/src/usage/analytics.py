@@ -0,0 +1,164 @@
+"""Hourly subject/topic rollups and latency percentiles for global analytics."""
+import logging
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import TopicHourlyUsage, UsageEvent, Watermark
+from .rollups import settled_upper_bound
+
+logger = logging.getLogger(__name__)
+
+TOPIC_WATERMARK = 'usage.topic_hourly'
+
+# Upper bounds (exclusive) of the latency histogram buckets; the last bucket
+# is open-ended. Bucket i holds latencies in [BUCKETS[i-1], BUCKETS[i]).
+LATENCY_BUCKETS_MS = [250, 500, 1000, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000, 60000]
+HISTOGRAM_SIZE = len(LATENCY_BUCKETS_MS) + 1
+
+GROUP_FIELDS = ('subject', 'topic', 'interaction_type')
+
+
+def latency_bucket(latency_ms) -> int:
+    """Python twin of the SQL ``width_bucket`` used by the aggregator."""
+    return bisect_right(LATENCY_BUCKETS_MS, latency_ms)
+
+
+def merge_histograms(left, right):
+    size = max(len(left), len(right), HISTOGRAM_SIZE)
+    left = list(left) + [0] * (size - len(left))
+    right = list(right) + [0] * (size - len(right))
+    return [a + b for a, b in zip(left, right)]
+
+
+def latency_percentile(histogram, q):
+    """Estimate the q-th percentile (0-100) by interpolating inside the bucket."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = q / 100 * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            low = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            if index >= len(LATENCY_BUCKETS_MS):
+                return low
+            high = LATENCY_BUCKETS_MS[index]
+            return round(low + (high - low) * (rank - seen) / count)
+        seen += count
+    return LATENCY_BUCKETS_MS[-1]
+
+
+TOPIC_BATCH_SQL = """
+    SELECT date_trunc('hour', created_at), subject, topic,
+           interaction_type, width_bucket(latency_ms, %s::int[]), COUNT(*),
+           SUM(prompt_tokens), SUM(completion_tokens), SUM(latency_ms)
+    FROM usage_usageevent
+    WHERE id > %s AND id <= %s
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+
+def aggregate_topic_usage(batch_size: int = 50000) -> int:
+    """Fold the next id range of usage events into ``TopicHourlyUsage``.
+
+    Postgres does the heavy grouping down to one row per hour, group and
+    latency bucket; only those few rows are merged in Python. Returns the
+    id span consumed, 0 when caught up.
+    """
+    with transaction.atomic():
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(name=TOPIC_WATERMARK)
+        upper = settled_upper_bound(UsageEvent.objects, 'created_at', watermark.position, batch_size)
+        if upper is None:
+            return 0
+
+        deltas = defaultdict(lambda: {
+            'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+            'total_latency_ms': 0, 'latency_histogram': [0] * HISTOGRAM_SIZE,
+        })
+        with connection.cursor() as cursor:
+            cursor.execute(TOPIC_BATCH_SQL, [LATENCY_BUCKETS_MS, watermark.position, upper])
+            for hour, subject, topic, interaction_type, bucket, count, prompt, completion, latency in cursor:
+                delta = deltas[(hour, subject, topic, interaction_type)]
+                delta['requests'] += count
+                delta['prompt_tokens'] += prompt
+                delta['completion_tokens'] += completion
+                delta['total_latency_ms'] += latency
+                delta['latency_histogram'][bucket] += count
+
+        _merge_into_rollups(deltas)
+
+        consumed = upper - watermark.position
+        watermark.position = upper
+        watermark.save(update_fields=['position', 'updated_at'])
+
+    logger.info(f"Rolled up {len(deltas)} topic-hour groups up to event id {upper}")
+    return consumed
+
+
+def _merge_into_rollups(deltas):
+    if not deltas:
+        return
+    hours = {key[0] for key in deltas}
+    existing = {
+        (row.hour, row.subject, row.topic, row.interaction_type): row
+        for row in TopicHourlyUsage.objects.select_for_update().filter(hour__in=hours)
+    }
+    now = timezone.now()
+    updated, created = [], []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            hour, subject, topic, interaction_type = key
+            created.append(TopicHourlyUsage(
+                hour=hour, subject=subject, topic=topic,
+                interaction_type=interaction_type, **delta,
+            ))
+            continue
+        row.requests += delta['requests']
+        row.prompt_tokens += delta['prompt_tokens']
+        row.completion_tokens += delta['completion_tokens']
+        row.total_latency_ms += delta['total_latency_ms']
+        row.latency_histogram = merge_histograms(row.latency_histogram, delta['latency_histogram'])
+        row.updated_at = now
+        updated.append(row)
+
+    if updated:
+        TopicHourlyUsage.objects.bulk_update(updated, [
+            'requests', 'prompt_tokens', 'completion_tokens',
+            'total_latency_ms', 'latency_histogram', 'updated_at',
+        ])
+    if created:
+        TopicHourlyUsage.objects.bulk_create(created)
+
+
+def summarize(rows, group_by):
+    """Collapse rollup rows into per-group totals with latency percentiles."""
+    groups = {}
+    for row in rows:
+        key = tuple(getattr(row, field) or '' for field in group_by)
+        group = groups.setdefault(key, {
+            'requests': 0, 'tokens': 0, 'total_latency_ms': 0, 'histogram': [],
+        })
+        group['requests'] += row.requests
+        group['tokens'] += row.prompt_tokens + row.completion_tokens
+        group['total_latency_ms'] += row.total_latency_ms
+        group['histogram'] = merge_histograms(group['histogram'], row.latency_histogram)
+
+    summary = []
+    for key, group in groups.items():
+        requests = group['requests']
+        summary.append({
+            **dict(zip(group_by, key)),
+            'requests': requests,
+            'tokens': group['tokens'],
+            'avg_tokens': round(group['tokens'] / requests) if requests else 0,
+            'avg_latency_ms': round(group['total_latency_ms'] / requests) if requests else 0,
+            'p50_latency_ms': latency_percentile(group['histogram'], 50),
+            'p90_latency_ms': latency_percentile(group['histogram'], 90),
+            'p99_latency_ms': latency_percentile(group['histogram'], 99),
+        })
+    summary.sort(key=lambda item: item['requests'], reverse=True)
+    return summary
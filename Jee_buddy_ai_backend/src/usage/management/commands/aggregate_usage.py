@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usage.analytics import aggregate_topic_usage
+from usage.rollups import aggregate_usage_events
+
+
+class Command(BaseCommand):
+    help = "Roll new usage events up into per-user daily and per-topic hourly totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep aggregating instead of exiting once caught up',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=10.0,
+            help='Seconds to sleep once caught up (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            consumed = aggregate_usage_events(batch_size=options['batch_size'])
+            topic_consumed = aggregate_topic_usage(batch_size=options['batch_size'])
+            if consumed or topic_consumed:
+                self.stdout.write(
+                    f"Aggregated events through an id span of {max(consumed, topic_consumed)}"
+                )
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS("Usage rollups are up to date"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from usage.rollups import aggregate_usage_events, backfill_from_chat_history
+
+
+class Command(BaseCommand):
+    help = "Seed usage events from existing ChatHistory and roll them up"
+
+    def handle(self, *args, **options):
+        try:
+            inserted = backfill_from_chat_history()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        while aggregate_usage_events():
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {inserted} usage events"))
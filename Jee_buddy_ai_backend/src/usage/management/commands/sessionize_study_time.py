@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usage.sessions import sessionize_chat_history
+
+
+class Command(BaseCommand):
+    help = "Sessionize new chat history into per-user study-time aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100000)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep processing instead of exiting once caught up',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=60.0,
+            help='Seconds to sleep once caught up (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            if sessionize_chat_history(batch_size=options['batch_size']):
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS("Study sessions are up to date"))
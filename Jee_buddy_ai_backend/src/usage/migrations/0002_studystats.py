@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("usage", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StudyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.CharField(max_length=255, unique=True)),
+                ("sessions", models.PositiveIntegerField(default=0)),
+                ("closed_seconds", models.BigIntegerField(default=0)),
+                ("open_session_start", models.DateTimeField(blank=True, null=True)),
+                ("last_activity_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
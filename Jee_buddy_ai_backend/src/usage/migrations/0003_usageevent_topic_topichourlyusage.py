@@ -0,0 +1,60 @@
+# Generated by Django 5.0.2 on 2026-10-19 14:02
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("usage", "0002_studystats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usageevent",
+            name="topic",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+        migrations.CreateModel(
+            name="TopicHourlyUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("subject", models.CharField(blank=True, default="", max_length=50)),
+                ("topic", models.CharField(blank=True, default="", max_length=100)),
+                ("interaction_type", models.CharField(blank=True, default="", max_length=50)),
+                ("requests", models.PositiveIntegerField(default=0)),
+                ("prompt_tokens", models.BigIntegerField(default=0)),
+                ("completion_tokens", models.BigIntegerField(default=0)),
+                ("total_latency_ms", models.BigIntegerField(default=0)),
+                (
+                    "latency_histogram",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.PositiveIntegerField(), default=list, size=None
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-hour"],
+                "indexes": [
+                    models.Index(fields=["subject", "hour"], name="topic_hourly_subject_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("hour", "subject", "topic", "interaction_type"),
+                        name="topic_hourly_usage_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
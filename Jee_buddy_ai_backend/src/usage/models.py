@@ -0,0 +1,109 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.utils import timezone
+
+
+class UsageEvent(models.Model):
+    """Append-only record of one AI solve.
+
+    No secondary indexes: recording must stay a single cheap insert. Reads go
+    through ``DailyUsage``, which the aggregator builds from id ranges.
+    """
+    user_id = models.CharField(max_length=255)
+    subject = models.CharField(max_length=50, blank=True, default='')
+    topic = models.CharField(max_length=100, blank=True, default='')
+    interaction_type = models.CharField(max_length=50, blank=True, default='')
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"UsageEvent {self.id} - User {self.user_id}"
+
+
+class DailyUsage(models.Model):
+    """Per-user, per-UTC-day, per-subject totals maintained by the aggregator."""
+    user_id = models.CharField(max_length=255)
+    day = models.DateField()
+    subject = models.CharField(max_length=50, blank=True, default='')
+    requests = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.BigIntegerField(default=0)
+    completion_tokens = models.BigIntegerField(default=0)
+    total_latency_ms = models.BigIntegerField(default=0)
+    max_latency_ms = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"DailyUsage {self.user_id} {self.day} {self.subject}"
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_id', 'day', 'subject'],
+                name='daily_usage_user_day_subject_uniq',
+            ),
+        ]
+
+
+class Watermark(models.Model):
+    """Progress marker for incremental jobs, e.g. the last event id rolled up."""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Watermark {self.name} = {self.position}"
+
+
+class StudyStats(models.Model):
+    """Per-user study-session aggregates built by sessionizing ``ChatHistory``.
+
+    The latest session stays open (``open_session_start`` .. ``last_activity_at``)
+    until a later interaction arrives after the inactivity gap, so
+    incremental runs can keep extending it.
+    """
+    user_id = models.CharField(max_length=255, unique=True)
+    sessions = models.PositiveIntegerField(default=0)
+    closed_seconds = models.BigIntegerField(default=0)
+    open_session_start = models.DateTimeField(null=True, blank=True)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"StudyStats {self.user_id}: {self.sessions} sessions"
+
+
+class TopicHourlyUsage(models.Model):
+    """Global load per hour and subject/topic/interaction type.
+
+    ``latency_histogram`` holds counts per ``usage.analytics.LATENCY_BUCKETS_MS``
+    bucket; histograms add up across runs and hours, so percentiles can be
+    estimated for any window without touching raw events.
+    """
+    hour = models.DateTimeField()
+    subject = models.CharField(max_length=50, blank=True, default='')
+    topic = models.CharField(max_length=100, blank=True, default='')
+    interaction_type = models.CharField(max_length=50, blank=True, default='')
+    requests = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.BigIntegerField(default=0)
+    completion_tokens = models.BigIntegerField(default=0)
+    total_latency_ms = models.BigIntegerField(default=0)
+    latency_histogram = ArrayField(models.PositiveIntegerField(), default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"TopicHourlyUsage {self.hour:%Y-%m-%d %H}:00 {self.subject}/{self.topic}"
+
+    class Meta:
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'subject', 'topic', 'interaction_type'],
+                name='topic_hourly_usage_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['subject', 'hour'], name='topic_hourly_subject_idx'),
+        ]
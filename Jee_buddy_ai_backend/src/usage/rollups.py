@@ -0,0 +1,175 @@
+"""Usage accounting: cheap event recording and incremental daily rollups.
+
+Solves append a ``UsageEvent``. The ``aggregate_usage`` command folds new
+events into ``DailyUsage`` by id range, so the stats endpoint reads one row
+per user-day-subject instead of scanning history.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import DailyUsage, UsageEvent, Watermark
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_WATERMARK = 'usage.daily_rollup'
+BACKFILL_WATERMARK = 'usage.chat_history_backfill'
+
+# Events younger than this are left for the next run, so inserts that commit
+# slightly out of id order are not skipped by the watermark.
+SETTLE_DELAY = timedelta(seconds=5)
+
+
+def record_usage_event(user_id, subject='', interaction_type='', prompt_tokens=0,
+                       completion_tokens=0, latency_ms=0, topic=''):
+    """Append one usage event. A single INSERT with no secondary indexes."""
+    return UsageEvent.objects.create(
+        user_id=user_id,
+        subject=(subject or '')[:50].lower(),
+        topic=(topic or '')[:100].lower(),
+        interaction_type=(interaction_type or '')[:50],
+        prompt_tokens=prompt_tokens or 0,
+        completion_tokens=completion_tokens or 0,
+        latency_ms=max(int(latency_ms or 0), 0),
+    )
+
+
+def settled_upper_bound(queryset, time_field, position, batch_size):
+    """Highest id in the next batch after ``position`` that is safe to consume.
+
+    Stops short of the first row younger than ``SETTLE_DELAY`` so a row that
+    commits after a higher id is never jumped over by the watermark.
+    """
+    tail = queryset.filter(id__gt=position).order_by('id')
+    first_unsettled = tail.filter(
+        **{f'{time_field}__gte': timezone.now() - SETTLE_DELAY}
+    ).values_list('id', flat=True).first()
+    ids = tail.values_list('id', flat=True)
+    if first_unsettled is not None:
+        ids = ids.filter(id__lt=first_unsettled)
+    return ids[batch_size - 1:batch_size].first() or ids.order_by('-id').first()
+
+
+ROLLUP_SQL = """
+    INSERT INTO usage_dailyusage (
+        user_id, day, subject, requests, prompt_tokens, completion_tokens,
+        total_latency_ms, max_latency_ms, updated_at
+    )
+    SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, subject, COUNT(*),
+           SUM(prompt_tokens), SUM(completion_tokens), SUM(latency_ms),
+           MAX(latency_ms), NOW()
+    FROM usage_usageevent
+    WHERE id > %s AND id <= %s
+    GROUP BY 1, 2, 3
+    ON CONFLICT (user_id, day, subject) DO UPDATE SET
+        requests = usage_dailyusage.requests + EXCLUDED.requests,
+        prompt_tokens = usage_dailyusage.prompt_tokens + EXCLUDED.prompt_tokens,
+        completion_tokens = usage_dailyusage.completion_tokens + EXCLUDED.completion_tokens,
+        total_latency_ms = usage_dailyusage.total_latency_ms + EXCLUDED.total_latency_ms,
+        max_latency_ms = GREATEST(usage_dailyusage.max_latency_ms, EXCLUDED.max_latency_ms),
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def aggregate_usage_events(batch_size: int = 50000) -> int:
+    """Fold the next id range of events into ``DailyUsage``; 0 means caught up.
+
+    The watermark row is locked for the duration, and the rollup upsert and
+    watermark advance commit together, so each event is counted exactly once
+    even with overlapping runs.
+    """
+    with transaction.atomic():
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(name=ROLLUP_WATERMARK)
+        upper = settled_upper_bound(UsageEvent.objects, 'created_at', watermark.position, batch_size)
+        if upper is None:
+            return 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(ROLLUP_SQL, [watermark.position, upper])
+        consumed = upper - watermark.position
+        watermark.position = upper
+        watermark.save(update_fields=['position', 'updated_at'])
+
+    logger.info(f"Rolled up usage events up to id {upper}")
+    return consumed
+
+
+def requests_today(user_id, now=None) -> int:
+    """Today's solve count: the rollup plus events not yet aggregated."""
+    now = now or timezone.now()
+    today = now.date()
+    rolled_up = DailyUsage.objects.filter(
+        user_id=user_id, day=today
+    ).aggregate(total=Sum('requests'))['total'] or 0
+    position = Watermark.objects.filter(
+        name=ROLLUP_WATERMARK
+    ).values_list('position', flat=True).first() or 0
+    # Primary-key range scan over the unaggregated tail only.
+    pending = UsageEvent.objects.filter(
+        id__gt=position,
+        user_id=user_id,
+        created_at__date=today,
+    ).count()
+    return rolled_up + pending
+
+
+async def arequests_today(user_id, now=None) -> int:
+    """Async twin of ``requests_today`` for async views."""
+    now = now or timezone.now()
+    today = now.date()
+    rolled_up = (await DailyUsage.objects.filter(
+        user_id=user_id, day=today
+    ).aaggregate(total=Sum('requests')))['total'] or 0
+    position = await Watermark.objects.filter(
+        name=ROLLUP_WATERMARK
+    ).values_list('position', flat=True).afirst() or 0
+    pending = await UsageEvent.objects.filter(
+        id__gt=position,
+        user_id=user_id,
+        created_at__date=today,
+    ).acount()
+    return rolled_up + pending
+
+
+BACKFILL_SQL = """
+    INSERT INTO usage_usageevent (
+        user_id, subject, topic, interaction_type, prompt_tokens,
+        completion_tokens, latency_ms, created_at
+    )
+    SELECT user_id,
+           LEFT(LOWER(COALESCE(context->>'subject', '')), 50),
+           LEFT(LOWER(COALESCE(context->>'topic', '')), 100),
+           LEFT(COALESCE(context->>'interaction_type', ''), 50),
+           0, 0, 0, timestamp
+    FROM main_chathistory
+    WHERE timestamp < %s
+    ORDER BY id
+"""
+
+
+def backfill_from_chat_history() -> int:
+    """Seed usage events from ``ChatHistory`` rows older than the first live event.
+
+    Token counts and latency were never stored for history rows, so only
+    request counts are recovered. Refuses to run twice.
+    """
+    with transaction.atomic():
+        marker, created = Watermark.objects.select_for_update().get_or_create(
+            name=BACKFILL_WATERMARK
+        )
+        if not created:
+            raise ValueError("Usage has already been backfilled from chat history")
+
+        first_live = UsageEvent.objects.order_by('id').values_list('created_at', flat=True).first()
+        cutoff = first_live or timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(BACKFILL_SQL, [cutoff])
+            inserted = cursor.rowcount
+        marker.position = inserted
+        marker.save(update_fields=['position', 'updated_at'])
+
+    logger.info(f"Backfilled {inserted} usage events from chat history")
+    return inserted
@@ -0,0 +1,154 @@
+"""Study-time analytics by sessionizing ``ChatHistory`` in a single pass.
+
+New history rows are streamed through a server-side cursor ordered by
+``(user_id, timestamp)``, so memory stays constant however large the tail
+is: only the current user's state, one chunk of rows with its users'
+stored stats, and a small write buffer are held.
+"""
+import logging
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import ChatHistory
+from .models import StudyStats, Watermark
+from .rollups import settled_upper_bound
+
+logger = logging.getLogger(__name__)
+
+SESSION_WATERMARK = 'usage.study_sessions'
+
+# A gap longer than this between interactions starts a new session.
+SESSION_GAP = timedelta(minutes=30)
+# Credited after a session's last interaction, for reading the final answer.
+SESSION_TAIL = timedelta(minutes=2)
+
+STATS_FIELDS = ['sessions', 'closed_seconds', 'open_session_start', 'last_activity_at', 'updated_at']
+# History rows per bulk StudyStats lookup
+PREFETCH_CHUNK = 2000
+
+
+def session_seconds(start, end) -> int:
+    return int((end - start + SESSION_TAIL).total_seconds())
+
+
+def study_seconds(stats: StudyStats) -> int:
+    """Closed sessions plus the still-open one."""
+    total = stats.closed_seconds
+    if stats.open_session_start and stats.last_activity_at:
+        total += session_seconds(stats.open_session_start, stats.last_activity_at)
+    return total
+
+
+def extend_session(stats: StudyStats, timestamp, gap=SESSION_GAP):
+    """Fold one interaction into a user's running session state."""
+    if stats.last_activity_at is None:
+        stats.sessions += 1
+        stats.open_session_start = timestamp
+    elif timestamp - stats.last_activity_at > gap:
+        stats.closed_seconds += session_seconds(stats.open_session_start, stats.last_activity_at)
+        stats.sessions += 1
+        stats.open_session_start = timestamp
+    if stats.last_activity_at is None or timestamp > stats.last_activity_at:
+        stats.last_activity_at = timestamp
+
+
+def sessionize(rows, load_stats, gap=SESSION_GAP):
+    """Yield each user's updated stats from ``(user_id, timestamp)`` rows.
+
+    ``rows`` must be sorted by user then time; a user's stats are yielded
+    as soon as the stream moves past them.
+    """
+    current = None
+    for user_id, timestamp in rows:
+        if current is None or current.user_id != user_id:
+            if current is not None:
+                yield current
+            current = load_stats(user_id)
+        extend_session(current, timestamp, gap)
+    if current is not None:
+        yield current
+
+
+class StatsPrefetcher:
+    """Feeds ``sessionize`` one bulk stats lookup per chunk of rows.
+
+    ``rows`` passes the history rows through a chunk at a time, loading the
+    stored stats of every user in the chunk with one ``load_many(user_ids)``
+    call first; ``load`` then serves ``sessionize`` from that chunk's
+    results instead of querying once per user.
+    """
+
+    def __init__(self, rows, load_many, chunk_size=PREFETCH_CHUNK):
+        self._rows = iter(rows)
+        self._load_many = load_many
+        self.chunk_size = chunk_size
+        self._loaded = {}
+
+    def rows(self):
+        while True:
+            chunk = list(islice(self._rows, self.chunk_size))
+            if not chunk:
+                return
+            self._loaded = self._load_many({user_id for user_id, _ in chunk})
+            yield from chunk
+
+    def load(self, user_id):
+        return self._loaded.get(user_id) or StudyStats(user_id=user_id)
+
+
+def _load_stats_many(user_ids):
+    return {stats.user_id: stats for stats in StudyStats.objects.filter(user_id__in=user_ids)}
+
+
+def _flush(batch, now):
+    for stats in batch:
+        stats.updated_at = now
+    existing = [stats for stats in batch if stats.pk]
+    if existing:
+        StudyStats.objects.bulk_update(existing, STATS_FIELDS)
+    new = [stats for stats in batch if not stats.pk]
+    if new:
+        StudyStats.objects.bulk_create(new)
+
+
+def sessionize_chat_history(batch_size: int = 100000, flush_every: int = 500) -> int:
+    """Process history rows after the watermark; returns the id span consumed.
+
+    Stats writes and the watermark advance commit together, so a failed run
+    is simply retried from the same position.
+    """
+    now = timezone.now()
+    updated = 0
+    with transaction.atomic():
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(name=SESSION_WATERMARK)
+        upper = settled_upper_bound(ChatHistory.objects, 'timestamp', watermark.position, batch_size)
+        if upper is None:
+            return 0
+
+        rows = ChatHistory.objects.filter(
+            id__gt=watermark.position,
+            id__lte=upper,
+        ).exclude(user_id='').order_by('user_id', 'timestamp').values_list(
+            'user_id', 'timestamp'
+        ).iterator(chunk_size=2000)
+
+        prefetcher = StatsPrefetcher(rows, _load_stats_many)
+        buffer = []
+        for stats in sessionize(prefetcher.rows(), prefetcher.load):
+            buffer.append(stats)
+            if len(buffer) >= flush_every:
+                _flush(buffer, now)
+                updated += len(buffer)
+                buffer = []
+        _flush(buffer, now)
+        updated += len(buffer)
+
+        consumed = upper - watermark.position
+        watermark.position = upper
+        watermark.save(update_fields=['position', 'updated_at'])
+
+    logger.info(f"Sessionized chat history up to id {upper} for {updated} users")
+    return consumed
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('stats/', views.get_user_usage_stats, name='get_user_usage_stats'),
+    path('analytics/topics/', views.get_topic_analytics, name='get_topic_analytics'),
 ] 
\ No newline at end of file
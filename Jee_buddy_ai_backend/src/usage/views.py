@@ -1,14 +1,24 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from django.utils import timezone
+from django.db.models import Sum, Max
+from core.db_router import replica_reads
+from core.internal import internal_only
 from subscription.models import Subscription
+from subscription.plans import DAILY_SOLVE_LIMITS, PLAN_CATALOG, plan_key
+from .analytics import GROUP_FIELDS, summarize
+from .models import DailyUsage, StudyStats, TopicHourlyUsage
+from .rollups import arequests_today
+from .sessions import study_seconds
 from datetime import timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
 @csrf_exempt
-def get_user_usage_stats(request):
+@replica_reads
+async def get_user_usage_stats(request):
     try:
         user_id = request.GET.get('user_id')
         if not user_id:
@@ -17,29 +27,71 @@ def get_user_usage_stats(request):
                 'message': 'User ID is required'
             }, status=400)
 
+        try:
+            days = min(max(int(request.GET.get('days', 30)), 1), 365)
+        except ValueError:
+            days = 30
+
+        now = timezone.now()
+
         # Get current subscription
-        subscription = Subscription.objects.filter(
+        subscription = await Subscription.objects.filter(
             user_id=user_id,
-            status='active'
-        ).order_by('-created_at').first()
+            status='active',
+            valid_till__gt=now
+        ).order_by('-created_at').afirst()
 
         # Calculate subscription details
+        plan = plan_key(subscription.plan_id if subscription else None)
         subscription_data = None
         if subscription:
-            now = timezone.now()
-            days_remaining = (subscription.valid_till - now).days if subscription.valid_till > now else 0
             subscription_data = {
-                'plan_name': subscription.get_plan_display(),
-                'status': 'active' if days_remaining > 0 else 'expired',
-                'days_remaining': days_remaining
+                'plan_name': PLAN_CATALOG[plan]['name'] if plan in PLAN_CATALOG else subscription.plan_id,
+                'status': 'active',
+                'days_remaining': (subscription.valid_till - now).days
             }
 
-        # Get AI usage statistics
-        # In a real application, you would track these in a separate model
+        # Get AI usage statistics from the daily rollups: one row per
+        # user/day/subject, so this is O(days) regardless of history size.
+        rollups = DailyUsage.objects.filter(user_id=user_id)
+        totals = await rollups.aaggregate(
+            requests=Sum('requests'),
+            prompt_tokens=Sum('prompt_tokens'),
+            completion_tokens=Sum('completion_tokens')
+        )
+        window = rollups.filter(day__gt=(now - timedelta(days=days)).date())
+        daily = [
+            {
+                'date': row['day'].isoformat(),
+                'requests': row['requests'],
+                'tokens': row['prompt_tokens'] + row['completion_tokens'],
+                'avg_latency_ms': round(row['total_latency_ms'] / row['requests']) if row['requests'] else 0,
+                'max_latency_ms': row['max_latency_ms']
+            }
+            async for row in window.values('day').annotate(
+                requests=Sum('requests'),
+                prompt_tokens=Sum('prompt_tokens'),
+                completion_tokens=Sum('completion_tokens'),
+                total_latency_ms=Sum('total_latency_ms'),
+                max_latency_ms=Max('max_latency_ms')
+            ).order_by('day')
+        ]
+        by_subject = {
+            (row['subject'] or 'general'): row['requests']
+            async for row in window.values('subject').annotate(requests=Sum('requests'))
+        }
+
+        used_today = await arequests_today(user_id, now=now)
+        daily_limit = DAILY_SOLVE_LIMITS[plan]
         ai_usage = {
-            'total_interactions': 150,  # Example value
-            'remaining_messages': 350,  # Example value
-            'usage_percentage': 30  # Example value
+            'total_interactions': totals['requests'] or 0,
+            'total_tokens': (totals['prompt_tokens'] or 0) + (totals['completion_tokens'] or 0),
+            'used_today': used_today,
+            'daily_limit': daily_limit,
+            'remaining_messages': max(daily_limit - used_today, 0) if daily_limit is not None else None,
+            'usage_percentage': min(round(100 * used_today / daily_limit), 100) if daily_limit else 0,
+            'daily': daily,
+            'by_subject': by_subject
         }
 
         # Get practice statistics
@@ -49,28 +101,23 @@ def get_user_usage_stats(request):
             'accuracy': 80  # Example value
         }
 
-        # Calculate study time
+        # Calculate study time from the sessionized aggregates
+        study_stats = await StudyStats.objects.filter(user_id=user_id).afirst()
+        study_hours = study_seconds(study_stats) / 3600 if study_stats else 0
+        sessions = study_stats.sessions if study_stats else 0
         study_time = {
-            'hours': 24,  # Example value
-            'sessions': 12,  # Example value
-            'average_session': 2  # Example value
+            'hours': round(study_hours, 1),
+            'sessions': sessions,
+            'average_session': round(study_hours / sessions, 1) if sessions else 0
         }
 
-        # Get recent activity
-        # In a real application, you would track these in a separate model
+        # Get recent activity from the latest rollup rows
         recent_activity = [
             {
-                'description': 'Completed Physics Practice Test',
-                'timestamp': (timezone.now() - timedelta(hours=2)).isoformat()
-            },
-            {
-                'description': 'AI Chat Session - Chemistry Topics',
-                'timestamp': (timezone.now() - timedelta(hours=5)).isoformat()
-            },
-            {
-                'description': 'Solved Mathematics Question Bank',
-                'timestamp': (timezone.now() - timedelta(days=1)).isoformat()
+                'description': f"AI Chat Session - {(row.subject or 'General').title()} ({row.requests} questions)",
+                'timestamp': row.updated_at.isoformat()
             }
+            async for row in window.order_by('-day', '-updated_at')[:3]
         ]
 
         return JsonResponse({
@@ -89,4 +136,51 @@ def get_user_usage_stats(request):
         return JsonResponse({
             'status': 'error',
             'message': str(e)
-        }, status=500) 
\ No newline at end of file
+        }, status=500) 
+
+@require_http_methods(["GET"])
+@internal_only
+@replica_reads
+def get_topic_analytics(request):
+    """Global request, token and latency stats per subject/topic from hourly rollups."""
+    try:
+        try:
+            hours = min(max(int(request.GET.get('hours', 24 * 7)), 1), 24 * 90)
+        except ValueError:
+            hours = 24 * 7
+
+        group_by = tuple(
+            field for field in request.GET.get('group_by', 'subject,topic').split(',')
+            if field in GROUP_FIELDS
+        ) or ('subject',)
+
+        rows = TopicHourlyUsage.objects.filter(
+            hour__gte=timezone.now() - timedelta(hours=hours)
+        )
+        subject = request.GET.get('subject')
+        if subject:
+            rows = rows.filter(subject=subject.lower())
+
+        summary = summarize(
+            rows.only(
+                *group_by, 'requests', 'prompt_tokens', 'completion_tokens',
+                'total_latency_ms', 'latency_histogram',
+            ).iterator(chunk_size=2000),
+            group_by,
+        )
+
+        return JsonResponse({
+            'status': 'success',
+            'data': {
+                'hours': hours,
+                'group_by': list(group_by),
+                'groups': summary[:200],
+            }
+        })
+
+    except Exception as e:
+        logger.error(f"Error fetching topic analytics: {str(e)}")
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
@@ -14,7 +14,9 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token  # Add this import
 from django.http import HttpResponse
+from core.http_cache import precomputed_response
 
+@precomputed_response(max_age=60, s_maxage=3600)
 def index(request):
     return HttpResponse("Backend is running")
 
@@ -6,7 +6,12 @@ import pytest
 src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
 sys.path.insert(0, src_path)
 
+# Model modules need a configured app registry to import
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+
 @pytest.fixture(scope="function")
 def math_agent():
     from main.agents.math_agent import MathAgent
-    return MathAgent()
\ No newline at end of file
+    return MathAgent()
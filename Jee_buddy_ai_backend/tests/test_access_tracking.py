@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from main.access_tracking import AccessTracker
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = AccessTracker(interval=3600, max_pending=3)
+    monkeypatch.setattr(tracker, 'ensure_started', lambda: None)
+    return tracker
+
+
+class TestAccessTracker:
+    def test_buffers_latest_time_and_hits(self, tracker):
+        earlier = timezone.now() - timedelta(minutes=5)
+        now = timezone.now()
+        tracker.record([1, 2], at=now)
+        tracker.record([1], at=earlier)
+        assert tracker._pending == {1: [now, 2], 2: [now, 1]}
+
+    def test_full_buffer_wakes_the_flusher(self, tracker):
+        tracker.record([1, 2])
+        assert not tracker._wake.is_set()
+        tracker.record([3])
+        assert tracker._wake.is_set()
+
+    def test_failed_flush_keeps_entries(self, tracker, monkeypatch):
+        from main import access_tracking
+
+        def unavailable(*args, **kwargs):
+            raise RuntimeError('database unavailable')
+
+        monkeypatch.setattr(access_tracking.transaction, 'atomic', unavailable)
+        now = timezone.now()
+        tracker.record([7], at=now)
+        assert tracker.flush() == 0
+        tracker.record([7], at=now)
+        assert tracker._pending == {7: [now, 2]}
+
+    def test_empty_flush_skips_the_database(self, tracker):
+        assert tracker.flush() == 0
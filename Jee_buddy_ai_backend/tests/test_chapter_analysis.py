@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from main.chapter_analysis import CallThrottle, analyze_chapters
+
+
+def _chapters(count):
+    return {f'Chapter {i}': f'content {i}' for i in range(1, count + 1)}
+
+
+class TestAnalyzeChapters:
+    async def test_keeps_chapter_order_whatever_order_they_finish(self):
+        async def analyze(chapter, content):
+            # Later chapters finish first
+            await asyncio.sleep(0.05 / int(chapter.split()[1]))
+            return content.upper()
+
+        result = await analyze_chapters(_chapters(6), analyze, CallThrottle(concurrency=6))
+        assert list(result) == [f'Chapter {i}' for i in range(1, 7)]
+        assert result['Chapter 3'] == 'CONTENT 3'
+
+    async def test_concurrency_is_capped(self):
+        running = peak = 0
+
+        async def analyze(chapter, content):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return ''
+
+        await analyze_chapters(_chapters(10), analyze, CallThrottle(concurrency=3))
+        assert peak == 3
+
+    async def test_rate_limit_spaces_call_starts(self):
+        loop = asyncio.get_running_loop()
+        starts = []
+
+        async def analyze(chapter, content):
+            starts.append(loop.time())
+            return ''
+
+        # 1200 a minute is one call every 50 ms
+        await analyze_chapters(_chapters(4), analyze, CallThrottle(concurrency=4, requests_per_minute=1200))
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        assert min(gaps) >= 0.045
+
+    async def test_reports_progress_as_chapters_finish(self):
+        async def analyze(chapter, content):
+            return ''
+
+        progress = []
+        await analyze_chapters(_chapters(3), analyze, CallThrottle(),
+                               on_progress=lambda done, total, chapter: progress.append((done, total)))
+        assert progress == [(1, 3), (2, 3), (3, 3)]
+
+    async def test_a_failure_cancels_the_rest(self):
+        cancelled = []
+
+        async def analyze(chapter, content):
+            if chapter == 'Chapter 1':
+                raise RuntimeError('boom')
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(chapter)
+                raise
+            return ''
+
+        with pytest.raises(RuntimeError):
+            await analyze_chapters(_chapters(3), analyze, CallThrottle(concurrency=3))
+        await asyncio.sleep(0)
+        assert sorted(cancelled) == ['Chapter 2', 'Chapter 3']
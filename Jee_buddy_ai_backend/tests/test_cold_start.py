@@ -0,0 +1,16 @@
+import importlib.util
+import os
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'profile_cold_start.py')
+spec = importlib.util.spec_from_file_location('profile_cold_start', SCRIPT)
+profile_cold_start = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(profile_cold_start)
+
+
+@pytest.mark.parametrize('entry', ['core.wsgi', 'core.vercel_wsgi'])
+def test_entry_point_stays_within_cold_start_budget(entry):
+    report = profile_cold_start.profile(entry)
+    assert report['heavy_modules'] == [], f"{entry} imports SDKs at startup"
+    assert report['import_ms'] <= profile_cold_start.DEFAULT_BUDGET_MS, report['top_packages']
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from core.pooled_postgresql.pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.connection.broken:
+            raise OSError('server closed the connection unexpectedly')
+        self.connection.pings += 1
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.info = type('Info', (), {'transaction_status': extensions.TRANSACTION_STATUS_IDLE})()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def _pool(**options):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    options.setdefault('ping_after', 60)
+    return ConnectionPool(**options), connect, opened
+
+
+class TestConnectionPool:
+    def test_returned_connections_are_reused(self):
+        pool, connect, opened = _pool(max_size=2)
+        first = pool.getconn(connect)
+        pool.putconn(first)
+        assert pool.getconn(connect) is first
+        assert len(opened) == 1
+        assert pool.stats()['checkouts'] == 2
+
+    def test_checkout_waits_for_a_free_connection_then_times_out(self):
+        pool, connect, _ = _pool(max_size=1, timeout=0.05)
+        held = pool.getconn(connect)
+        with pytest.raises(PoolTimeout):
+            pool.getconn(connect)
+
+        threading.Timer(0.02, pool.putconn, [held]).start()
+        pool.timeout = 1
+        assert pool.getconn(connect) is held
+        stats = pool.stats()
+        assert stats['timeouts'] == 1
+        assert stats['waits'] == 2
+
+    def test_idle_connections_are_pinged_and_broken_ones_replaced(self):
+        pool, connect, opened = _pool(max_size=2, ping_after=0)
+        connection = pool.getconn(connect)
+        pool.putconn(connection)
+        connection.broken = True
+        replacement = pool.getconn(connect)
+        assert replacement is not connection
+        assert connection.closed
+        assert pool.stats()['health_check_failures'] == 1
+        assert pool.stats()['size'] == 1
+
+    def test_open_transactions_are_rolled_back_and_failed_ones_dropped(self):
+        pool, connect, _ = _pool(max_size=2)
+        in_transaction, failed = pool.getconn(connect), pool.getconn(connect)
+        in_transaction.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        failed.info.transaction_status = extensions.TRANSACTION_STATUS_INERROR
+        pool.putconn(in_transaction)
+        pool.putconn(failed)
+        assert in_transaction.rollbacks == 1
+        assert failed.closed
+        assert pool.stats()['idle'] == 1
+
+    def test_idle_timeout_keeps_min_size(self):
+        pool, connect, _ = _pool(min_size=1, max_size=3, idle_timeout=0.01)
+        connections = [pool.getconn(connect) for _ in range(3)]
+        pool._warmer.join(1)
+        for connection in connections:
+            pool.putconn(connection)
+        time.sleep(0.02)
+        pool.getconn(connect)
+        assert sum(connection.closed for connection in connections) == 2
+        assert pool.stats()['size'] == 1
+
+    def test_first_checkout_warms_the_pool_to_min_size(self):
+        pool, connect, opened = _pool(min_size=3, max_size=5)
+        first = pool.getconn(connect)
+        pool._warmer.join(1)
+        stats = pool.stats()
+        assert stats['size'] == 3
+        assert stats['idle'] == 2
+        assert len(opened) == 3
+        # The warm connections are what the next checkouts get.
+        pool.getconn(connect), pool.getconn(connect)
+        assert len(opened) == 3
+        pool.putconn(first)
+
+    def test_warming_stops_on_a_connect_failure(self):
+        pool, _, _ = _pool(min_size=2, max_size=5)
+
+        def refuse():
+            raise OSError('connection refused')
+
+        pool.warm(refuse)
+        assert pool.stats()['size'] == 0
+
+    def test_failed_connect_releases_its_slot(self):
+        pool, _, _ = _pool(max_size=1)
+
+        def refuse():
+            raise OSError('connection refused')
+
+        with pytest.raises(OSError):
+            pool.getconn(refuse)
+        assert pool.stats()['size'] == 0
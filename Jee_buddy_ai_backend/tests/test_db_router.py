@@ -0,0 +1,83 @@
+import time
+
+import pytest
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from core import db_router
+from core.db_router import ReplicaPinningMiddleware, ReplicaRouter, replica_reads
+from main.models import ChatHistory
+from subscription.models import Subscription
+
+factory = RequestFactory()
+
+
+@pytest.fixture
+def replica(monkeypatch, tmp_path):
+    monkeypatch.setattr(db_router, 'replica_configured', lambda: True)
+    monkeypatch.setattr(db_router.lag_monitor, 'ensure_started', lambda: None)
+    monkeypatch.setattr(db_router.lag_monitor, 'lag', 0.5)
+    monkeypatch.setattr(db_router.lag_monitor, 'measured_at', time.monotonic())
+    # Shared by every process on the host, unlike the default LocMemCache
+    shared_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                'LOCATION': str(tmp_path / 'cache')}}
+    with override_settings(REPLICA_READ_MODELS=['main.ChatHistory'], CACHES=shared_cache):
+        yield ReplicaRouter()
+
+
+def _serve(view, request):
+    return ReplicaPinningMiddleware(view)(request)
+
+
+class TestReplicaRouter:
+    def test_refuses_to_start_with_a_process_local_cache(self, replica):
+        local_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=local_cache), pytest.raises(ImproperlyConfigured):
+            ReplicaPinningMiddleware(lambda request: HttpResponse())
+
+    def test_reads_outside_requests_stay_on_primary(self, replica):
+        assert replica.db_for_read(ChatHistory) is None
+
+    def test_designated_models_read_from_replica(self, replica):
+        def view(request):
+            assert replica.db_for_read(ChatHistory) == 'replica'
+            assert replica.db_for_read(Subscription) is None
+            return HttpResponse()
+
+        _serve(view, factory.get('/history/'))
+
+    def test_designated_views_read_everything_from_replica(self, replica):
+        @replica_reads
+        def view(request):
+            assert replica.db_for_read(Subscription) == 'replica'
+            return HttpResponse()
+
+        _serve(view, factory.get('/stats/'))
+
+    def test_lagging_replica_falls_back_to_primary(self, replica, monkeypatch):
+        monkeypatch.setattr(db_router.lag_monitor, 'lag', 60.0)
+
+        def view(request):
+            assert replica.db_for_read(ChatHistory) is None
+            return HttpResponse()
+
+        _serve(view, factory.get('/history/'))
+
+    def test_write_pins_the_user_to_primary(self, replica):
+        def write_view(request):
+            assert replica.db_for_read(ChatHistory) == 'replica'
+            replica.db_for_write(ChatHistory)
+            assert replica.db_for_read(ChatHistory) is None
+            return HttpResponse()
+
+        response = _serve(write_view, factory.post('/solve/', HTTP_X_USER_ID='user-9'))
+        assert response.cookies[db_router.PIN_COOKIE]['max-age'] == settings.REPLICA_PIN_SECONDS
+
+        def read_view(request):
+            assert replica.db_for_read(ChatHistory) is None
+            return HttpResponse()
+
+        # Pinned by user id even without the cookie.
+        _serve(read_view, factory.get('/history/', {'user_id': 'user-9'}))
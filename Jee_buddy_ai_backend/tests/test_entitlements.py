@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+
+import jwt
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from subscription.entitlements import Entitlement, EntitlementCache, load_entitlement
+from subscription import middleware as middleware_module
+from subscription.middleware import EntitlementMiddleware, get_verified_user_id
+from subscription.plans import DAILY_SOLVE_LIMITS
+
+JWT_SECRET = 'test-jwt-secret-of-at-least-32-bytes'
+
+
+@pytest.fixture(autouse=True)
+def jwt_secret():
+    with override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, SUPABASE_JWT_AUDIENCE='authenticated'):
+        yield
+
+
+def _token(sub='user-1', secret=JWT_SECRET, **claims):
+    claims = {'sub': sub, 'aud': 'authenticated', 'exp': int(time.time()) + 3600, **claims}
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+def _solve(token=None, **extra):
+    if token:
+        extra['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return RequestFactory().post('/api/solve-math/', **extra)
+
+
+def _loader(plan='BASIC', limit=3, used=0, calls=None):
+    def load(user_id):
+        if calls is not None:
+            calls.append(user_id)
+        return Entitlement(plan=plan, daily_limit=limit, used_today=used,
+                           day=timezone.now().date(), fetched_at=time.monotonic())
+    return load
+
+
+class TestEntitlementCache:
+    def test_first_lookup_loads_then_serves_from_memory(self):
+        calls = []
+        cache = EntitlementCache(ttl=60, loader=_loader(calls=calls))
+        cache.get('user-1')
+        cache.get('user-1')
+        assert calls == ['user-1']
+
+    def test_consume_rejects_once_quota_is_used(self):
+        cache = EntitlementCache(ttl=60, loader=_loader(limit=2))
+        assert cache.consume('user-1')[0]
+        assert cache.consume('user-1')[0]
+        admitted, entitlement = cache.consume('user-1')
+        assert not admitted
+        assert entitlement.remaining == 0
+
+    def test_unlimited_plan_is_never_exhausted(self):
+        cache = EntitlementCache(ttl=60, loader=_loader(plan='PREMIUM', limit=None))
+        assert all(cache.consume('user-1')[0] for _ in range(100))
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        calls = []
+        released = threading.Event()
+        base = _loader(used=1, calls=calls)
+
+        def slow_loader(user_id):
+            if calls:
+                released.wait(5)
+            return base(user_id)
+
+        cache = EntitlementCache(ttl=0, loader=slow_loader)
+        cache.get('user-1')
+        # The refresh is blocked, yet the stale entry comes back immediately.
+        assert cache.get('user-1').used_today == 1
+        released.set()
+        cache._executor.shutdown(wait=True)
+        assert len(calls) == 2
+
+    def test_refresh_keeps_locally_counted_admissions(self):
+        cache = EntitlementCache(ttl=60, loader=_loader(limit=5, used=0))
+        cache.consume('user-1')
+        cache.consume('user-1')
+        cache._store('user-1', _loader(limit=5, used=1)('user-1'))
+        assert cache.get('user-1').used_today == 2
+
+
+class TestAsyncEntitlementMiddleware:
+    def _middleware(self, limit, status=200):
+        async def get_response(request):
+            return HttpResponse('solved', status=status)
+
+        middleware = EntitlementMiddleware(get_response)
+        middleware.cache = EntitlementCache(ttl=60, loader=_loader(limit=limit))
+        return middleware
+
+    async def test_admits_then_rejects_on_async_path(self):
+        middleware = self._middleware(limit=1)
+        request = lambda: _solve(_token())
+        admitted = await middleware(request())
+        assert admitted.status_code == 200
+        assert admitted['X-Quota-Remaining'] == '0'
+        rejected = await middleware(request())
+        assert rejected.status_code == 429
+
+    async def test_cache_hits_stay_on_the_event_loop(self, monkeypatch):
+        hops = []
+        real_sync_to_async = middleware_module.sync_to_async
+
+        def counting_sync_to_async(fn):
+            hops.append(fn)
+            return real_sync_to_async(fn)
+
+        monkeypatch.setattr(middleware_module, 'sync_to_async', counting_sync_to_async)
+        middleware = self._middleware(limit=5)
+        request = lambda: _solve(_token())
+        await middleware(request())
+        await middleware(request())
+        assert len(hops) == 1
+
+    async def test_ungated_paths_pass_straight_through(self):
+        middleware = self._middleware(limit=0)
+        response = await middleware(RequestFactory().get('/api/subscription/plans/'))
+        assert response.status_code == 200
+
+    async def test_anonymous_requests_get_the_anonymous_quota(self):
+        middleware = self._middleware(limit=None)
+        middleware.cache = EntitlementCache(ttl=60, loader=load_entitlement)
+        for _ in range(DAILY_SOLVE_LIMITS['ANONYMOUS']):
+            response = await middleware(RequestFactory().post('/api/solve-math/'))
+            assert response.status_code == 200
+        rejected = await middleware(RequestFactory().post('/api/solve-math/'))
+        assert rejected.status_code == 429
+        assert json.loads(rejected.content)['plan'] == 'ANONYMOUS'
+
+    async def test_failed_solves_are_refunded(self):
+        middleware = self._middleware(limit=1, status=500)
+        request = lambda: _solve(_token())
+        failed = await middleware(request())
+        assert failed.status_code == 500
+        assert failed['X-Quota-Remaining'] == '1'
+        assert (await middleware(request())).status_code == 500
+
+    async def test_claimed_user_ids_do_not_get_their_own_quota(self):
+        middleware = self._middleware(limit=None)
+        middleware.cache = EntitlementCache(ttl=60, loader=load_entitlement)
+        for i in range(DAILY_SOLVE_LIMITS['ANONYMOUS']):
+            assert (await middleware(_solve(HTTP_X_USER_ID=f'made-up-{i}'))).status_code == 200
+        rejected = await middleware(_solve(HTTP_X_USER_ID='made-up-again'))
+        assert rejected.status_code == 429
+        assert json.loads(rejected.content)['plan'] == 'ANONYMOUS'
+
+
+class TestVerifiedUserId:
+    def test_a_valid_token_gives_its_subject(self):
+        assert get_verified_user_id(_solve(_token('user-7'))) == 'user-7'
+
+    @pytest.mark.parametrize('token', [
+        _token(secret='someone-elses-secret-of-32-bytes-or-more'),
+        _token(exp=int(time.time()) - 60),
+        _token(aud='anon'),
+        'not-a-jwt',
+    ])
+    def test_invalid_tokens_are_ignored(self, token):
+        assert get_verified_user_id(_solve(token)) is None
+
+    def test_claimed_ids_are_not_verified(self):
+        request = _solve(HTTP_X_USER_ID='user-1', data=json.dumps({'context': {'user_id': 'user-1'}}),
+                         content_type='application/json')
+        assert get_verified_user_id(request) is None
+
+    def test_no_secret_means_no_verified_users(self):
+        with override_settings(SUPABASE_JWT_SECRET=None):
+            assert get_verified_user_id(_solve(_token())) is None
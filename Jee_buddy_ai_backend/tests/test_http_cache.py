@@ -0,0 +1,73 @@
+from django.http import JsonResponse
+from django.test import RequestFactory
+
+from core.http_cache import PrecomputedBody, precomputed_response
+
+factory = RequestFactory()
+
+
+def _counting_view():
+    calls = []
+
+    @precomputed_response(max_age=300, s_maxage=3600)
+    def view(request):
+        calls.append(request)
+        return JsonResponse({'plans': ['BASIC', 'PRO']})
+
+    return view, calls
+
+
+class TestPrecomputedResponse:
+    def test_view_runs_once_and_is_replayed_with_cache_headers(self):
+        view, calls = _counting_view()
+        first = view(factory.get('/plans/'))
+        second = view(factory.get('/plans/'))
+        assert len(calls) == 1
+        assert first.content == second.content
+        assert first['ETag'] == second['ETag']
+        assert 'max-age=300' in second['Cache-Control']
+        assert 's-maxage=3600' in second['Cache-Control']
+
+    def test_matching_if_none_match_returns_304(self):
+        view, _ = _counting_view()
+        etag = view(factory.get('/plans/'))['ETag']
+        response = view(factory.get('/plans/', HTTP_IF_NONE_MATCH=etag))
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response['ETag'] == etag
+
+    def test_stale_etag_gets_full_body(self):
+        view, _ = _counting_view()
+        response = view(factory.get('/plans/', HTTP_IF_NONE_MATCH='"stale"'))
+        assert response.status_code == 200
+
+    def test_other_methods_bypass_the_cache(self):
+        view, calls = _counting_view()
+        view(factory.post('/plans/'))
+        view(factory.post('/plans/'))
+        assert len(calls) == 2
+
+
+class TestPrecomputedBody:
+    def test_matches_strong_weak_and_wildcard(self):
+        body = PrecomputedBody(b'{"status":"healthy"}', 'application/json')
+        assert body.matches(body.etag)
+        assert body.matches(f'"other", W/{body.etag}')
+        assert body.matches('*')
+        assert not body.matches('"other"')
+        assert not body.matches(None)
+
+
+class TestAsyncPrecomputedResponse:
+    async def test_async_view_is_replayed(self):
+        calls = []
+
+        @precomputed_response(max_age=60)
+        async def view(request):
+            calls.append(request)
+            return JsonResponse({'plans': []})
+
+        first = await view(factory.get('/plans/'))
+        second = await view(factory.get('/plans/', HTTP_IF_NONE_MATCH=first['ETag']))
+        assert len(calls) == 1
+        assert second.status_code == 304
@@ -0,0 +1,61 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, override_settings
+
+from core.views import database_pool_stats, query_stats
+from usage.views import get_topic_analytics
+
+TOKEN = 'internal-token'
+factory = RequestFactory()
+
+
+@pytest.fixture(autouse=True)
+def internal_token():
+    with override_settings(INTERNAL_API_TOKEN=TOKEN):
+        yield
+
+
+def _get(path, user=None, **headers):
+    request = factory.get(path, **headers)
+    request.user = user or AnonymousUser()
+    return request
+
+
+ENDPOINTS = [
+    (database_pool_stats, '/api/health/db-pool/'),
+    (query_stats, '/api/health/queries/'),
+]
+
+
+@pytest.mark.parametrize('view, path', ENDPOINTS)
+class TestMonitoringEndpoints:
+    def test_anonymous_callers_are_turned_away(self, view, path):
+        response = view(_get(path))
+        assert response.status_code == 403
+        assert json.loads(response.content)['status'] == 'error'
+
+    def test_a_wrong_token_is_turned_away(self, view, path):
+        assert view(_get(path, HTTP_X_INTERNAL_TOKEN='guess')).status_code == 403
+
+    def test_the_internal_token_gets_in(self, view, path):
+        assert view(_get(path, HTTP_X_INTERNAL_TOKEN=TOKEN)).status_code == 200
+
+    def test_staff_sessions_get_in(self, view, path):
+        staff = SimpleNamespace(is_active=True, is_staff=True)
+        assert view(_get(path, user=staff)).status_code == 200
+        former_staff = SimpleNamespace(is_active=False, is_staff=True)
+        assert view(_get(path, user=former_staff)).status_code == 403
+
+    def test_no_configured_token_admits_no_token(self, view, path):
+        with override_settings(INTERNAL_API_TOKEN=None):
+            assert view(_get(path, HTTP_X_INTERNAL_TOKEN='')).status_code == 403
+
+
+def test_global_topic_analytics_are_internal():
+    # The allowed path reads the rollup tables, so only the refusal is
+    # checked here.
+    assert get_topic_analytics(_get('/api/usage/analytics/topics/')).status_code == 403
+    assert get_topic_analytics(_get('/api/usage/analytics/topics/', HTTP_X_INTERNAL_TOKEN='guess')).status_code == 403
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from main import pdf_pages
+from main.pdf_pages import iter_pdf_pages
+
+
+def _pdf(path, pages):
+    """A minimal PDF with one line of Helvetica text per page."""
+    count = len(pages)
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [{}] /Count {} >>'.format(
+            ' '.join(f'{4 + 2 * i} 0 R' for i in range(count)), count),
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i, text in enumerate(pages):
+        stream = f'BT /F1 18 Tf 72 720 Td ({text}) Tj ET'
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>')
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+
+    body = b'%PDF-1.4\n'
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f'{number} 0 obj\n{obj}\nendobj\n'.encode('latin-1')
+    xref = len(body)
+    body += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    body += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('latin-1')
+    body += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(body)
+    return str(path)
+
+
+@pytest.fixture
+def book(tmp_path):
+    return _pdf(tmp_path / 'book.pdf', [f'Chapter {i} page text' for i in range(1, 21)])
+
+
+class TestIterPdfPages:
+    def test_yields_every_page_in_order(self, book, tmp_path):
+        pages = list(iter_pdf_pages(book, cache_dir=str(tmp_path / 'cache')))
+        assert [p.strip() for p in pages] == [f'Chapter {i} page text' for i in range(1, 21)]
+
+    def test_rerun_is_served_from_the_cache(self, book, tmp_path, monkeypatch):
+        cache_dir = str(tmp_path / 'cache')
+        first = list(iter_pdf_pages(book, cache_dir=cache_dir))
+
+        def no_parsing(path):
+            raise AssertionError('the PDF was opened again')
+
+        monkeypatch.setattr(pdf_pages, '_open', no_parsing)
+        assert list(iter_pdf_pages(book, cache_dir=cache_dir)) == first
+
+    def test_stopping_early_only_extracts_what_was_read(self, book, tmp_path):
+        cache_dir = str(tmp_path / 'cache')
+        pages = iter_pdf_pages(book, cache_dir=cache_dir)
+        assert next(pages).strip() == 'Chapter 1 page text'
+        pages.close()
+        cached = os.listdir(os.path.join(cache_dir, pdf_pages.file_hash(book)))
+        assert sorted(cached) == ['0.txt', 'pages']
+
+        # The next run picks up from the first uncached page.
+        assert len(list(iter_pdf_pages(book, cache_dir=cache_dir))) == 20
+
+    def test_a_file_is_hashed_once_until_it_changes(self, book, monkeypatch):
+        opened = []
+        real_open = open
+
+        def counting_open(path, *args, **kwargs):
+            opened.append(path)
+            return real_open(path, *args, **kwargs)
+
+        first = pdf_pages.file_hash(book)
+        monkeypatch.setattr('builtins.open', counting_open)
+        assert pdf_pages.file_hash(book) == first
+        assert opened == []
+
+        with real_open(book, 'ab') as f:
+            f.write(b'% appended\n')
+        assert pdf_pages.file_hash(book) != first
+        assert opened == [book]
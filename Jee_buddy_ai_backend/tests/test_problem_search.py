@@ -0,0 +1,43 @@
+import io
+
+from main import search
+from main.problem_import import read_problems
+
+
+class TestSearchQuerysets:
+    def test_fulltext_uses_search_vector_and_rank(self):
+        sql = str(search.fulltext_queryset('quadratic roots', category='Algebra').query)
+        assert 'websearch_to_tsquery' in sql
+        assert 'ts_rank_cd' in sql
+        assert '"search_vector" @@' in sql
+
+    def test_fuzzy_uses_word_similarity(self):
+        sql = str(search.fuzzy_queryset('quadratc').query)
+        assert '%>' in sql
+        assert 'WORD_SIMILARITY' in sql.upper()
+
+
+class TestPageBounds:
+    def test_fetches_one_extra_row(self):
+        assert search.page_bounds(2, 20) == (2, 20, 20, 41)
+
+    def test_clamps_page_and_size(self):
+        assert search.page_bounds(0, 500) == (1, search.MAX_PAGE_SIZE, 0, search.MAX_PAGE_SIZE + 1)
+
+
+class TestReadProblems:
+    def test_csv_skips_blank_questions_and_truncates(self):
+        stream = io.StringIO(
+            'question,category,difficulty\n'
+            '"Find x, given x^2=4",Algebra,easy\n'
+            ',Algebra,easy\n'
+            f'Integrate sin x,{"c" * 150},hard\n'
+        )
+        rows = list(read_problems(stream, 'csv'))
+        assert rows[0] == ('Find x, given x^2=4', 'Algebra', 'easy')
+        assert len(rows) == 2
+        assert len(rows[1][1]) == 100
+
+    def test_jsonl(self):
+        stream = io.StringIO('{"question": "Limit of sin x / x", "category": "Calculus"}\n\n')
+        assert list(read_problems(stream, 'jsonl')) == [('Limit of sin x / x', 'Calculus', '')]
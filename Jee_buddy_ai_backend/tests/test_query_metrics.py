@@ -0,0 +1,66 @@
+from functools import partial
+
+import pytest
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from core import query_metrics
+from core.query_metrics import QueryMetricsMiddleware, QueryRecorder, query_budget, route_stats
+
+
+def _fake_execute(sql, params, many, context):
+    return None
+
+
+def _run(sql, params=()):
+    """Push a statement through the installed execute wrappers, without a database."""
+    execute = _fake_execute
+    for wrapper in reversed(connection.execute_wrappers):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, False, {'connection': connection, 'cursor': None})
+
+
+class TestQueryRecorder:
+    def test_counts_and_tracks_slowest(self, monkeypatch):
+        recorder = QueryRecorder()
+        ticks = iter([0.0, 0.002, 0.010, 0.050])
+        monkeypatch.setattr(query_metrics.time, 'perf_counter', lambda: next(ticks))
+        recorder(_fake_execute, 'SELECT 1', (), False, {})
+        recorder(_fake_execute, 'SELECT 2', (), False, {})
+        summary = recorder.summary()
+        assert summary['queries'] == 2
+        assert summary['db_ms'] == 42.0
+        assert summary['slowest_sql'] == 'SELECT 2'
+
+
+class TestQueryBudget:
+    def test_within_budget_passes(self):
+        with query_budget(2) as recorder:
+            _run('SELECT 1')
+            _run('SELECT 2')
+        assert recorder.count == 2
+
+    def test_over_budget_lists_statements(self):
+        with pytest.raises(AssertionError) as excinfo:
+            with query_budget(1, explain_over_ms=None):
+                _run('SELECT "main_chathistory"."id" FROM "main_chathistory"')
+                _run('SELECT 2')
+        message = str(excinfo.value)
+        assert '2 queries, budget 1' in message
+        assert 'main_chathistory' in message
+
+
+class TestQueryMetricsMiddleware:
+    def test_reports_server_timing_and_route_stats(self):
+        def view(request):
+            _run('SELECT 1')
+            _run('SELECT 2')
+            return HttpResponse()
+
+        request = RequestFactory().get('/api/usage/stats/')
+        request.resolver_match = type('Match', (), {'route': 'api/usage/stats/'})()
+        response = QueryMetricsMiddleware(view)(request)
+        assert response['Server-Timing'].endswith('desc="2 queries"')
+        assert route_stats.snapshot()['GET /api/usage/stats/']['max_queries'] >= 2
+        assert connection.execute_wrappers == []
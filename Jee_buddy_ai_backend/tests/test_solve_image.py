@@ -0,0 +1,115 @@
+import asyncio
+import base64
+import io
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+from PIL import Image, ImageDraw, ImageFont
+
+from main import views
+from main.image_prep import prepare_upload
+from subscription.middleware import get_request_user_id
+
+factory = RequestFactory()
+
+
+def _jpeg(width, height):
+    buffered = io.BytesIO()
+    Image.new('RGB', (width, height), 'white').save(buffered, format='JPEG')
+    return buffered.getvalue()
+
+
+def _desk_photo():
+    """A printed question on a sheet of paper, small in a dark, tilted frame."""
+    page = Image.new('RGB', (1400, 500), (245, 244, 240))
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=40)
+    draw.text((100, 150), 'Find the equivalent resistance between A and B.', fill=(20, 20, 30), font=font)
+    draw.text((100, 230), 'Each resistor is 4 ohm.', fill=(20, 20, 30), font=font)
+    photo = Image.new('RGB', (4000, 3000), (90, 60, 40))
+    photo.paste(page.rotate(4, expand=True, fillcolor=(90, 60, 40)), (1200, 1100))
+    buffered = io.BytesIO()
+    photo.save(buffered, format='JPEG', quality=90)
+    return buffered.getvalue()
+
+
+def _decode(url):
+    return Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1])))
+
+
+def _multipart(image_bytes, context=None):
+    return factory.post('/api/solve-math/', {
+        'question': 'Find the equivalent resistance',
+        'context': json.dumps(context or {'user_id': 'user-1', 'session_id': 's1'}),
+        'image': SimpleUploadedFile('circuit.jpg', image_bytes, content_type='image/jpeg'),
+    })
+
+
+class TestPrepareUpload:
+    def test_downscales_to_a_jpeg_data_url(self):
+        url = prepare_upload(io.BytesIO(_jpeg(4000, 3000)), max_dimension=1600)
+        assert url.startswith('data:image/jpeg;base64,')
+        image = Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1])))
+        assert max(image.size) == 1600
+
+    def test_enhance_crops_to_the_question(self):
+        plain = _decode(prepare_upload(io.BytesIO(_desk_photo())))
+        enhanced = _decode(prepare_upload(io.BytesIO(_desk_photo()), enhance=True))
+        assert enhanced.width * enhanced.height < plain.width * plain.height / 4
+        # The text is still there: plenty of dark pixels, on a light page
+        histogram = enhanced.convert('L').histogram()
+        assert sum(histogram[:128]) > 500
+        assert sum(histogram[128:]) > sum(histogram[:128])
+
+    def test_enhance_leaves_blank_images_alone(self):
+        url = prepare_upload(io.BytesIO(_jpeg(4000, 3000)), max_dimension=1600, enhance=True)
+        assert url.startswith('data:image/jpeg;base64,')
+        assert max(_decode(url).size) == 1600
+
+    def test_rejects_non_images_and_oversized_images(self):
+        with pytest.raises(ValueError):
+            prepare_upload(io.BytesIO(b'not an image'))
+        with pytest.raises(ValueError, match='pixels'):
+            prepare_upload(io.BytesIO(_jpeg(400, 300)), max_pixels=1000)
+
+
+class TestMultipartSolve:
+    def test_image_reaches_the_solve_pipeline(self, monkeypatch):
+        received = {}
+
+        async def process(data):
+            received.update(data)
+            return {'solution': 'R = 4/3 ohm'}, 200
+
+        monkeypatch.setattr(views, 'process_math_problem', process)
+        response = asyncio.run(views.solve_math_problem(_multipart(_jpeg(800, 600))))
+        assert response.status_code == 200
+        assert received['context']['session_id'] == 's1'
+        assert received['image'].startswith('data:image/jpeg;base64,')
+
+    def test_json_bodies_cannot_name_an_image(self, monkeypatch):
+        received = {}
+
+        async def process(data):
+            received.update(data)
+            return {'solution': 'x = 2'}, 200
+
+        monkeypatch.setattr(views, 'process_math_problem', process)
+        request = factory.post('/api/solve-math/', json.dumps({
+            'question': 'Solve 2x = 4',
+            'context': {'user_id': 'user-1'},
+            'image': 'https://example.com/huge.png',
+        }), content_type='application/json')
+        response = asyncio.run(views.solve_math_problem(request))
+        assert response.status_code == 200
+        assert 'image' not in received
+
+    def test_invalid_image_is_a_bad_request(self):
+        response = asyncio.run(views.solve_math_problem(_multipart(b'not an image')))
+        assert response.status_code == 400
+        assert json.loads(response.content)['error'] == 'Invalid image'
+
+    def test_claimed_user_id_comes_from_the_form_context(self):
+        assert get_request_user_id(_multipart(_jpeg(10, 10))) == 'user-1'
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+from usage.models import StudyStats
+from usage.sessions import SESSION_TAIL, StatsPrefetcher, sessionize, study_seconds
+
+T0 = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def _minutes(*offsets):
+    return [T0 + timedelta(minutes=m) for m in offsets]
+
+
+def _run(rows, stored=None):
+    stored = stored or {}
+    return {
+        stats.user_id: stats
+        for stats in sessionize(rows, lambda user_id: stored.get(user_id) or StudyStats(user_id=user_id))
+    }
+
+
+class TestSessionize:
+    def test_splits_sessions_on_inactivity_gap(self):
+        rows = [('u1', ts) for ts in _minutes(0, 10, 20, 120, 125)]
+        stats = _run(rows)['u1']
+        assert stats.sessions == 2
+        # First session 0..20 closed; second 120..125 still open.
+        assert stats.closed_seconds == (timedelta(minutes=20) + SESSION_TAIL).total_seconds()
+        assert stats.open_session_start == T0 + timedelta(minutes=120)
+        assert study_seconds(stats) == (timedelta(minutes=25) + 2 * SESSION_TAIL).total_seconds()
+
+    def test_users_are_yielded_independently(self):
+        rows = [('u1', ts) for ts in _minutes(0, 5)] + [('u2', ts) for ts in _minutes(0)]
+        result = _run(rows)
+        assert result['u1'].sessions == 1
+        assert result['u2'].sessions == 1
+
+    def test_incremental_run_extends_the_open_session(self):
+        first = _run([('u1', ts) for ts in _minutes(0, 10)])
+        second = _run([('u1', ts) for ts in _minutes(25, 200)], stored=first)
+        stats = second['u1']
+        assert stats.sessions == 2
+        assert stats.closed_seconds == (timedelta(minutes=25) + SESSION_TAIL).total_seconds()
+
+    def test_consumes_rows_lazily(self):
+        def rows():
+            for i in range(10_000):
+                yield (f'u{i}', T0)
+
+        stream = sessionize(rows(), lambda user_id: StudyStats(user_id=user_id))
+        assert next(stream).user_id == 'u0'
+
+
+class TestStatsPrefetcher:
+    def test_one_lookup_per_chunk_of_rows(self):
+        stored = {'u3': StudyStats(user_id='u3', sessions=4, closed_seconds=600)}
+        lookups = []
+
+        def load_many(user_ids):
+            lookups.append(sorted(user_ids))
+            return {user_id: stored[user_id] for user_id in user_ids if user_id in stored}
+
+        # u2 straddles the first chunk boundary
+        rows = [('u1', T0), ('u2', T0), ('u2', T0 + timedelta(minutes=1)),
+                ('u2', T0 + timedelta(minutes=2)), ('u3', T0), ('u4', T0)]
+        prefetcher = StatsPrefetcher(rows, load_many, chunk_size=3)
+        result = {stats.user_id: stats for stats in sessionize(prefetcher.rows(), prefetcher.load)}
+
+        assert lookups == [['u1', 'u2'], ['u2', 'u3', 'u4']]
+        assert result['u3'] is stored['u3']
+        assert result['u3'].sessions == 5
+        # Loaded once, in the first chunk, and extended across the boundary
+        assert result['u2'].sessions == 1
+        assert result['u2'].last_activity_at == T0 + timedelta(minutes=2)
+        assert result['u4'].pk is None
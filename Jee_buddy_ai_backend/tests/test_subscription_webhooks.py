@@ -0,0 +1,70 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from subscription.models import Subscription, WebhookEvent
+from subscription.webhooks import apply_event, verify_webhook_signature
+
+SECRET = 'whsec_test'
+
+
+def _sign(body: bytes) -> str:
+    return hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _event(event_type, created_at, current_end=None):
+    sub_entity = {'id': 'sub_1', 'plan_id': 'plan_PhmnKiiVXD3B1M'}
+    if current_end:
+        sub_entity['current_end'] = current_end
+    return WebhookEvent(
+        event_id=f'evt_{event_type}_{created_at}',
+        event_type=event_type,
+        event_created_at=created_at,
+        payload={
+            'event': event_type,
+            'created_at': created_at,
+            'payload': {
+                'subscription': {'entity': sub_entity},
+                'payment': {'entity': {'id': 'pay_1', 'amount': 49900, 'currency': 'INR'}},
+            },
+        },
+    )
+
+
+class TestWebhookSignature:
+    def test_valid_signature(self):
+        body = json.dumps({'event': 'subscription.charged'}).encode()
+        assert verify_webhook_signature(body, _sign(body), SECRET)
+
+    @pytest.mark.parametrize('signature', ['', 'deadbeef'])
+    def test_rejects_bad_signature(self, signature):
+        body = b'{"event": "subscription.charged"}'
+        assert not verify_webhook_signature(body, signature, SECRET)
+
+    def test_rejects_tampered_body(self):
+        body = b'{"event": "subscription.charged"}'
+        assert not verify_webhook_signature(body + b' ', _sign(body), SECRET)
+
+
+class TestApplyEvent:
+    def test_charged_activates_and_sets_validity(self):
+        subscription = Subscription(subscription_id='sub_1', status='created')
+        assert apply_event(subscription, _event('subscription.charged', 100, current_end=1_900_000_000))
+        assert subscription.status == 'active'
+        assert subscription.payment_id == 'pay_1'
+        assert subscription.payment_status == 'completed'
+        assert subscription.valid_till.timestamp() == 1_900_000_000
+        assert subscription.last_event_at == 100
+
+    def test_out_of_order_event_is_ignored(self):
+        subscription = Subscription(subscription_id='sub_1', status='created')
+        apply_event(subscription, _event('subscription.cancelled', 200))
+        assert not apply_event(subscription, _event('subscription.activated', 100))
+        assert subscription.status == 'cancelled'
+
+    def test_completed_keeps_access_until_valid_till(self):
+        subscription = Subscription(subscription_id='sub_1', status='active')
+        apply_event(subscription, _event('subscription.completed', 100))
+        assert subscription.status == 'active'
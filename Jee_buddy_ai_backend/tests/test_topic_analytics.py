@@ -0,0 +1,54 @@
+from usage.analytics import (
+    HISTOGRAM_SIZE, LATENCY_BUCKETS_MS, latency_bucket, latency_percentile,
+    merge_histograms, summarize,
+)
+from usage.models import TopicHourlyUsage
+
+
+def _histogram(*latencies):
+    histogram = [0] * HISTOGRAM_SIZE
+    for latency in latencies:
+        histogram[latency_bucket(latency)] += 1
+    return histogram
+
+
+class TestLatencyHistogram:
+    def test_bucket_boundaries_match_width_bucket(self):
+        assert latency_bucket(0) == 0
+        assert latency_bucket(249) == 0
+        assert latency_bucket(250) == 1
+        assert latency_bucket(10 ** 6) == len(LATENCY_BUCKETS_MS)
+
+    def test_merge_pads_shorter_histograms(self):
+        assert merge_histograms([], [1, 2]) == [1, 2] + [0] * (HISTOGRAM_SIZE - 2)
+
+    def test_percentiles_interpolate_inside_bucket(self):
+        histogram = _histogram(*([100] * 50 + [1500] * 50))
+        assert latency_percentile(histogram, 50) == 250
+        assert 1000 < latency_percentile(histogram, 90) <= 2000
+        assert latency_percentile([0] * HISTOGRAM_SIZE, 50) is None
+
+    def test_open_ended_bucket_reports_its_lower_bound(self):
+        assert latency_percentile(_histogram(90000), 99) == LATENCY_BUCKETS_MS[-1]
+
+
+class TestSummarize:
+    def test_groups_merge_across_hours(self):
+        rows = [
+            TopicHourlyUsage(subject='physics', topic='optics', requests=2, prompt_tokens=10,
+                             completion_tokens=30, total_latency_ms=400,
+                             latency_histogram=_histogram(100, 300)),
+            TopicHourlyUsage(subject='physics', topic='kinematics', requests=1, prompt_tokens=5,
+                             completion_tokens=5, total_latency_ms=4000,
+                             latency_histogram=_histogram(4000)),
+            TopicHourlyUsage(subject='maths', topic='', requests=1, prompt_tokens=1,
+                             completion_tokens=1, total_latency_ms=100,
+                             latency_histogram=_histogram(100)),
+        ]
+        summary = summarize(rows, ('subject',))
+        assert [group['subject'] for group in summary] == ['physics', 'maths']
+        physics = summary[0]
+        assert physics['requests'] == 3
+        assert physics['tokens'] == 50
+        assert physics['avg_latency_ms'] == 1467
+        assert physics['p99_latency_ms'] > 3000
@@ -0,0 +1,23 @@
+import importlib.util
+import os
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'vendor_image_enhance.py')
+
+
+def _vendor_script():
+    spec = importlib.util.spec_from_file_location('vendor_image_enhance', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_main_image_enhance_matches_the_math_solver_original():
+    vendor = _vendor_script()
+    if not os.path.exists(vendor.SOURCE):
+        pytest.skip('math_solver is not checked out next to this backend')
+    with open(vendor.SOURCE, encoding='utf-8') as f:
+        expected = vendor.render(f.read())
+    with open(vendor.TARGET, encoding='utf-8') as f:
+        assert f.read() == expected, 'run scripts/vendor_image_enhance.py'
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from openai import AsyncOpenAI
+
+from main.agents import vision
+
+
+def _completion(content):
+    return {
+        'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': vision.VISION_MODEL,
+        'choices': [{'index': 0, 'finish_reason': 'stop',
+                     'message': {'role': 'assistant', 'content': content}}],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12},
+    }
+
+
+class FakeApi:
+    """Clients the module creates, all answered by ``handler``."""
+
+    def __init__(self):
+        self.created = []
+        self.handler = None
+
+    def new_client(self):
+        async def handle(request):
+            return await self.handler(request)
+
+        client = AsyncOpenAI(api_key='test', max_retries=0,
+                             http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+        self.created.append(client)
+        return client
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = FakeApi()
+    monkeypatch.setattr(vision, '_new_client', api.new_client)
+    monkeypatch.setattr(vision, '_client', None)
+    return api
+
+
+def test_requests_on_separate_loops_share_one_open_client(api):
+    async def answer(request):
+        question = json.loads(request.content)['messages'][0]['content']
+        return httpx.Response(200, json=_completion(f'answer to {question}'))
+
+    api.handler = answer
+
+    async def solve(question):
+        response = await vision.create_vision_completion(
+            model=vision.VISION_MODEL, messages=[{'role': 'user', 'content': question}])
+        return response.choices[0].message.content
+
+    # What a WSGI worker does: a fresh event loop per request
+    answers = [async_to_sync(solve)(f'q{i}') for i in range(3)]
+    assert answers == ['answer to q0', 'answer to q1', 'answer to q2']
+    assert len(api.created) == 1
+    assert not api.created[0].is_closed()
+
+
+async def test_cancelling_the_caller_cancels_the_request(api):
+    started, cancelled = threading.Event(), threading.Event()
+
+    async def hang(request):
+        started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    api.handler = hang
+    task = asyncio.create_task(vision.create_vision_completion(
+        model=vision.VISION_MODEL, messages=[{'role': 'user', 'content': 'q'}]))
+    await asyncio.to_thread(started.wait, 5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await asyncio.to_thread(cancelled.wait, 5)
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+
+import httpx
+from fastapi import FastAPI, Request
+from django.http import StreamingHttpResponse
+
+from core.wsgi_bridge import WSGIBridge, build_environ
+
+
+def _client(wsgi_app, max_workers=4):
+    app = FastAPI()
+    bridge = WSGIBridge(wsgi_app, max_workers=max_workers)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def catch_all(request: Request, path: str):
+        return await bridge(request)
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+
+
+def cookie_app(environ, start_response):
+    start_response('201 Created', [
+        ('Content-Type', 'application/json'),
+        ('Set-Cookie', 'a=1; Path=/'),
+        ('Set-Cookie', 'b=2; Path=/'),
+        ('X-Echo-Cookie', environ.get('HTTP_COOKIE', '')),
+        ('X-Echo-Body', environ['wsgi.input'].read().decode()),
+    ])
+    return [b'{"ok":true}']
+
+
+def sleepy_app(environ, start_response):
+    time.sleep(0.2)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'done']
+
+
+class TestWSGIBridge:
+    async def test_preserves_status_headers_and_multiple_cookies(self):
+        async with _client(cookie_app) as client:
+            response = await client.post('/x', content=b'payload', headers={'Cookie': 'sid=abc'})
+        assert response.status_code == 201
+        assert response.headers.get_list('set-cookie') == ['a=1; Path=/', 'b=2; Path=/']
+        assert response.headers['x-echo-cookie'] == 'sid=abc'
+        assert response.headers['x-echo-body'] == 'payload'
+        assert response.headers['content-length'] == str(len(b'{"ok":true}'))
+
+    async def test_streams_django_streaming_responses(self):
+        closed = []
+
+        def streaming_app(environ, start_response):
+            response = StreamingHttpResponse(iter([b'one,', b'two,', b'three']))
+            response._resource_closers.append(lambda: closed.append(True))
+            start_response('200 OK', list(response.items()))
+            return response
+
+        async with _client(streaming_app) as client:
+            async with client.stream('GET', '/stream') as response:
+                chunks = [chunk async for chunk in response.aiter_bytes()]
+        assert b''.join(chunks) == b'one,two,three'
+        assert closed == [True]
+
+    async def test_generator_apps_that_start_lazily(self):
+        def lazy_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            yield b'lazy'
+
+        async with _client(lazy_app) as client:
+            response = await client.get('/')
+        assert response.text == 'lazy'
+
+    async def test_request_body_is_streamed_to_the_app(self):
+        first_read = threading.Event()
+        seen_before_second_chunk = []
+
+        def reading_app(environ, start_response):
+            body = environ['wsgi.input']
+            head = body.read(5)
+            first_read.set()
+            rest = b''.join(body)
+            start_response('200 OK', [('Content-Type', 'text/plain'),
+                                      ('Content-Length', environ['CONTENT_LENGTH'])])
+            return [head + rest]
+
+        async def upload():
+            yield b'line1\n'
+            # Only sent once the app has consumed the first chunk
+            seen_before_second_chunk.append(await asyncio.to_thread(first_read.wait, 2))
+            yield b'line2\nline3'
+
+        async with _client(reading_app) as client:
+            response = await client.post('/upload', content=upload(), headers={'Content-Length': '17'})
+        assert response.content == b'line1\nline2\nline3'
+        assert seen_before_second_chunk == [True]
+
+    async def test_chunked_request_body_is_buffered(self):
+        async def upload():
+            yield b'pay'
+            yield b'load'
+
+        async with _client(cookie_app) as client:
+            response = await client.post('/x', content=upload())
+        assert response.headers['x-echo-body'] == 'payload'
+
+    async def test_slow_views_do_not_block_each_other(self):
+        async with _client(sleepy_app, max_workers=4) as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(client.get('/') for _ in range(4)))
+            elapsed = time.perf_counter() - started
+        assert all(response.text == 'done' for response in responses)
+        assert elapsed < 0.6
+
+
+def test_environ_folds_repeated_headers():
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': '/p', 'query_string': b'q=1',
+        'headers': [(b'cookie', b'a=1'), (b'cookie', b'b=2'), (b'accept', b'x'), (b'accept', b'y'),
+                    (b'content-type', b'application/json'), (b'host', b'example.com')],
+        'scheme': 'https', 'server': ('example.com', 443), 'root_path': '',
+    }
+    environ = build_environ(Request(scope), BytesIO(b'{}'), 2)
+    assert environ['HTTP_COOKIE'] == 'a=1; b=2'
+    assert environ['HTTP_ACCEPT'] == 'x, y'
+    assert environ['CONTENT_TYPE'] == 'application/json'
+    assert environ['CONTENT_LENGTH'] == '2'
+    assert environ['QUERY_STRING'] == 'q=1'
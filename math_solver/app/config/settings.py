@@ -15,5 +15,59 @@ class Settings(BaseSettings):
     # OpenAI Configuration
     OPENAI_API_KEY: str
 
+    # Image preparation (app.services.image_prep)
+    IMAGE_MAX_DIMENSION: int = 1600
+    IMAGE_JPEG_QUALITY: int = 85
+    # Uploads in an accepted format, within IMAGE_MAX_DIMENSION and under
+    # this size are sent without re-encoding.
+    IMAGE_PASSTHROUGH_MAX_BYTES: int = 1_000_000
+    IMAGE_PREP_WORKERS: int = 2
+    # Larger uploads are rejected with 413 before they are parsed
+    IMAGE_MAX_UPLOAD_BYTES: int = 30 * 1024 * 1024
+    # Checked from the image header, before decoding
+    IMAGE_MAX_PIXELS: int = 60_000_000
+    # Crop photos to the question, level and flatten them
+    # (app.services.image_enhance); cuts vision tokens on desk shots.
+    # Lossy; off until answer accuracy is measured against the originals
+    # (scripts/bench_image_enhance.py --live).
+    IMAGE_ENHANCE_ENABLED: bool = False
+    # Send shading-free images as black and white PNG
+    IMAGE_BINARIZE: bool = True
+
+    # Optional OCR pre-pass (app.services.ocr); needs pytesseract and the
+    # tesseract binary with the OCR_LANG data on PATH (e.g. apt-get install
+    # tesseract-ocr). Without them OCR stays off and a warning is logged at
+    # startup. Confident, diagram-free text goes to OCR_TEXT_MODEL.
+    OCR_ENABLED: bool = False
+    OCR_LANG: str = "eng"
+    OCR_MIN_CONFIDENCE: float = 85.0
+    # Share of ink allowed outside recognised words before a diagram is assumed
+    OCR_MAX_DIAGRAM_RATIO: float = 0.15
+    OCR_MIN_CHARS: int = 12
+    OCR_TEXT_MODEL: str = "gpt-4o-mini"
+
+    # Batch solving (/solve/batch)
+    IMAGE_BATCH_MAX_FILES: int = 20
+    # Images plus PDF pages
+    IMAGE_BATCH_MAX_ITEMS: int = 30
+    IMAGE_BATCH_MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    # Concurrent GPT-4o calls per batch
+    IMAGE_BATCH_CONCURRENCY: int = 4
+
+    # Perceptual-hash solution cache (app.services.image_cache). Serves one
+    # photo's stored solution for another; off until the content threshold
+    # is checked on real photos, not just synthetic worksheets.
+    IMAGE_CACHE_ENABLED: bool = False
+    # JSON Lines file, rotated to <path>.1 at IMAGE_CACHE_MAX_ENTRIES lines;
+    # empty keeps the cache in memory only.
+    IMAGE_CACHE_PATH: str = "/tmp/math_solver_image_cache.jsonl"
+    # Out of 256 hash bits; only finds candidates, which must also pass the
+    # content check below
+    IMAGE_CACHE_MAX_DISTANCE: int = 16
+    # Gray levels; one changed digit moves the fingerprint by 7 or more
+    IMAGE_CACHE_MAX_CONTENT_DISTANCE: float = 4.0
+    # Oldest entries are evicted past this; each holds a ~5 KB fingerprint
+    IMAGE_CACHE_MAX_ENTRIES: int = 20_000
+
     class Config:
         env_file = ".env"
\ No newline at end of file
@@ -1,9 +1,16 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from typing import List
 from .services.math_solver import MathSolver
+from .services.image_cache import SolutionCache
+from .services.image_prep import ImageTooLarge
+from .services.batch import BatchTooLarge, plan_batch, solve_batch
+from .services.uploads import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware, UploadTooLarge, spool_upload
 from .config.settings import Settings
-from .schemas.response_models import SolutionResponse
+from .schemas.response_models import BatchSummary, ImageStats, SolutionResponse
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,8 +39,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads before the multipart parser spools them
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/solve": settings.IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+        "/solve/batch": settings.IMAGE_BATCH_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+    },
+)
+
 # Initialize math solver
-math_solver = MathSolver(api_key=settings.OPENAI_API_KEY)
+math_solver = MathSolver(
+    api_key=settings.OPENAI_API_KEY,
+    max_image_dimension=settings.IMAGE_MAX_DIMENSION,
+    jpeg_quality=settings.IMAGE_JPEG_QUALITY,
+    passthrough_max_bytes=settings.IMAGE_PASSTHROUGH_MAX_BYTES,
+    image_workers=settings.IMAGE_PREP_WORKERS,
+    max_upload_bytes=settings.IMAGE_MAX_UPLOAD_BYTES,
+    max_image_pixels=settings.IMAGE_MAX_PIXELS,
+    enhance=settings.IMAGE_ENHANCE_ENABLED,
+    binarize=settings.IMAGE_BINARIZE,
+    ocr_lang=settings.OCR_LANG if settings.OCR_ENABLED else None,
+    ocr_min_confidence=settings.OCR_MIN_CONFIDENCE,
+    ocr_max_diagram_ratio=settings.OCR_MAX_DIAGRAM_RATIO,
+    ocr_min_chars=settings.OCR_MIN_CHARS,
+    text_model=settings.OCR_TEXT_MODEL,
+    cache=SolutionCache(
+        path=settings.IMAGE_CACHE_PATH,
+        max_distance=settings.IMAGE_CACHE_MAX_DISTANCE,
+        max_entries=settings.IMAGE_CACHE_MAX_ENTRIES,
+        max_content_distance=settings.IMAGE_CACHE_MAX_CONTENT_DISTANCE,
+    ) if settings.IMAGE_CACHE_ENABLED else None,
+)
+
+@app.on_event("shutdown")
+def shutdown_image_workers():
+    math_solver.close()
 
 @app.post("/solve", response_model=SolutionResponse)
 async def solve_math_problem(file: UploadFile = File(...)):
@@ -49,15 +90,92 @@ async def solve_math_problem(file: UploadFile = File(...)):
             )
         
         # Get solution
-        solution = await math_solver.solve(file)
+        image = await math_solver.encode_image(file)
+        result = await math_solver.solve_image(image)
         return SolutionResponse(
             success=True,
-            solution=solution
+            solution=result.solution,
+            image=ImageStats(**image.stats()),
+            cached=result.cached,
+            route=result.route
         )
 
+    except HTTPException:
+        raise
+    except (UploadTooLarge, ImageTooLarge) as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=str(e)
-        )
\ No newline at end of file
+        )
+
+@app.get("/stats/routes")
+async def route_stats():
+    """
+    Requests, latency, model spend and OCR savings per solve route
+    """
+    return math_solver.route_stats.snapshot()
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+@app.post("/solve/batch")
+async def solve_math_batch(files: List[UploadFile] = File(...)):
+    """
+    Solve several images, or every page of PDFs, in one request.
+
+    Streams one JSON line per image or page as each finishes (in completion
+    order, with its ``index``), then a summary line.
+    """
+    if len(files) > settings.IMAGE_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.IMAGE_BATCH_MAX_FILES} files per batch"
+        )
+    for file in files:
+        if not (file.content_type.startswith('image/') or file.content_type == 'application/pdf'):
+            raise HTTPException(
+                status_code=400,
+                detail=f"{file.filename}: only image and PDF files are allowed"
+            )
+
+    # Spool everything before streaming starts: the uploads are closed once
+    # this handler returns.
+    paths = []
+    try:
+        uploads = []
+        for file in files:
+            path = await spool_upload(file, settings.IMAGE_MAX_UPLOAD_BYTES)
+            paths.append(path)
+            uploads.append((file.filename, path, file.content_type == 'application/pdf'))
+        items = await plan_batch(math_solver, uploads, settings.IMAGE_BATCH_MAX_ITEMS)
+    except (UploadTooLarge, BatchTooLarge) as e:
+        _remove_files(paths)
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        _remove_files(paths)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        _remove_files(paths)
+        raise
+
+    async def stream():
+        succeeded = 0
+        try:
+            async for result in solve_batch(math_solver, items, settings.IMAGE_BATCH_CONCURRENCY):
+                succeeded += result.success
+                yield result.model_dump_json() + "\n"
+            summary = BatchSummary(total=len(items), succeeded=succeeded, failed=len(items) - succeeded)
+            yield summary.model_dump_json() + "\n"
+        finally:
+            _remove_files(paths)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
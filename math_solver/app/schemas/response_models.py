@@ -1,6 +1,36 @@
 from pydantic import BaseModel
 
+class ImageStats(BaseModel):
+    original_bytes: int
+    payload_bytes: int
+    width: int
+    height: int
+    mime_type: str
+    reencoded: bool
+    prep_ms: float
+
 class SolutionResponse(BaseModel):
     success: bool
     solution: str | None = None
-    error: str | None = None
\ No newline at end of file
+    error: str | None = None
+    image: ImageStats | None = None
+    cached: bool = False
+    # "cache", "ocr_text" or "vision"
+    route: str | None = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    filename: str
+    page: int | None = None
+    success: bool
+    solution: str | None = None
+    cached: bool = False
+    route: str | None = None
+    error: str | None = None
+    image: ImageStats | None = None
+
+class BatchSummary(BaseModel):
+    done: bool = True
+    total: int
+    succeeded: int
+    failed: int
\ No newline at end of file
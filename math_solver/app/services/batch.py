@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import logging
+
+from ..schemas.response_models import BatchItemResult, ImageStats
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+@dataclass
+class BatchItem:
+    index: int
+    filename: str
+    path: str
+    page: Optional[int] = None  # 1-based, for PDF pages
+
+
+async def plan_batch(solver, uploads: List[Tuple[str, str, bool]], max_items: int) -> List[BatchItem]:
+    """Expand ``(filename, path, is_pdf)`` uploads into one item per image or PDF page."""
+    items = []
+    for filename, path, is_pdf in uploads:
+        pages = await solver.count_pdf_pages(path) if is_pdf else None
+        if len(items) + (pages or 1) > max_items:
+            raise BatchTooLarge(f"A batch can hold at most {max_items} images or pages")
+        if pages is None:
+            items.append(BatchItem(len(items), filename, path))
+        else:
+            items.extend(BatchItem(len(items) + i, filename, path, page=i + 1) for i in range(pages))
+    return items
+
+
+async def solve_batch(solver, items: List[BatchItem], concurrency: int) -> AsyncIterator[BatchItemResult]:
+    """Yield a result per item as soon as it is ready, in completion order.
+
+    Image preparation and PDF rasterization are queued on the solver's
+    worker pool; at most ``concurrency`` model calls run at once. A failed
+    item is reported and does not stop the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: BatchItem) -> BatchItemResult:
+        result = BatchItemResult(index=item.index, filename=item.filename, page=item.page, success=False)
+        try:
+            if item.page is None:
+                image = await solver.prepare_path(item.path, label=repr(item.filename))
+            else:
+                image = await solver.prepare_pdf_page(item.path, item.page - 1, label=repr(item.filename))
+            result.image = ImageStats(**image.stats())
+            async with semaphore:
+                solved = await solver.solve_image(image)
+            result.solution, result.cached, result.route = solved.solution, solved.cached, solved.route
+            result.success = True
+        except Exception as e:
+            logger.error(f"Batch item {item.index} ({item.filename!r}) failed: {str(e)}")
+            result.error = str(e)
+        return result
+
+    tasks = [asyncio.create_task(run(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away: stop paying for solutions nobody will read.
+        for task in tasks:
+            task.cancel()
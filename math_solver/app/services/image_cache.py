@@ -0,0 +1,283 @@
+from PIL import Image
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+import base64
+import json
+import logging
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 16  # 16x16 = 256-bit difference hash
+# Neighbours closer than this many gray levels count as equal, so noise on
+# blank paper doesn't flip bits
+HASH_MARGIN = 2
+# Columns in the content fingerprint; rows follow the aspect ratio
+FINGERPRINT_WIDTH = 128
+# Pixels at this brightness percentile are taken as paper
+PAPER_PERCENTILE = 0.75
+
+
+def difference_hash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """dHash of an already oriented and flattened image.
+
+    The image is reduced to (hash_size + 1) x hash_size grayscale and each
+    bit records whether a pixel is brighter than its right neighbour by more
+    than ``HASH_MARGIN``, which survives rescaling, recompression and small
+    exposure changes.
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1] + HASH_MARGIN)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def content_fingerprint(image: Image.Image, width: int = FINGERPRINT_WIDTH) -> bytes:
+    """Ink density of the whole frame on a ``width``-column grid, compressed.
+
+    The difference hash sees page layout: worksheets printed from one
+    template hash within a few bits of each other whatever the question.
+    This keeps how dark each cell is (relative to the paper), fine enough
+    that changing one digit of an equation moves some 2x2 block by well
+    over ``SolutionCache.max_content_distance`` gray levels, while the same
+    image re-encoded, or re-shot from the same spot, stays within it.
+    """
+    gray = image.convert("L")
+    histogram = gray.histogram()
+    target, seen, paper = PAPER_PERCENTILE * gray.width * gray.height, 0, 255
+    for level, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            paper = level
+            break
+    darkness = gray.point(lambda v: max(paper - v, 0))
+    height = max(1, round(width * gray.height / gray.width))
+    cells = darkness.resize((width, height), Image.BOX)
+    return struct.pack(">HH", width, height) + zlib.compress(cells.tobytes(), 6)
+
+
+def _unpack_fingerprint(fingerprint: bytes) -> np.ndarray:
+    width, height = struct.unpack(">HH", fingerprint[:4])
+    return np.frombuffer(zlib.decompress(fingerprint[4:]), dtype=np.uint8).reshape(height, width)
+
+
+def content_distance(a: bytes, b: bytes) -> float:
+    """Largest mean darkness difference over 2x2 blocks, in gray levels.
+
+    Frames whose aspect ratios differ by more than a row can't be compared
+    and are infinitely far apart.
+    """
+    first, second = _unpack_fingerprint(a), _unpack_fingerprint(b)
+    if first.shape[1] != second.shape[1] or abs(first.shape[0] - second.shape[0]) > 1:
+        return math.inf
+    rows = min(first.shape[0], second.shape[0]) // 2 * 2
+    cols = first.shape[1] // 2 * 2
+    diff = np.abs(first[:rows, :cols].astype(np.int16) - second[:rows, :cols])
+    return float(diff.reshape(rows // 2, 2, cols // 2, 2).mean(axis=(1, 3)).max())
+
+
+class MultiIndexHash:
+    """Hamming-radius search by multi-index hashing.
+
+    The hash is split into ``radius + 1`` disjoint chunks. Two hashes within
+    ``radius`` bits must agree exactly on at least one chunk (pigeonhole),
+    so a lookup only compares against entries sharing a chunk with the
+    query: a few dict probes instead of a scan. A BK-tree prunes poorly at
+    this radius, since unrelated 256-bit hashes all sit near distance 128.
+    """
+
+    def __init__(self, bits: int = HASH_SIZE * HASH_SIZE, radius: int = 16):
+        self.radius = radius
+        chunks = radius + 1
+        bounds = [bits * i // chunks for i in range(chunks + 1)]
+        self._chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in self._chunks]
+        self._values = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, key: int, value):
+        """Insert ``value`` under ``key``; one key can hold several values."""
+        if key not in self._values:
+            self._values[key] = []
+            for table, (shift, mask) in zip(self._tables, self._chunks):
+                table.setdefault((key >> shift) & mask, []).append(key)
+        self._values[key].append(value)
+        self._count += 1
+
+    def remove(self, key: int, value):
+        """Remove one ``value`` stored under ``key``."""
+        values = self._values[key]
+        values.remove(value)
+        self._count -= 1
+        if values:
+            return
+        del self._values[key]
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            chunk = (key >> shift) & mask
+            table[chunk].remove(key)
+            if not table[chunk]:
+                del table[chunk]
+
+    def search(self, key: int) -> List[Tuple[int, object]]:
+        """All ``(distance, value)`` within ``radius``, nearest first."""
+        candidates = set()
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            candidates.update(table.get((key >> shift) & mask, ()))
+        found = [(hamming(key, other), value) for other in candidates for value in self._values[other]]
+        found = [item for item in found if item[0] <= self.radius]
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+class SolutionCache:
+    """Solutions for near-identical photos, keyed by difference hash.
+
+    The hash only finds candidates: it sees layout, so different problems
+    on one worksheet template land within a few bits. A candidate is served
+    only if its content fingerprint is within ``max_content_distance`` of
+    the query's as well.
+
+    Entries live in a multi-index hash table for lookup and in an
+    append-only JSON Lines file so they survive restarts. Past
+    ``max_entries`` the oldest entry is evicted. Once the file holds
+    ``max_entries`` lines it is renamed to ``<path>.1``, replacing the
+    previous one, and a new file is started; a restart loads the newest
+    ``max_entries`` entries from the two. Workers share the files but each
+    keeps its own index, so a solution stored by one worker reaches the
+    others on their next start.
+    """
+
+    def __init__(self, path: str = "", max_distance: int = 16, max_entries: int = 20_000,
+                 max_content_distance: float = 4.0):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.max_content_distance = max_content_distance
+        self.hits = 0
+        self.misses = 0
+        # Hash matches turned down by the content check
+        self.rejected = 0
+        self.evicted = 0
+        self._index = MultiIndexHash(radius=max_distance)
+        # (hash, value) in insertion order, for eviction
+        self._order = deque()
+        # Lines in the current file, as far as this worker knows
+        self._file_lines = 0
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _find(self, image_hash: int, fingerprint: bytes) -> Tuple[Optional[Tuple[int, float, str]], int]:
+        """The nearest confirmed ``(hash distance, content distance, solution)``
+        (or None), and how many hash candidates were checked."""
+        candidates = self._index.search(image_hash)
+        for distance, (stored, solution) in candidates:
+            content = content_distance(fingerprint, stored)
+            if content <= self.max_content_distance:
+                return (distance, content, solution), len(candidates)
+        return None, len(candidates)
+
+    def lookup(self, image_hash: int, fingerprint: bytes) -> Optional[str]:
+        started = time.perf_counter()
+        match, candidates = self._find(image_hash, fingerprint) if fingerprint else (None, 0)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if match is None:
+            self.misses += 1
+            if candidates:
+                self.rejected += 1
+            return None
+        self.hits += 1
+        distance, content, solution = match
+        logger.info(f"Image cache hit at distance {distance} (content {content:.1f}) in {elapsed_ms:.3f} ms")
+        return solution
+
+    def add(self, image_hash: int, fingerprint: bytes, solution: str) -> bool:
+        """Store a solution in memory and on disk.
+
+        Returns False when the same content is already cached. Appends to
+        the file, so call it off the event loop.
+        """
+        if not fingerprint:
+            return False
+        with self._lock:
+            if self._find(image_hash, fingerprint)[0] is not None:
+                return False
+            self._insert(image_hash, (fingerprint, solution))
+            if self.path:
+                self._append({"hash": format(image_hash, "x"),
+                              "fingerprint": base64.b64encode(fingerprint).decode("ascii"),
+                              "solution": solution, "created_at": time.time()})
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._index), "hits": self.hits, "misses": self.misses,
+                "rejected": self.rejected, "evicted": self.evicted}
+
+    def _insert(self, image_hash: int, value: Tuple[bytes, str]):
+        self._index.add(image_hash, value)
+        self._order.append((image_hash, value))
+        while len(self._order) > self.max_entries:
+            self._index.remove(*self._order.popleft())
+            self.evicted += 1
+
+    @staticmethod
+    def _entries(path: str) -> Iterator[dict]:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a line torn by a crash mid-append
+
+    def _load(self):
+        # Oldest first, keeping only the newest max_entries
+        newest = deque(maxlen=self.max_entries)
+        for path in (f"{self.path}.1", self.path):
+            if not os.path.exists(path):
+                continue
+            try:
+                lines = 0
+                for entry in self._entries(path):
+                    lines += 1
+                    newest.append(entry)
+            except OSError as e:
+                logger.warning(f"Could not load image cache from {path}: {str(e)}")
+            if path == self.path:
+                self._file_lines = lines
+        for entry in newest:
+            self._insert(int(entry["hash"], 16), (base64.b64decode(entry["fingerprint"]), entry["solution"]))
+        logger.info(f"Loaded {len(self._index)} cached image solutions from {self.path}")
+
+    def _append(self, entry: dict):
+        try:
+            if self._file_lines >= self.max_entries:
+                # Every worker's count is at most the true one, so the file
+                # is only rotated once it really holds max_entries lines.
+                os.replace(self.path, f"{self.path}.1")
+                self._file_lines = 0
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._file_lines += 1
+        except OSError as e:
+            logger.warning(f"Could not persist image cache entry to {self.path}: {str(e)}")
@@ -0,0 +1,219 @@
+from PIL import Image, ImageOps
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+import binascii
+import io
+import os
+import time
+
+from .image_cache import content_fingerprint, difference_hash
+from .image_enhance import Enhancement, enhance_image
+from .ocr import OcrResult, run_ocr
+
+# Formats the vision API accepts as-is
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+# Raw bytes per base64 chunk; a multiple of 3 so chunks concatenate cleanly
+BASE64_CHUNK = 3 * 256 * 1024
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_bytes: int
+    reencoded: bool
+    prep_ms: float
+    # Perceptual hash and content fingerprint of the oriented, flattened
+    # image before any crop, for the solution cache
+    image_hash: int = 0
+    content_fingerprint: bytes = b""
+    # Set when the OCR pre-pass ran
+    ocr: Optional[OcrResult] = None
+    # Set when the content-aware crop ran
+    enhancement: Optional[Enhancement] = None
+
+    @property
+    def data_url(self) -> str:
+        # Encoded in chunks so the only full-size copy is the final string.
+        view = memoryview(self.data)
+        parts = [f"data:{self.mime_type};base64,"]
+        for start in range(0, len(view), BASE64_CHUNK):
+            parts.append(binascii.b2a_base64(view[start:start + BASE64_CHUNK], newline=False).decode("ascii"))
+        return "".join(parts)
+
+    @property
+    def payload_bytes(self) -> int:
+        # Size of the base64 text actually sent
+        return 4 * ((len(self.data) + 2) // 3)
+
+    def stats(self) -> dict:
+        return {
+            "original_bytes": self.original_bytes,
+            "payload_bytes": self.payload_bytes,
+            "width": self.width,
+            "height": self.height,
+            "mime_type": self.mime_type,
+            "reencoded": self.reencoded,
+            "prep_ms": round(self.prep_ms, 1),
+        }
+
+
+def _encode(image: Image.Image, fmt: str, **params) -> bytes:
+    buffered = io.BytesIO()
+    image.save(buffered, format=fmt, **params)
+    return buffered.getvalue()
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGB or L, with any transparency composited onto white."""
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA", "P") or "transparency" in image.info:
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def prepare_image(source: Union[str, bytes], max_dimension: int = 1600, jpeg_quality: int = 85,
+                  passthrough_max_bytes: int = 1_000_000, max_pixels: int = 60_000_000,
+                  ocr_lang: Optional[str] = None, enhance: bool = False, binarize: bool = True) -> PreparedImage:
+    """Downscale and re-encode an upload for the vision API.
+
+    ``source`` is a file path (spooled uploads) or the raw bytes. Runs in a
+    worker process, so it only takes and returns picklable values. Only the
+    header is read before the ``max_pixels`` check, so oversized images are
+    rejected without being decoded. Uploads already in an accepted format,
+    within ``max_dimension`` and under ``passthrough_max_bytes`` are sent
+    unchanged (but still decoded, for the perceptual hash) unless
+    ``enhance`` finds margins worth cropping or a tilt worth levelling; see
+    ``image_enhance.enhance_image``. With ``ocr_lang`` set, the prepared
+    image is also run through Tesseract.
+    """
+    started = time.perf_counter()
+    if isinstance(source, bytes):
+        original_bytes, stream = len(source), io.BytesIO(source)
+    else:
+        original_bytes, stream = os.path.getsize(source), open(source, "rb")
+    try:
+        image = Image.open(stream)
+        width, height = image.size
+        fmt = image.format
+        orientation = image.getexif().get(0x0112, 1)
+    except Exception:
+        stream.close()
+        raise ValueError("Invalid image file")
+    with stream:
+        if width * height > max_pixels:
+            raise ImageTooLarge(f"Image is {width}x{height}; the limit is {max_pixels} pixels")
+
+        if (fmt in PASSTHROUGH_FORMATS and max(width, height) <= max_dimension
+                and original_bytes <= passthrough_max_bytes and orientation == 1):
+            try:
+                flat = _flatten(image)
+                identity = _identity(flat)
+                enhanced, enhancement = enhance_image(flat, max_dimension, binarize) if enhance else (flat, None)
+                if enhancement and enhancement.reframed:
+                    return _reencode(enhanced, fmt, original_bytes, started, jpeg_quality, ocr_lang,
+                                     enhancement, identity)
+                image_hash, fingerprint = identity
+                stream.seek(0)
+                data = stream.read()
+            except Exception:
+                raise ValueError("Invalid image file")
+            return PreparedImage(data, PASSTHROUGH_FORMATS[fmt], width, height, original_bytes,
+                                 reencoded=False, prep_ms=(time.perf_counter() - started) * 1000,
+                                 image_hash=image_hash, content_fingerprint=fingerprint,
+                                 ocr=run_ocr(flat, ocr_lang) if ocr_lang else None, enhancement=enhancement)
+
+        enhancement = identity = None
+        try:
+            if fmt == "JPEG":
+                # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full size.
+                image.draft("RGB", (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(image)
+            if enhance:
+                # Crop before downscaling, so the question keeps its resolution.
+                flat = _flatten(image)
+                identity = _identity(flat)
+                image, enhancement = enhance_image(flat, max_dimension, binarize)
+            else:
+                image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+                image = _flatten(image)
+        except Exception:
+            raise ValueError("Invalid image file")
+    return _reencode(image, fmt, original_bytes, started, jpeg_quality, ocr_lang, enhancement, identity)
+
+
+def _identity(image: Image.Image) -> Tuple[int, bytes]:
+    """Cache keys for an upload, taken before any crop so they don't depend
+    on where the content-aware crop happened to land."""
+    return difference_hash(image), content_fingerprint(image)
+
+
+def _reencode(image: Image.Image, fmt, original_bytes: int, started: float, jpeg_quality: int,
+              ocr_lang: Optional[str], enhancement: Optional[Enhancement] = None,
+              identity: Optional[Tuple[int, bytes]] = None) -> PreparedImage:
+    image_hash, fingerprint = identity or _identity(image)
+    ocr = run_ocr(image, ocr_lang) if ocr_lang else None
+    if image.mode == "1":
+        # Binarized: lossless is smaller and keeps the strokes crisp.
+        encoded, mime_type = _encode(image, "PNG", optimize=True), "image/png"
+    else:
+        encoded = _encode(image, "JPEG", quality=jpeg_quality, optimize=True)
+        mime_type = "image/jpeg"
+        if fmt != "JPEG":
+            # Screenshots and scans of printed text often compress better losslessly.
+            png = _encode(image, "PNG", optimize=True)
+            if len(png) < len(encoded):
+                encoded, mime_type = png, "image/png"
+
+    return PreparedImage(encoded, mime_type, image.width, image.height, original_bytes,
+                         reencoded=True, prep_ms=(time.perf_counter() - started) * 1000,
+                         image_hash=image_hash, content_fingerprint=fingerprint, ocr=ocr,
+                         enhancement=enhancement)
+
+
+def pdf_page_count(path: str) -> int:
+    import pypdfium2  # only needed for PDF uploads, and only in the workers
+    try:
+        pdf = pypdfium2.PdfDocument(path)
+    except Exception:
+        raise ValueError("Invalid PDF file")
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def rasterize_pdf_page(path: str, page_index: int, max_dimension: int = 1600, jpeg_quality: int = 85,
+                       dpi: int = 200, ocr_lang: Optional[str] = None, enhance: bool = False,
+                       binarize: bool = True) -> PreparedImage:
+    """Render one PDF page at ``dpi`` (capped so the long side fits
+    ``max_dimension``) and encode it like an uploaded image."""
+    import pypdfium2
+    started = time.perf_counter()
+    try:
+        pdf = pypdfium2.PdfDocument(path)
+    except Exception:
+        raise ValueError("Invalid PDF file")
+    try:
+        page = pdf[page_index]
+        width, height = page.get_size()  # points, 1/72 inch
+        scale = min(dpi / 72, max_dimension / max(width, height))
+        image = _flatten(page.render(scale=scale).to_pil())
+        page.close()
+    finally:
+        pdf.close()
+    enhancement = identity = None
+    if enhance:
+        identity = _identity(image)
+        image, enhancement = enhance_image(image, max_dimension, binarize)
+    return _reencode(image, None, os.path.getsize(path), started, jpeg_quality, ocr_lang, enhancement, identity)
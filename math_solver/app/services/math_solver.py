@@ -1,35 +1,205 @@
 from openai import AsyncOpenAI
-from PIL import Image
-import base64
-import io
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import asyncio
 import logging
+import os
+import time
+
+from .image_cache import SolutionCache
+from .image_enhance import vision_image_tokens
+from .image_prep import PreparedImage, pdf_page_count, prepare_image, rasterize_pdf_page
+from .ocr import tesseract_available
+from .route_stats import RouteStats, token_cost
+from .uploads import spool_upload
 
 logger = logging.getLogger(__name__)
 
+VISION_MODEL = "gpt-4o"
+
+# Routes a solve can take
+ROUTE_CACHE = "cache"
+ROUTE_OCR_TEXT = "ocr_text"
+ROUTE_VISION = "vision"
+
+
+@dataclass
+class SolveResult:
+    solution: Optional[str]
+    route: str
+
+    @property
+    def cached(self) -> bool:
+        return self.route == ROUTE_CACHE
+
+
 class MathSolver:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_image_dimension: int = 1600, jpeg_quality: int = 85,
+                 passthrough_max_bytes: int = 1_000_000, image_workers: int = 2,
+                 cache: Optional[SolutionCache] = None, max_upload_bytes: int = 30 * 1024 * 1024,
+                 max_image_pixels: int = 60_000_000, ocr_lang: Optional[str] = None,
+                 ocr_min_confidence: float = 85.0, ocr_max_diagram_ratio: float = 0.15,
+                 ocr_min_chars: int = 12, text_model: str = "gpt-4o-mini", enhance: bool = False,
+                 binarize: bool = True):
         """Initialize the Math Solver service"""
         self.client = AsyncOpenAI(api_key=api_key)
+        self.cache = cache
+        self.route_stats = RouteStats()
+        if ocr_lang and not tesseract_available():
+            ocr_lang = None
+        self.ocr_min_confidence = ocr_min_confidence
+        self.ocr_max_diagram_ratio = ocr_max_diagram_ratio
+        self.ocr_min_chars = ocr_min_chars
+        self.text_model = text_model
+        self._prepare = partial(
+            prepare_image,
+            max_dimension=max_image_dimension,
+            jpeg_quality=jpeg_quality,
+            passthrough_max_bytes=passthrough_max_bytes,
+            max_pixels=max_image_pixels,
+            ocr_lang=ocr_lang,
+            enhance=enhance,
+            binarize=binarize,
+        )
+        self._rasterize = partial(
+            rasterize_pdf_page,
+            max_dimension=max_image_dimension,
+            jpeg_quality=jpeg_quality,
+            ocr_lang=ocr_lang,
+            enhance=enhance,
+            binarize=binarize,
+        )
+        self.max_upload_bytes = max_upload_bytes
+        self._image_workers = image_workers
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app does not spawn processes.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._image_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def encode_image(self, file) -> PreparedImage:
+        """Downscale and re-encode the upload in the worker pool, off the event loop.
 
-    async def encode_image(self, file) -> str:
-        """Convert uploaded file to base64"""
+        The upload is streamed to a temp file and the worker opens it by
+        path, so this process never holds the full original in memory.
+        """
+        path = await spool_upload(file, self.max_upload_bytes)
         try:
-            image = Image.open(file.file)
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            return base64.b64encode(buffered.getvalue()).decode('utf-8')
-        except Exception as e:
-            logger.error(f"Error encoding image: {str(e)}")
-            raise ValueError("Invalid image file")
+            return await self.prepare_path(path, label=repr(file.filename))
+        finally:
+            os.unlink(path)
+
+    async def prepare_path(self, path: str, label: str = "") -> PreparedImage:
+        """Prepare an image file that is already on disk"""
+        return await self._run_prep(self._prepare, path, label=label or path)
+
+    async def prepare_pdf_page(self, path: str, page_index: int, label: str = "") -> PreparedImage:
+        """Rasterize and prepare one page of a PDF on disk"""
+        return await self._run_prep(self._rasterize, path, page_index,
+                                    label=f"{label or path} page {page_index + 1}")
+
+    async def count_pdf_pages(self, path: str) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), pdf_page_count, path)
+
+    async def _run_prep(self, func, *args, label: str) -> PreparedImage:
+        loop = asyncio.get_running_loop()
+        try:
+            image = await loop.run_in_executor(self._get_executor(), func, *args)
+        except ValueError as e:
+            logger.error(f"Error encoding image {label}: {str(e)}")
+            raise
+        logger.info(
+            f"Prepared {label} in {image.prep_ms:.1f} ms: "
+            f"{image.original_bytes} bytes -> {image.payload_bytes} bytes base64 "
+            f"({image.width}x{image.height} {image.mime_type}, reencoded={image.reencoded})"
+        )
+        return image
 
     async def solve(self, file) -> Optional[str]:
         """Process image and return solution"""
+        image = await self.encode_image(file)
+        result = await self.solve_image(image)
+        return result.solution
+
+    async def solve_image(self, image: PreparedImage) -> SolveResult:
+        """Solve an already prepared image by the cheapest route that fits.
+
+        Photos within the cache's Hamming distance of an earlier one, and
+        with the same content, get its stored solution. Printed text read confidently by the OCR pre-pass,
+        with no diagram, goes to the text model. Everything else goes to
+        the vision model.
+        """
+        started = time.perf_counter()
+        if self.cache is not None:
+            cached = self.cache.lookup(image.image_hash, image.content_fingerprint)
+            if cached is not None:
+                self.route_stats.record(ROUTE_CACHE, (time.perf_counter() - started) * 1000)
+                return SolveResult(cached, ROUTE_CACHE)
+
+        if self._text_only(image):
+            route = ROUTE_OCR_TEXT
+            solution, cost = await self._ask_text_model(image.ocr.text)
+        else:
+            route = ROUTE_VISION
+            solution, cost = await self._ask_model(image)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        vision_cost = self._vision_estimate(image, solution) if route == ROUTE_OCR_TEXT else None
+        self.route_stats.record(route, elapsed_ms, cost, vision_cost_usd=vision_cost)
+
+        if self.cache is not None and solution:
+            await asyncio.to_thread(self.cache.add, image.image_hash, image.content_fingerprint, solution)
+        return SolveResult(solution, route)
+
+    def _text_only(self, image: PreparedImage) -> bool:
+        ocr = image.ocr
+        return (ocr is not None and ocr.confidence >= self.ocr_min_confidence
+                and ocr.diagram_ratio <= self.ocr_max_diagram_ratio
+                and len(ocr.text.strip()) >= self.ocr_min_chars)
+
+    def _vision_estimate(self, image: PreparedImage, solution: Optional[str]) -> float:
+        # Prompt text is ~100 tokens; a token is ~4 characters of output.
+        prompt_tokens = 100 + vision_image_tokens(image.width, image.height)
+        return token_cost(VISION_MODEL, prompt_tokens, len(solution or "") // 4)
+
+    @staticmethod
+    def _usage_cost(model: str, response) -> float:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return 0.0
+        return token_cost(model, usage.prompt_tokens, usage.completion_tokens)
+
+    async def _ask_text_model(self, text: str) -> Tuple[Optional[str], float]:
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.text_model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": f"{self._get_prompt()}\n\nThe problem, read from the image by OCR:\n\n{text}"
+                    }
+                ],
+                max_tokens=1000
+            )
+            return response.choices[0].message.content, self._usage_cost(self.text_model, response)
+
+        except Exception as e:
+            logger.error(f"Error in text solution generation: {str(e)}")
+            raise
+
+    async def _ask_model(self, image: PreparedImage) -> Tuple[Optional[str], float]:
         try:
-            base64_image = await self.encode_image(file)
-            
             response = await self.client.chat.completions.create(
-                model="gpt-4o",
+                model=VISION_MODEL,
                 messages=[
                     {
                         "role": "user",
@@ -41,7 +211,7 @@ class MathSolver:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/png;base64,{base64_image}"
+                                    "url": image.data_url
                                 }
                             }
                         ]
@@ -50,7 +220,7 @@ class MathSolver:
                 max_tokens=1000
             )
             
-            return response.choices[0].message.content
+            return response.choices[0].message.content, self._usage_cost(VISION_MODEL, response)
 
         except Exception as e:
             logger.error(f"Error in solution generation: {str(e)}")
@@ -0,0 +1,72 @@
+from PIL import Image
+from dataclasses import dataclass
+from typing import Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Grayscale level below which a pixel counts as ink
+INK_THRESHOLD = 128
+
+
+@dataclass
+class OcrResult:
+    text: str
+    # Mean Tesseract word confidence (0-100), weighted by word length
+    confidence: float
+    # Share of ink outside recognised words: figures, graphs, geometry
+    diagram_ratio: float
+    ms: float
+
+
+def tesseract_available() -> bool:
+    """True if pytesseract is installed and can find the tesseract binary."""
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception as e:
+        logger.warning(f"OCR disabled, Tesseract unavailable: {str(e)}")
+        return False
+
+
+def _ink(image: Image.Image) -> int:
+    histogram = image.histogram()
+    return sum(histogram[:INK_THRESHOLD])
+
+
+def run_ocr(image: Image.Image, lang: str = "eng") -> Optional[OcrResult]:
+    """OCR a flattened image. Runs in the image workers; None if OCR fails."""
+    import pytesseract
+
+    started = time.perf_counter()
+    gray = image.convert("L")
+    try:
+        data = pytesseract.image_to_data(gray, lang=lang, output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        logger.warning(f"OCR failed: {str(e)}")
+        return None
+
+    lines = {}
+    weighted, letters = 0.0, 0
+    masked = gray.copy()
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        confidence = float(data["conf"][i])
+        if not word or confidence < 0:
+            continue
+        weighted += confidence * len(word)
+        letters += len(word)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        left, top = data["left"][i], data["top"][i]
+        masked.paste(255, (left, top, left + data["width"][i], top + data["height"][i]))
+
+    total_ink = _ink(gray)
+    return OcrResult(
+        text="\n".join(" ".join(words) for words in lines.values()),
+        confidence=weighted / letters if letters else 0.0,
+        diagram_ratio=_ink(masked) / total_ink if total_ink else 0.0,
+        ms=(time.perf_counter() - started) * 1000,
+    )
@@ -0,0 +1,48 @@
+from typing import Dict, Optional
+
+# USD per million (input, output) tokens
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+def token_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class RouteStats:
+    """Requests, latency and model spend per solve route, for /stats/routes.
+
+    ``saved_usd`` on the OCR text route is what the same request would have
+    cost on the vision model, estimated from the image size and the actual
+    completion length, minus what it did cost.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, dict] = {}
+
+    def record(self, route: str, latency_ms: float, cost_usd: float = 0.0,
+               vision_cost_usd: Optional[float] = None):
+        stats = self._routes.setdefault(route, {
+            "requests": 0, "latency_ms": 0.0, "max_latency_ms": 0.0, "cost_usd": 0.0, "saved_usd": 0.0,
+        })
+        stats["requests"] += 1
+        stats["latency_ms"] += latency_ms
+        stats["max_latency_ms"] = max(stats["max_latency_ms"], latency_ms)
+        stats["cost_usd"] += cost_usd
+        if vision_cost_usd is not None:
+            stats["saved_usd"] += vision_cost_usd - cost_usd
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            route: {
+                "requests": stats["requests"],
+                "avg_latency_ms": round(stats["latency_ms"] / stats["requests"], 1),
+                "max_latency_ms": round(stats["max_latency_ms"], 1),
+                "cost_usd": round(stats["cost_usd"], 6),
+                "saved_usd": round(stats["saved_usd"], 6),
+            }
+            for route, stats in self._routes.items()
+        }
@@ -0,0 +1,93 @@
+from starlette.responses import JSONResponse
+from typing import Dict
+import asyncio
+import os
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+# Room for the multipart boundary and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+async def spool_upload(file, max_bytes: int, chunk_size: int = CHUNK_SIZE) -> str:
+    """Copy an upload to a temp file in chunks and return its path.
+
+    At most one chunk is in memory at a time, and the copy stops as soon as
+    the upload exceeds ``max_bytes``. The caller removes the file.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    total = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise UploadTooLarge(f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized request bodies before they are parsed.
+
+    A ``Content-Length`` over the limit is answered with 413 straight away.
+    Bodies without one (chunked uploads) are counted as they stream in; once
+    over the limit the client gets 413 and the app sees a disconnect, so
+    the multipart parser stops writing the upload to disk.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits  # path -> max body bytes
+
+    async def __call__(self, scope, receive, send):
+        max_body_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_body_bytes is None or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body_bytes:
+            await self._reject(max_body_bytes, scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_bytes:
+                    rejected = True
+                    await self._reject(max_body_bytes, scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            # The 413 has already gone out; drop whatever the app answers.
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def _reject(self, max_body_bytes, scope, receive, send):
+        response = JSONResponse(
+            {"detail": f"Request body exceeds {max_body_bytes} bytes"},
+            status_code=413,
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
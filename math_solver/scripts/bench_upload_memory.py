@@ -0,0 +1,122 @@
+"""Peak memory per upload: the old in-process PNG path vs the streaming path.
+
+Each variant runs in a fresh interpreter, so ``ru_maxrss`` is the peak for
+that variant alone. The streaming variant's worker process is reported
+separately (it is shared across requests in the service):
+
+    python scripts/bench_upload_memory.py --width 6000 --height 4000
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+
+def rss_mb() -> float:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_mb(who=resource.RUSAGE_SELF) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024  # KiB on Linux
+
+
+def make_photo(path, width, height):
+    """A noisy photo-like JPEG, which compresses about as badly as a DSLR shot."""
+    from PIL import Image
+    noise = Image.effect_noise((width, height), 64).convert('RGB')
+    gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    Image.blend(noise, gradient, 0.5).save(path, 'JPEG', quality=98)
+
+
+def upload(path):
+    """An UploadFile backed by a spooled temp file, as Starlette builds it."""
+    from starlette.datastructures import UploadFile
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            spooled.write(chunk)
+    spooled.seek(0)
+    return UploadFile(spooled, filename=os.path.basename(path))
+
+
+def run_legacy(path):
+    """The previous MathSolver.encode_image plus the data URL string."""
+    from PIL import Image
+    file = upload(path)
+    baseline = rss_mb()
+    image = Image.open(file.file)
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')
+    url = f"data:image/png;base64,{encoded}"
+    return {'baseline_mb': baseline, 'payload_bytes': len(url)}
+
+
+def run_streaming(path):
+    from app.services.math_solver import MathSolver
+    solver = MathSolver(api_key='bench')
+    file = upload(path)
+    baseline = rss_mb()
+
+    async def prepare():
+        image = await solver.encode_image(file)
+        return image, image.data_url
+
+    image, url = asyncio.run(prepare())
+    # Reap the worker so RUSAGE_CHILDREN includes it.
+    solver._get_executor().shutdown(wait=True)
+    return {'baseline_mb': baseline, 'payload_bytes': len(url), 'prep_ms': round(image.prep_ms, 1),
+            'worker_peak_mb': round(peak_mb(resource.RUSAGE_CHILDREN), 1)}
+
+
+def child(variant, path):
+    result = {'legacy': run_legacy, 'streaming': run_streaming}[variant](path)
+    result['peak_mb'] = round(peak_mb(), 1)
+    result['request_mb'] = round(result['peak_mb'] - result.pop('baseline_mb'), 1)
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--make', metavar='PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+    if args.make:
+        make_photo(args.make, args.width, args.height)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'photo.jpg')
+        # Linux carries the RSS high-water mark across fork and exec, so the
+        # photo is generated in its own process rather than in this one.
+        subprocess.run([sys.executable, __file__, '--make', path,
+                        '--width', str(args.width), '--height', str(args.height)], check=True)
+        print(f"Upload: {args.width}x{args.height} JPEG, {os.path.getsize(path) / 1e6:.1f} MB")
+        for variant in ('legacy', 'streaming'):
+            out = subprocess.run([sys.executable, __file__, '--child', variant, path],
+                                 capture_output=True, text=True, check=True, cwd=ROOT)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{variant:>10}: " + ', '.join(f"{k}={v}" for k, v in result.items()))
+    print("request_mb is peak RSS above the post-import baseline of the serving process.")
+
+
+if __name__ == '__main__':
+    main()
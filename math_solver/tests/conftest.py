@@ -0,0 +1,32 @@
+import io
+
+import pytest
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+
+def worksheet(equation: str, size=(900, 1200)) -> Image.Image:
+    """A printed worksheet page; only the equation changes between problems."""
+    page = Image.new("RGB", size, (250, 250, 246))
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=30)
+    small = ImageFont.load_default(size=22)
+    draw.text((60, 60), "Worksheet 4: Quadratic Equations", fill=(20, 20, 30), font=font)
+    draw.text((60, 115), "Name: ____________   Class: ______   Date: ______", fill=(20, 20, 30), font=small)
+    draw.line((60, 160, 840, 160), fill=(20, 20, 30), width=3)
+    draw.text((60, 200), "Q1. Solve for x:", fill=(20, 20, 30), font=font)
+    draw.text((110, 255), equation, fill=(20, 20, 30), font=font)
+    draw.text((60, 330), "Show all working in the space below.", fill=(20, 20, 30), font=small)
+    for y in range(400, size[1] - 60, 55):
+        draw.line((60, y, 840, y), fill=(180, 180, 190), width=2)
+    return page.filter(ImageFilter.GaussianBlur(0.8))
+
+
+def jpeg(image: Image.Image, quality: int = 85) -> bytes:
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+@pytest.fixture
+def worksheet_photo():
+    return lambda equation, quality=85: jpeg(worksheet(equation), quality)
@@ -0,0 +1,86 @@
+import asyncio
+
+from app.services.batch import BatchItem, solve_batch
+from app.services.image_prep import PreparedImage
+from app.services.math_solver import ROUTE_VISION, SolveResult
+
+
+def _image(path):
+    return PreparedImage(data=path.encode(), mime_type="image/jpeg", width=10, height=10,
+                         original_bytes=len(path), reencoded=False, prep_ms=0.0)
+
+
+class FakeSolver:
+    """Solves each image after ``delays[path]`` seconds."""
+
+    def __init__(self, delays, fail=()):
+        self.delays = delays
+        self.fail = set(fail)
+        self.running = self.peak = 0
+        self.cancelled = []
+
+    async def prepare_path(self, path, label=""):
+        return _image(path)
+
+    async def prepare_pdf_page(self, path, page_index, label=""):
+        return _image(f"{path}#{page_index}")
+
+    async def solve_image(self, image):
+        path = image.data.decode()
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(path, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(path)
+            raise
+        finally:
+            self.running -= 1
+        if path in self.fail:
+            raise RuntimeError(f"{path} is unreadable")
+        return SolveResult(f"solution to {path}", ROUTE_VISION)
+
+
+def _items(*paths):
+    return [BatchItem(i, f"{path}.jpg", path) for i, path in enumerate(paths)]
+
+
+async def test_results_arrive_as_they_finish_with_their_item_index():
+    solver = FakeSolver({"a": 0.06, "b": 0.02, "c": 0.04})
+    results = [r async for r in solve_batch(solver, _items("a", "b", "c"), concurrency=3)]
+    assert [r.index for r in results] == [1, 2, 0]
+    assert [r.solution for r in results] == ["solution to b", "solution to c", "solution to a"]
+    assert all(r.success and r.route == ROUTE_VISION for r in results)
+
+
+async def test_pdf_pages_are_reported_by_page():
+    solver = FakeSolver({})
+    items = [BatchItem(0, "book.pdf", "book", page=1), BatchItem(1, "book.pdf", "book", page=2)]
+    results = sorted([r async for r in solve_batch(solver, items, concurrency=2)], key=lambda r: r.index)
+    assert [(r.page, r.solution) for r in results] == [(1, "solution to book#0"), (2, "solution to book#1")]
+
+
+async def test_concurrency_is_capped():
+    solver = FakeSolver({path: 0.01 for path in "abcdef"})
+    results = [r async for r in solve_batch(solver, _items(*"abcdef"), concurrency=2)]
+    assert len(results) == 6
+    assert solver.peak == 2
+
+
+async def test_a_failed_item_does_not_stop_the_batch():
+    solver = FakeSolver({}, fail={"b"})
+    results = sorted([r async for r in solve_batch(solver, _items("a", "b", "c"), concurrency=3)],
+                     key=lambda r: r.index)
+    assert [r.success for r in results] == [True, False, True]
+    assert results[1].error == "b is unreadable"
+
+
+async def test_closing_the_stream_cancels_unfinished_items():
+    solver = FakeSolver({"a": 0, "b": 10, "c": 10})
+    stream = solve_batch(solver, _items("a", "b", "c"), concurrency=3)
+    first = await stream.__anext__()
+    assert first.index == 0
+    # What the response does when the client disconnects
+    await stream.aclose()
+    await asyncio.sleep(0)
+    assert sorted(solver.cancelled) == ["b", "c"]
@@ -0,0 +1,129 @@
+import os
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services.image_cache import MultiIndexHash, SolutionCache, content_fingerprint, hamming
+from app.services.image_prep import prepare_image
+
+
+class TestMultiIndexHash:
+    def test_search_matches_a_linear_scan(self):
+        rng = random.Random(7)
+        index = MultiIndexHash(bits=256, radius=16)
+        keys = [rng.getrandbits(256) for _ in range(300)]
+        # Near neighbours of the first few keys, at distances either side of the radius
+        for base, flips in zip(keys[:20], range(0, 40, 2)):
+            key = base
+            for bit in rng.sample(range(256), flips):
+                key ^= 1 << bit
+            keys.append(key)
+        for i, key in enumerate(keys):
+            index.add(key, i)
+
+        for query in keys[:20]:
+            expected = sorted((hamming(query, key), i) for i, key in enumerate(keys)
+                              if hamming(query, key) <= 16)
+            assert sorted(index.search(query)) == expected
+
+    def test_removed_values_are_no_longer_found(self):
+        index = MultiIndexHash(bits=256, radius=4)
+        index.add(5, "first")
+        index.add(5, "second")
+        index.add(6, "third")
+        index.remove(5, "first")
+        assert [value for _, value in index.search(5)] == ["second", "third"]
+        index.remove(5, "second")
+        index.remove(6, "third")
+        assert len(index) == 0
+        assert index.search(5) == []
+        assert all(not table for table in index._tables)
+
+    def test_one_key_holds_several_values(self):
+        index = MultiIndexHash(bits=256, radius=4)
+        index.add(5, "first")
+        index.add(5, "second")
+        assert len(index) == 2
+        assert sorted(value for _, value in index.search(5)) == ["first", "second"]
+
+
+@pytest.mark.parametrize("enhance", [False, True])
+class TestSolutionCache:
+    def test_different_problems_on_one_template_do_not_match(self, worksheet_photo, enhance):
+        first = prepare_image(worksheet_photo("x^2 + 5x + 6 = 0"), enhance=enhance)
+        second = prepare_image(worksheet_photo("x^2 - 7x + 12 = 0"), enhance=enhance)
+        # The layout hash can't tell them apart...
+        assert hamming(first.image_hash, second.image_hash) <= 16
+
+        cache = SolutionCache()
+        cache.add(first.image_hash, first.content_fingerprint, "x = -2 or x = -3")
+        # ...the content check can.
+        assert cache.lookup(second.image_hash, second.content_fingerprint) is None
+        assert cache.stats()["rejected"] == 1
+
+    def test_one_changed_digit_is_a_different_problem(self, worksheet_photo, enhance):
+        first = prepare_image(worksheet_photo("x^2 + 5x + 6 = 0"), enhance=enhance)
+        second = prepare_image(worksheet_photo("x^2 + 5x + 4 = 0"), enhance=enhance)
+        cache = SolutionCache()
+        cache.add(first.image_hash, first.content_fingerprint, "x = -2 or x = -3")
+        assert cache.lookup(second.image_hash, second.content_fingerprint) is None
+        # Both are kept, under hashes that may coincide
+        assert cache.add(second.image_hash, second.content_fingerprint, "x = -1 or x = -4")
+        assert cache.lookup(second.image_hash, second.content_fingerprint) == "x = -1 or x = -4"
+
+    def test_a_recompressed_copy_is_served(self, worksheet_photo, enhance):
+        first = prepare_image(worksheet_photo("x^2 + 5x + 6 = 0"), enhance=enhance)
+        copy = prepare_image(worksheet_photo("x^2 + 5x + 6 = 0", quality=70), enhance=enhance)
+        cache = SolutionCache()
+        cache.add(first.image_hash, first.content_fingerprint, "x = -2 or x = -3")
+        assert cache.lookup(copy.image_hash, copy.content_fingerprint) == "x = -2 or x = -3"
+
+    def test_entries_survive_a_restart(self, worksheet_photo, enhance, tmp_path):
+        path = str(tmp_path / "cache.jsonl")
+        image = prepare_image(worksheet_photo("x^2 + 5x + 6 = 0"), enhance=enhance)
+        SolutionCache(path).add(image.image_hash, image.content_fingerprint, "x = -2 or x = -3")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"hash": "ff", "solut')  # torn by a crash mid-append
+
+        reloaded = SolutionCache(path)
+        assert len(reloaded) == 1
+        assert reloaded.lookup(image.image_hash, image.content_fingerprint) == "x = -2 or x = -3"
+
+
+def _entry(i):
+    """A distinct hash and fingerprint for the i-th synthetic problem."""
+    page = Image.new("L", (400, 300), 250)
+    ImageDraw.Draw(page).rectangle((20 + 30 * (i % 10), 20 + 25 * (i // 10), 45 + 30 * (i % 10), 40 + 25 * (i // 10)),
+                                   fill=20)
+    return random.Random(i).getrandbits(256), content_fingerprint(page)
+
+
+class TestEviction:
+    def test_the_oldest_entries_make_room_for_new_ones(self):
+        cache = SolutionCache(max_entries=3)
+        entries = [_entry(i) for i in range(5)]
+        for i, (image_hash, fingerprint) in enumerate(entries):
+            assert cache.add(image_hash, fingerprint, f"solution {i}")
+        assert len(cache) == 3
+        assert cache.stats()["evicted"] == 2
+        assert [cache.lookup(*entry) for entry in entries] == [None, None, "solution 2", "solution 3", "solution 4"]
+
+    def test_the_file_rotates_and_a_restart_keeps_the_newest(self, tmp_path):
+        path = str(tmp_path / "cache.jsonl")
+        cache = SolutionCache(path, max_entries=3)
+        entries = [_entry(i) for i in range(8)]
+        for i, entry in enumerate(entries):
+            cache.add(*entry, f"solution {i}")
+        # 0-2 were rotated out with the first file, 3-5 are in .1, 6-7 current
+        assert os.path.exists(f"{path}.1")
+        with open(path) as f:
+            assert len(f.readlines()) == 2
+
+        reloaded = SolutionCache(path, max_entries=3)
+        assert [reloaded.lookup(*entry) for entry in entries[4:]] == [None, "solution 5", "solution 6", "solution 7"]
+        # It carries on counting the current file's lines
+        reloaded.add(*_entry(8), "solution 8")
+        reloaded.add(*_entry(9), "solution 9")
+        with open(path) as f:
+            assert len(f.readlines()) == 1
@@ -0,0 +1,131 @@
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from app.services.image_prep import ImageTooLarge, prepare_image
+
+from .conftest import jpeg, worksheet
+
+
+def _encode(image, fmt, **params):
+    buffered = io.BytesIO()
+    image.save(buffered, format=fmt, **params)
+    return buffered.getvalue()
+
+
+def _decode(prepared):
+    return Image.open(io.BytesIO(prepared.data))
+
+
+def _photo(size):
+    """Camera-like noise, which PNG can't compress."""
+    rng = random.Random(0)
+    return Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3))
+
+
+def _halves(size=(400, 200)):
+    """Red on the left, blue on the right."""
+    image = Image.new("RGB", size, (220, 30, 30))
+    image.paste((30, 30, 220), (size[0] // 2, 0, size[0], size[1]))
+    return image
+
+
+class TestDownscale:
+    def test_large_photos_fit_max_dimension_keeping_aspect(self):
+        prepared = prepare_image(jpeg(worksheet("x + 1 = 2", size=(3000, 2000))), max_dimension=1600)
+        assert prepared.reencoded
+        assert (prepared.width, prepared.height) == (1600, 1067)
+        assert prepared.mime_type == "image/jpeg"
+        assert _decode(prepared).size == (1600, 1067)
+
+    def test_a_path_is_read_like_bytes(self, tmp_path):
+        path = tmp_path / "upload.jpg"
+        path.write_bytes(jpeg(worksheet("x + 1 = 2", size=(2400, 1800))))
+        prepared = prepare_image(str(path), max_dimension=1200)
+        assert (prepared.width, prepared.height) == (1200, 900)
+        assert prepared.original_bytes == path.stat().st_size
+
+
+class TestPassthrough:
+    @pytest.mark.parametrize("fmt, mime_type", [("JPEG", "image/jpeg"), ("PNG", "image/png"),
+                                                ("WEBP", "image/webp")])
+    def test_small_uploads_in_accepted_formats_are_sent_unchanged(self, fmt, mime_type):
+        data = _encode(worksheet("x + 1 = 2", size=(600, 800)), fmt)
+        prepared = prepare_image(data, max_dimension=1600)
+        assert not prepared.reencoded
+        assert prepared.data == data
+        assert prepared.mime_type == mime_type
+        assert (prepared.width, prepared.height) == (600, 800)
+        # Still decoded for the cache keys
+        assert prepared.image_hash and prepared.content_fingerprint
+
+    def test_uploads_over_the_byte_limit_are_reencoded(self):
+        data = _encode(_photo((600, 400)), "PNG")
+        prepared = prepare_image(data, passthrough_max_bytes=len(data) - 1)
+        assert prepared.reencoded
+        assert len(prepared.data) < len(data)
+
+    def test_other_formats_are_reencoded(self):
+        prepared = prepare_image(_encode(worksheet("x + 1 = 2", size=(600, 800)), "BMP"))
+        assert prepared.reencoded
+        assert prepared.mime_type in ("image/jpeg", "image/png")
+
+
+class TestExifOrientation:
+    def test_rotated_photos_are_turned_upright(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # stored sideways; rotate 90 degrees clockwise to view
+        prepared = prepare_image(_encode(_halves(), "JPEG", exif=exif))
+        # Not passed through: the model would see the stored pixels sideways.
+        assert prepared.reencoded
+        assert (prepared.width, prepared.height) == (200, 400)
+        upright = _decode(prepared).convert("RGB")
+        # The stored left (red) half is now on top.
+        red, _, blue = upright.getpixel((100, 50))
+        assert red > 150 and blue < 100
+        red, _, blue = upright.getpixel((100, 350))
+        assert blue > 150 and red < 100
+
+
+class TestLimits:
+    def test_images_over_the_pixel_cap_are_rejected(self):
+        with pytest.raises(ImageTooLarge, match="400x300"):
+            prepare_image(jpeg(worksheet("x", size=(400, 300))), max_pixels=400 * 300 - 1)
+
+    def test_the_cap_is_checked_from_the_header_alone(self):
+        # A valid header with the pixel data cut off: rejected for its size,
+        # not as a decode failure, so nothing was decoded.
+        data = jpeg(_photo((800, 600)))[:2000]
+        with pytest.raises(ImageTooLarge):
+            prepare_image(data, max_pixels=1000)
+
+    def test_non_images_are_invalid(self):
+        with pytest.raises(ValueError, match="Invalid image file"):
+            prepare_image(b"definitely not an image")
+
+
+class TestReencodedFormat:
+    def test_screenshots_become_png_when_smaller(self):
+        screenshot = worksheet("x^2 + 5x + 6 = 0", size=(2400, 3200)).quantize(8).convert("RGB")
+        prepared = prepare_image(_encode(screenshot, "PNG"), max_dimension=1600)
+        assert prepared.reencoded
+        assert prepared.mime_type == "image/png"
+
+    def test_photos_saved_as_png_become_jpeg(self):
+        prepared = prepare_image(_encode(_photo((2000, 1500)), "PNG"), max_dimension=1600)
+        assert prepared.mime_type == "image/jpeg"
+
+    def test_jpeg_sources_stay_jpeg(self):
+        screenshot = worksheet("x^2 + 5x + 6 = 0", size=(2400, 3200)).quantize(8).convert("RGB")
+        prepared = prepare_image(_encode(screenshot, "JPEG"), max_dimension=1600)
+        assert prepared.mime_type == "image/jpeg"
+
+    def test_transparency_is_flattened_onto_white(self):
+        image = Image.new("RGBA", (2000, 1000), (0, 0, 0, 0))
+        image.paste((20, 20, 30, 255), (0, 0, 1000, 1000))
+        prepared = prepare_image(_encode(image, "PNG"), max_dimension=1000)
+        flat = _decode(prepared).convert("RGB")
+        assert flat.getpixel((750, 250)) == (255, 255, 255)
+        assert max(flat.getpixel((100, 250))) < 60
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.image_cache import SolutionCache
+from app.services.image_prep import pdf_page_count, rasterize_pdf_page
+
+from .conftest import worksheet
+
+EQUATIONS = ["x^2 + 5x + 6 = 0", "x^2 - 7x + 12 = 0", "2x + 3 = 11"]
+
+
+@pytest.fixture
+def handout(tmp_path):
+    """A three-page scanned handout, one problem per page, at 150 dpi."""
+    path = tmp_path / "handout.pdf"
+    pages = [worksheet(equation) for equation in EQUATIONS]
+    pages[0].save(path, format="PDF", save_all=True, append_images=pages[1:], resolution=150)
+    return str(path)
+
+
+def test_counts_pages(handout):
+    assert pdf_page_count(handout) == 3
+
+
+def test_a_broken_file_is_rejected(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4\nnot really a pdf")
+    with pytest.raises(ValueError):
+        pdf_page_count(str(path))
+    with pytest.raises(ValueError):
+        rasterize_pdf_page(str(path), 0)
+
+
+@pytest.mark.parametrize("enhance, fmt", [(False, "JPEG"), (True, "PNG")])
+def test_pages_render_within_the_size_cap(handout, enhance, fmt):
+    for index in range(3):
+        page = rasterize_pdf_page(handout, index, max_dimension=1000, enhance=enhance)
+        assert max(page.width, page.height) <= 1000
+        with Image.open(io.BytesIO(page.data)) as decoded:
+            # Binarized pages compress better as 1-bit PNG
+            assert decoded.format == fmt
+            assert decoded.size == (page.width, page.height)
+        assert page.mime_type == f"image/{fmt.lower()}"
+        assert (page.enhancement is not None) == enhance
+
+
+def test_pages_of_one_handout_are_cached_separately(handout):
+    cache = SolutionCache()
+    pages = [rasterize_pdf_page(handout, index) for index in range(3)]
+    for page, equation in zip(pages, EQUATIONS):
+        assert cache.lookup(page.image_hash, page.content_fingerprint) is None
+        cache.add(page.image_hash, page.content_fingerprint, f"solution to {equation}")
+    for page, equation in zip(pages, EQUATIONS):
+        assert cache.lookup(page.image_hash, page.content_fingerprint) == f"solution to {equation}"
+
@@ -0,0 +1,68 @@
+import pytest
+from PIL import Image
+
+from app.services.image_cache import SolutionCache, content_fingerprint
+from app.services.image_prep import PreparedImage
+from app.services.math_solver import ROUTE_CACHE, ROUTE_OCR_TEXT, ROUTE_VISION, MathSolver
+from app.services.ocr import OcrResult
+
+QUESTION = "Solve for x: x^2 + 5x + 6 = 0"
+
+
+def _image(ocr=None, image_hash=1):
+    return PreparedImage(data=b"jpeg", mime_type="image/jpeg", width=800, height=600,
+                         original_bytes=4, reencoded=False, prep_ms=0.0, image_hash=image_hash,
+                         content_fingerprint=content_fingerprint(Image.new("L", (800, 600), 250)), ocr=ocr)
+
+
+def _ocr(text=QUESTION, confidence=92.0, diagram_ratio=0.05):
+    return OcrResult(text=text, confidence=confidence, diagram_ratio=diagram_ratio, ms=1.0)
+
+
+@pytest.fixture
+def solver(monkeypatch):
+    solver = MathSolver(api_key="test", ocr_min_confidence=85.0, ocr_max_diagram_ratio=0.15, ocr_min_chars=12)
+    calls = []
+
+    async def ask_text_model(text):
+        calls.append(("text", text))
+        return "from the text model", 0.0001
+
+    async def ask_model(image):
+        calls.append(("vision", image.image_hash))
+        return "from the vision model", 0.01
+
+    monkeypatch.setattr(solver, "_ask_text_model", ask_text_model)
+    monkeypatch.setattr(solver, "_ask_model", ask_model)
+    solver.calls = calls
+    return solver
+
+
+async def test_confident_diagram_free_text_goes_to_the_text_model(solver):
+    result = await solver.solve_image(_image(_ocr()))
+    assert result.route == ROUTE_OCR_TEXT
+    assert result.solution == "from the text model"
+    assert solver.calls == [("text", QUESTION)]
+
+
+@pytest.mark.parametrize("ocr", [
+    None,  # OCR off or failed
+    _ocr(confidence=60.0),
+    _ocr(diagram_ratio=0.4),
+    _ocr(text="x = ?"),
+])
+async def test_everything_else_goes_to_the_vision_model(solver, ocr):
+    result = await solver.solve_image(_image(ocr))
+    assert result.route == ROUTE_VISION
+    assert result.solution == "from the vision model"
+    assert [route for route, _ in solver.calls] == ["vision"]
+
+
+async def test_a_cached_solution_skips_both_models(solver):
+    solver.cache = SolutionCache()
+    first = await solver.solve_image(_image(_ocr()))
+    again = await solver.solve_image(_image(_ocr()))
+    assert (first.route, again.route) == (ROUTE_OCR_TEXT, ROUTE_CACHE)
+    assert again.cached and again.solution == first.solution
+    assert len(solver.calls) == 1
+    assert solver.route_stats.snapshot()[ROUTE_CACHE]["requests"] == 1
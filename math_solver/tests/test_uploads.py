@@ -0,0 +1,177 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import httpx
+import pytest
+
+from app import main
+from app.services.image_prep import prepare_image
+from app.services.uploads import UploadSizeLimitMiddleware, UploadTooLarge, spool_upload
+
+from .conftest import jpeg, worksheet
+
+LIMIT = 1000
+
+
+class Recorder:
+    """A downstream app that reads the whole body, then answers 200."""
+
+    def __init__(self):
+        self.body = b""
+        self.disconnected = False
+
+    async def __call__(self, scope, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected = True
+                break
+            self.body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _post(app, chunks, content_length=None, path="/solve"):
+    headers = [(b"content-type", b"multipart/form-data; boundary=x")]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers}
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    pulled = 0
+    sent = []
+
+    async def receive():
+        nonlocal pulled
+        pulled += 1
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await UploadSizeLimitMiddleware(app, {"/solve": LIMIT})(scope, receive, send)
+    return sent, pulled
+
+
+def _status(sent):
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+
+def _body(sent):
+    return b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+async def test_declared_length_over_the_limit_is_rejected_unread():
+    app = Recorder()
+    sent, pulled = await _post(app, [b"x" * (LIMIT + 1)], content_length=LIMIT + 1)
+    assert _status(sent) == 413
+    assert "1000 bytes" in json.loads(_body(sent))["detail"]
+    assert pulled == 0
+    assert app.body == b""
+
+
+async def test_chunked_body_is_cut_off_once_over_the_limit():
+    app = Recorder()
+    chunks = [b"x" * 400] * 10
+    sent, pulled = await _post(app, chunks)
+    # Only the app's view is cut short; the 413 is the only response sent.
+    assert _status(sent) == 413
+    assert [m["status"] for m in sent if m["type"] == "http.response.start"] == [413]
+    assert _body(sent) != b"ok"
+    assert app.disconnected
+    assert len(app.body) == 800
+    assert pulled == 3
+
+
+@pytest.mark.parametrize("content_length", [LIMIT, None])
+async def test_bodies_within_the_limit_pass_through(content_length):
+    app = Recorder()
+    sent, _ = await _post(app, [b"x" * 600, b"x" * 400], content_length=content_length)
+    assert _status(sent) == 200
+    assert len(app.body) == LIMIT
+
+
+async def test_other_paths_are_not_limited():
+    app = Recorder()
+    sent, _ = await _post(app, [b"x" * (LIMIT * 2)], content_length=LIMIT * 2, path="/health")
+    assert _status(sent) == 200
+
+
+class FakeUpload:
+    """Hands out the body ``chunk_size`` bytes at a time, like UploadFile."""
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    async def read(self, size):
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+def _spooled_files():
+    return {name for name in os.listdir(tempfile.gettempdir()) if name.startswith("upload-")}
+
+
+async def test_spool_upload_copies_the_whole_upload():
+    path = await spool_upload(FakeUpload(b"x" * 2500), max_bytes=LIMIT * 3, chunk_size=1000)
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == b"x" * 2500
+    finally:
+        os.unlink(path)
+
+
+async def test_spool_upload_stops_and_cleans_up_past_the_limit():
+    upload = FakeUpload(b"x" * 5000)
+    before = _spooled_files()
+    with pytest.raises(UploadTooLarge):
+        await spool_upload(upload, max_bytes=LIMIT, chunk_size=400)
+    assert upload.offset == 1200
+    assert _spooled_files() == before
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    # Image prep runs in a thread pool here instead of worker processes.
+    monkeypatch.setattr(main.math_solver, "_executor", ThreadPoolExecutor(max_workers=1))
+
+    async def no_model_calls(image):
+        raise AssertionError("the upload should have been rejected")
+
+    monkeypatch.setattr(main.math_solver, "solve_image", no_model_calls)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    main.math_solver.close()
+
+
+async def _solve(client, data, content_type="image/jpeg"):
+    return await client.post("/solve", files={"file": ("problem.jpg", data, content_type)})
+
+
+async def test_solve_answers_413_for_uploads_over_the_byte_limit(client, monkeypatch):
+    # Under the middleware's limit, so spool_upload is what refuses it.
+    monkeypatch.setattr(main.math_solver, "max_upload_bytes", LIMIT)
+    response = await _solve(client, b"x" * (LIMIT + 1))
+    assert response.status_code == 413
+    assert "upload limit" in response.json()["detail"]
+
+
+async def test_solve_answers_413_for_images_over_the_pixel_cap(client, monkeypatch):
+    monkeypatch.setattr(main.math_solver, "_prepare", partial(prepare_image, max_pixels=1000))
+    response = await _solve(client, jpeg(worksheet("x + 1 = 2", size=(400, 300))))
+    assert response.status_code == 413
+    assert "400x300" in response.json()["detail"]
+
+
+async def test_solve_answers_400_for_invalid_images(client):
+    response = await _solve(client, b"definitely not an image")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid image file"